@@ -1,45 +1,43 @@
-from playwright.sync_api import sync_playwright
+from core import config
+from core.browser_pool import BrowserPool
+from core.network_policy import NetworkBlocker
 
 class BaseTest:
 
-    def __init__(self):
+    def __init__(self, pool: BrowserPool | None = None):
 
-        self.playwright = None
-        self.browser = None
+        # a shared pool can be passed in, otherwise the test owns a private one
+        self.pool = pool
+        self._owns_pool = pool is None
         self.context = None
         self.page = None
+        self.blocker = None
 
     def setup (self):
-        self.playwright = sync_playwright().start()
-        self.browser = self.playwright.chromium.launch(
-            headless=False, slow_mo=1000,
-            # this prevents getting stuck on the opening page of E-bay
-            # where there's a security key setup coming from chrome.
-            args=[
-                "--disable-features=WebAuthentication",  # blocks Windows Hello
-                "--disable-webauthn",  #  newer Chromium flag
-                "--disable-usb-keyboard-detect",  # prevents security key prompt
-                "--disable-extensions",
-                "--disable-logging",
-                "--disable-infobars"
-            ]
-        )
-
-        self.context = self.browser.new_context()
+        profile = config.get_profile()
+        if self.pool is None:
+            self.pool = BrowserPool(size=1, **profile.launch_options())
+        self.pool.start()
+
+        self.context = self.pool.acquire(**profile.context_options())
+        profile.apply_timeouts(self.context)
+        if profile.block_resources:
+            self.blocker = NetworkBlocker().attach(self.context)
         self.page = self.context.new_page()
 
 
-    def teardown(self):
+    def teardown(self, failed: bool = False):
 
         if self.page:
             self.page.close()
+        if self.blocker:
+            self.blocker.detach(self.context)
         if self.context:
-            self.context.close()
-        if self.browser:
-            self.browser.close()
-        if self.playwright:
-            self.playwright.stop()
+            self.pool.release(self.context, failed=failed)
+        if self._owns_pool and self.pool:
+            self.pool.close()
+            self.pool = None
 
 
     def get_page(self):
-        return self.page
\ No newline at end of file
+        return self.page
@@ -0,0 +1,108 @@
+import logging
+from contextlib import contextmanager
+
+from playwright.sync_api import sync_playwright, Error as PlaywrightError
+
+logger = logging.getLogger(__name__)
+
+
+class BrowserPool:
+    # keeps "size" chromium processes alive for the whole session and hands out
+    # a fresh isolated BrowserContext for every scenario.
+    # launching chromium is the slowest fixed cost of a test, creating a context is cheap.
+
+    def __init__(self, size: int = 1, **launch_options):
+        self.size = max(1, int(size))
+        self.launch_options = launch_options
+        self._playwright = None
+        self._browsers = []
+        self._next_slot = 0
+        # context -> index of the browser that created it
+        self._owners = {}
+        # simple counters so a run can report how many launches it paid for
+        self.launches = 0
+        self.recycled = 0
+
+    def start(self):
+        if self._playwright is None:
+            self._playwright = sync_playwright().start()
+        while len(self._browsers) < self.size:
+            self._browsers.append(self._launch())
+        return self
+
+    def _launch(self):
+        self.launches += 1
+        return self._playwright.chromium.launch(**self.launch_options)
+
+    def _relaunch(self, slot: int):
+        old_browser = self._browsers[slot]
+        try:
+            old_browser.close()
+        except PlaywrightError:
+            # browser already crashed or was closed
+            pass
+        self._browsers[slot] = self._launch()
+        self.recycled += 1
+        logger.info("BrowserPool relaunched browser in slot %d", slot)
+        return self._browsers[slot]
+
+    def acquire(self, **context_options):
+        # return a new context from the next browser (round robin)
+        if self._playwright is None:
+            self.start()
+
+        slot = self._next_slot % self.size
+        self._next_slot += 1
+
+        browser = self._browsers[slot]
+        if not browser.is_connected():
+            browser = self._relaunch(slot)
+
+        context = browser.new_context(**context_options)
+        self._owners[context] = slot
+        return context
+
+    def release(self, context, failed: bool = False):
+        # close the context. after a failure the owning browser is replaced as well,
+        # so a hung renderer or a broken browser state can not leak into the next scenario
+        slot = self._owners.pop(context, None)
+        try:
+            context.close()
+        except PlaywrightError:
+            pass
+
+        if slot is None:
+            return
+        if failed or not self._browsers[slot].is_connected():
+            self._relaunch(slot)
+
+    @contextmanager
+    def context(self, **context_options):
+        context = self.acquire(**context_options)
+        failed = False
+        try:
+            yield context
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.release(context, failed=failed)
+
+    def close(self):
+        for context in list(self._owners):
+            try:
+                context.close()
+            except PlaywrightError:
+                pass
+        self._owners.clear()
+
+        for browser in self._browsers:
+            try:
+                browser.close()
+            except PlaywrightError:
+                pass
+        self._browsers = []
+
+        if self._playwright is not None:
+            self._playwright.stop()
+            self._playwright = None
@@ -1,17 +1,272 @@
+import os
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+# this prevents getting stuck on the opening page of E-bay
+# where there's a security key setup coming from chrome.
+BASE_LAUNCH_ARGS = (
+    "--disable-features=WebAuthentication",  # blocks Windows Hello
+    "--disable-webauthn",  # newer Chromium flag
+    "--disable-usb-keyboard-detect",  # prevents security key prompt
+    "--disable-extensions",
+    "--disable-logging",
+    "--disable-infobars",
+)
+
+@dataclass(frozen=True)
+class ExecutionProfile:
+    # everything that decides how fast (and how watchable) a run is, in one place
+    name: str
+    headless: bool
+    slow_mo: int  # ms added by playwright to every single action
+    default_timeout: int  # ms, actions and waits
+    navigation_timeout: int  # ms, goto and page loads
+    viewport: dict | None
+    launch_args: tuple
+    wait_until: str  # load state page.goto waits for: "load", "domcontentloaded" or "commit"
+    block_resources: bool  # apply the per page type network policies (core/network_policy.py)
+
+    def launch_options(self) -> dict:
+        return {"headless": self.headless, "slow_mo": self.slow_mo, "args": list(self.launch_args)}
+
+    def context_options(self) -> dict:
+        return {"viewport": self.viewport}
+
+    def apply_timeouts(self, context):
+        # works for sync and async contexts, both setters are plain methods
+        context.set_default_timeout(self.default_timeout)
+        context.set_default_navigation_timeout(self.navigation_timeout)
+
+PROFILES = {
+    # watch the browser work: headed, one second per action, generous timeouts
+    "debug": ExecutionProfile(
+        name="debug",
+        headless=False,
+        slow_mo=1000,
+        default_timeout=30_000,
+        navigation_timeout=60_000,
+        viewport={"width": 1920, "height": 1080},
+        launch_args=BASE_LAUNCH_ARGS + ("--start-maximized",),
+        wait_until="load",
+        block_resources=False,
+    ),
+    # unattended runs: headless, no slow down, regular timeouts
+    "ci": ExecutionProfile(
+        name="ci",
+        headless=True,
+        slow_mo=0,
+        default_timeout=20_000,
+        navigation_timeout=45_000,
+        viewport={"width": 1920, "height": 1080},
+        launch_args=BASE_LAUNCH_ARGS + ("--disable-dev-shm-usage",),
+        wait_until="load",
+        block_resources=True,
+    ),
+    # as quick as possible: no artificial slow down, short timeouts, stop waiting at DOMContentLoaded
+    "fast": ExecutionProfile(
+        name="fast",
+        headless=True,
+        slow_mo=0,
+        default_timeout=10_000,
+        navigation_timeout=30_000,
+        viewport={"width": 1366, "height": 768},
+        launch_args=BASE_LAUNCH_ARGS + ("--disable-dev-shm-usage", "--disable-gpu", "--mute-audio"),
+        wait_until="domcontentloaded",
+        block_resources=True,
+    ),
+}
+
+DEFAULT_PROFILE = "debug"
+
+_active_profile: ExecutionProfile | None = None
+
+def set_profile(name:str) -> ExecutionProfile:
+    # select the profile for the whole run (pytest --profile calls this at startup)
+    global _active_profile
+    if name not in PROFILES:
+        raise ValueError(f"unknown execution profile {name!r}, expected one of {sorted(PROFILES)}")
+    _active_profile = PROFILES[name]
+    return _active_profile
+
+def get_profile() -> ExecutionProfile:
+    # resolved once - from EBAY_PROFILE if nobody selected a profile explicitly
+    if _active_profile is None:
+        return set_profile(os.environ.get("EBAY_PROFILE", DEFAULT_PROFILE))
+    return _active_profile
+
+EBAY_BASE_URL = "https://www.ebay.com"
+
+_base_url_override: str | None = None
+
+def set_base_url(url:str | None):
+    # point every page object at another site, e.g. the local stand-in (local_ebay)
+    global _base_url_override
+    _base_url_override = url.rstrip("/") if url else None
+
 def get_base_url():
-    return "https://www.ebay.com"
+    return _base_url_override or os.environ.get("EBAY_BASE_URL", EBAY_BASE_URL).rstrip("/")
+
+def is_live_ebay():
+    host = urlparse(get_base_url()).hostname or ""
+    return host == "ebay.com" or host.endswith(".ebay.com")
+
+def get_signin_url():
+    return "https://signin.ebay.com/" if is_live_ebay() else f"{get_base_url()}/signin"
+
+def get_cart_url():
+    return "https://cart.ebay.com/" if is_live_ebay() else f"{get_base_url()}/cart"
+
+# how a scenario reaches the search results: "url" builds the results url (query, price filter,
+# Buy It Now, sort, 240 per page) and lands there in one navigation, "ui" types into the home page
+SEARCH_MODES = ("url", "ui")
+
+_search_mode_override: str | None = None
+
+def set_search_mode(mode:str | None):
+    global _search_mode_override
+    if mode and mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode '{mode}', choose one of: {', '.join(SEARCH_MODES)}")
+    _search_mode_override = mode
+
+def get_search_mode():
+    return _search_mode_override or os.environ.get("EBAY_SEARCH_MODE", "url")
+
+def get_search_url():
+    return f"{get_base_url()}/sch/i.html"
+
+def get_pagination_fan_out():
+    # result pages 2..N fetched at the same time, each in its own tab
+    return int(os.environ.get("EBAY_PAGINATION_FAN_OUT", "3"))
 
 def get_browser_type():
     return "chromium"
 
 def get_default_timeout():
-    return 20
+    # seconds
+    return get_profile().default_timeout / 1000
 
 def get_headless_mode ():
-    return False
+    return get_profile().headless
+
+def get_wait_strategy():
+    return get_profile().wait_until
+
+def get_browser_pool_size():
+    # number of chromium processes kept alive for the whole test session
+    return int(os.environ.get("EBAY_BROWSER_POOL_SIZE", "1"))
+
+def get_auth_cache_dir():
+    # saved storage_state of logged in users (contains session cookies - keep it out of git)
+    return os.environ.get("EBAY_AUTH_CACHE_DIR", ".auth")
+
+def get_auth_cache_ttl():
+    # seconds a saved login is trusted before the full login sequence runs again
+    return float(os.environ.get("EBAY_AUTH_CACHE_TTL", str(6 * 60 * 60)))
+
+def get_product_cache_size():
+    # product facts (price, add to cart, variations) kept per item id for the whole run
+    return int(os.environ.get("EBAY_PRODUCT_CACHE_SIZE", "1000"))
+
+def get_product_cache_ttl():
+    # seconds before a product page is worth visiting again
+    return float(os.environ.get("EBAY_PRODUCT_CACHE_TTL", str(30 * 60)))
+
+def get_search_cache_path():
+    return os.environ.get("EBAY_SEARCH_CACHE_PATH", ".cache/search_results.sqlite")
+
+def get_search_cache_enabled():
+    # EBAY_SEARCH_CACHE=0 bypasses the search results cache
+    return os.environ.get("EBAY_SEARCH_CACHE", "1") != "0"
+
+def get_search_cache_ttl():
+    # seconds - eBay results and prices move, an hour old search is still good enough
+    return float(os.environ.get("EBAY_SEARCH_CACHE_TTL", str(60 * 60)))
+
+def get_search_cache_size():
+    # results pages kept, least recently used are dropped first
+    return int(os.environ.get("EBAY_SEARCH_CACHE_SIZE", "500"))
+
+def get_cart_tabs():
+    # products loading at once in the multi-tab add to cart
+    return int(os.environ.get("EBAY_CART_TABS", "3"))
+
+def get_item_timeout():
+    # seconds one product may take in the multi-tab add to cart
+    return float(os.environ.get("EBAY_ITEM_TIMEOUT", "45"))
+
+def get_reset_cart():
+    # EBAY_RESET_CART=0 keeps what earlier scenarios and runs left in the user's cart
+    return os.environ.get("EBAY_RESET_CART", "1") != "0"
+
+def get_restore_cart():
+    # EBAY_RESTORE_CART=1 puts the cart back the way the scenario found it once it is done
+    return os.environ.get("EBAY_RESTORE_CART", "0") == "1"
+
+def get_screenshot_dir():
+    return os.environ.get("EBAY_SCREENSHOT_DIR", "photos")
+
+def get_screenshot_policy():
+    # always, on_failure or sampled (see utils/screenshot_writer.py)
+    return os.environ.get("EBAY_SCREENSHOTS", "always")
+
+def get_screenshot_format():
+    # jpeg, webp (needs Pillow) or png
+    return os.environ.get("EBAY_SCREENSHOT_FORMAT", "jpeg")
+
+def get_screenshot_quality():
+    return int(os.environ.get("EBAY_SCREENSHOT_QUALITY", "70"))
+
+def get_screenshot_full_page():
+    # the viewport by default - a full page capture of a product page is several screens tall
+    return os.environ.get("EBAY_SCREENSHOT_FULL_PAGE", "0") == "1"
+
+def get_screenshot_clip():
+    # "x,y,width,height" to keep only part of the viewport
+    return os.environ.get("EBAY_SCREENSHOT_CLIP", "")
+
+def get_screenshot_sample_rate():
+    # share of the successful items kept by the "sampled" policy
+    return float(os.environ.get("EBAY_SCREENSHOT_SAMPLE_RATE", "0.2"))
+
+def get_screenshot_workers():
+    return int(os.environ.get("EBAY_SCREENSHOT_WORKERS", "2"))
+
+def get_prescreen_enabled():
+    # EBAY_PRESCREEN=0 sends every search result to the browser without the http pre-check.
+    # always off with a HAR mode: the pre-check's http requests do not go through the
+    # context's routes, so replay could not serve them and record would not capture them
+    if get_har_mode() != "off":
+        return False
+    return os.environ.get("EBAY_PRESCREEN", "1") != "0"
+
+def get_prescreen_concurrency():
+    # product pages fetched at once by the async pre-check
+    return int(os.environ.get("EBAY_PRESCREEN_CONCURRENCY", "8"))
+
+def get_prescreen_timeout():
+    # milliseconds per pre-check fetch
+    return float(os.environ.get("EBAY_PRESCREEN_TIMEOUT", "10000"))
+
+_har_mode_override: str | None = None
+
+def set_har_mode(mode:str | None):
+    # pytest --har-mode, so every part of the run sees the same mode
+    global _har_mode_override
+    _har_mode_override = mode
+
+def get_har_mode():
+    # "off", "record" or "replay" (see core/har_mode.py)
+    return _har_mode_override or os.environ.get("EBAY_HAR_MODE", "off")
+
+def get_har_not_found():
+    # what replay does with an unrecorded request: "abort" or "fallback"
+    return os.environ.get("EBAY_HAR_NOT_FOUND", "abort")
+
+def get_har_dir():
+    return os.environ.get("EBAY_HAR_DIR", "hars")
 
 def get_test_data_path():
-    return "data\\test_scenarios.json"
+    return "data/test_scenarios.json"
 
 def get_users_data_path():
     return "data/users.json"
@@ -0,0 +1,53 @@
+import re
+from pathlib import Path
+
+from core import config
+
+# "record": every request of a scenario goes to the network and is stored in its HAR file.
+# "replay": the scenario is served from its HAR file, nothing has to reach eBay.
+HAR_MODES = ("off", "record", "replay")
+
+# what replay does with a request that is not in the archive:
+# "abort" - fail it, the run stays fully offline and deterministic
+# "fallback" - let it go to the live network (handy while selectors change, not deterministic)
+HAR_NOT_FOUND_RULES = ("abort", "fallback")
+
+def har_path_for(scenario_name:str) -> Path:
+    slug = re.sub(r"[^a-z0-9]+", "-", scenario_name.lower()).strip("-") or "scenario"
+    return Path(config.get_har_dir()) / f"{slug}.har"
+
+def _route_from_har_args(scenario_name:str, mode:str, not_found:str):
+    if mode not in HAR_MODES:
+        raise ValueError(f"unknown HAR mode {mode!r}, expected one of {HAR_MODES}")
+    if not_found not in HAR_NOT_FOUND_RULES:
+        raise ValueError(f"unknown HAR not_found rule {not_found!r}, expected one of {HAR_NOT_FOUND_RULES}")
+
+    path = har_path_for(scenario_name)
+    if mode == "record":
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # the archive is written when the context closes
+        return path, {"update": True, "update_content": "embed", "update_mode": "full"}
+
+    if not path.exists():
+        raise FileNotFoundError(
+            f"no HAR recorded for scenario {scenario_name!r} ({path}), run it once with EBAY_HAR_MODE=record"
+        )
+    return path, {"not_found": not_found}
+
+def attach_har(context, scenario_name:str, mode:str | None = None, not_found:str | None = None):
+    # attach before any other route (e.g. NetworkBlocker): the route registered last runs first,
+    # so blocked requests are never recorded and never looked up in the archive
+    mode = mode or config.get_har_mode()
+    if mode == "off":
+        return None
+    path, options = _route_from_har_args(scenario_name, mode, not_found or config.get_har_not_found())
+    context.route_from_har(path, **options)
+    return path
+
+async def attach_har_async(context, scenario_name:str, mode:str | None = None, not_found:str | None = None):
+    mode = mode or config.get_har_mode()
+    if mode == "off":
+        return None
+    path, options = _route_from_har_args(scenario_name, mode, not_found or config.get_har_not_found())
+    await context.route_from_har(path, **options)
+    return path
@@ -0,0 +1,170 @@
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+from core import config
+from playwright.sync_api import Error as PlaywrightError
+
+logger = logging.getLogger(__name__)
+
+# hosts that belong to eBay itself (pages, static files, item images, descriptions)
+FIRST_PARTY_SUFFIXES = ("ebay.com", "ebaystatic.com", "ebayimg.com", "ebaydesc.com")
+
+# ad networks, analytics and beacons - none of the page objects reads anything they return
+TRACKER_MARKERS = (
+    "doubleclick", "googlesyndication", "google-analytics", "googletagmanager", "googleadservices",
+    "adnxs", "criteo", "facebook", "scorecardresearch", "bat.bing", "moatads", "quantserve",
+    "taboola", "outbrain", "amazon-adsystem", "pubmatic", "rubiconproject", "casalemedia",
+    "demdex", "omtrdc", "adsystem",
+    # eBay's own tracking endpoints
+    "/roverimp", "/rover/", "/marketingtracking", "/delstats", "/plsb", "/gh/useracquisition",
+)
+
+def is_first_party(url:str) -> bool:
+    host = urlparse(url).hostname
+    if not host:
+        # data: and blob: urls never leave the browser
+        return True
+    if host == urlparse(config.get_base_url()).hostname:
+        return True
+    return any(host == suffix or host.endswith("." + suffix) for suffix in FIRST_PARTY_SUFFIXES)
+
+def is_tracker(url:str) -> bool:
+    lowered = url.lower()
+    return any(marker in lowered for marker in TRACKER_MARKERS)
+
+@dataclass(frozen=True)
+class ResourcePolicy:
+    # what a page type is allowed to download. resource types are playwright's
+    # request.resource_type values ("image", "font", "media", "xhr", "fetch", "script", ...)
+    name: str
+    blocked_types: frozenset = frozenset()
+    block_trackers: bool = False
+    block_third_party: bool = False
+    # these types are allowed only from first party hosts
+    first_party_only_types: frozenset = frozenset()
+
+    def verdict(self, resource_type:str, url:str) -> str | None:
+        # return why the request is blocked, or None if it may go through
+        if resource_type == "document":
+            # never block a navigation
+            return None
+        if resource_type in self.blocked_types:
+            return resource_type
+        if self.block_trackers and is_tracker(url):
+            return "tracker"
+        if self.block_third_party and not is_first_party(url):
+            return "third-party"
+        if resource_type in self.first_party_only_types and not is_first_party(url):
+            return f"third-party {resource_type}"
+        return None
+
+_HEAVY_TYPES = frozenset({"image", "media", "font"})
+
+POLICIES = {
+    "allow_all": ResourcePolicy("allow_all"),
+    # the login page keeps third party scripts - the CAPTCHA widgets are served from other hosts
+    "login": ResourcePolicy("login", blocked_types=frozenset({"media", "font"}), block_trackers=True),
+    "home": ResourcePolicy("home", blocked_types=_HEAVY_TYPES, block_trackers=True),
+    "search_results": ResourcePolicy(
+        "search_results", blocked_types=_HEAVY_TYPES, block_trackers=True, block_third_party=True
+    ),
+    # product images stay, they are what the product screenshots are for
+    "product": ResourcePolicy(
+        "product", blocked_types=frozenset({"media", "font"}), block_trackers=True, block_third_party=True
+    ),
+    "cart": ResourcePolicy(
+        "cart",
+        blocked_types=_HEAVY_TYPES,
+        block_trackers=True,
+        first_party_only_types=frozenset({"xhr", "fetch"}),
+    ),
+}
+
+# context -> NetworkBlocker attached to it
+_blockers = {}
+
+class NetworkBlocker:
+    # one route on the whole context. every request is judged by the policy of the
+    # page object that currently drives its tab (see BasePage.network_policy)
+
+    def __init__(self, default_policy:str = "allow_all"):
+        self.default_policy = POLICIES[default_policy]
+        self._page_policies = {}
+        self.blocked = Counter()
+        self.allowed = 0
+
+    def attach(self, context):
+        context.route("**/*", self._handle)
+        _blockers[context] = self
+        return self
+
+    def attach_async(self, context):
+        # for playwright.async_api contexts - returns the coroutine to await
+        _blockers[context] = self
+        return context.route("**/*", self._handle_async)
+
+    def detach(self, context):
+        # take the route off again, so a context that outlives the blocker (e.g. a reused one)
+        # does not keep paying for a handler nobody reads
+        if _blockers.pop(context, None) is not self:
+            return
+        try:
+            context.unroute("**/*", self._handle)
+        except PlaywrightError as exc:
+            # the context / browser is already gone, and the route with it
+            logger.debug("NetworkBlocker: unroute failed: %s", exc)
+
+    async def detach_async(self, context):
+        # detach() for playwright.async_api contexts
+        if _blockers.pop(context, None) is not self:
+            return
+        try:
+            await context.unroute("**/*", self._handle_async)
+        except PlaywrightError as exc:
+            logger.debug("NetworkBlocker: unroute failed: %s", exc)
+
+    def use_policy(self, page, policy_name:str):
+        if page not in self._page_policies:
+            page.once("close", lambda _: self._page_policies.pop(page, None))
+        self._page_policies[page] = POLICIES[policy_name]
+
+    def _verdict(self, request):
+        try:
+            policy = self._page_policies.get(request.frame.page, self.default_policy)
+        except PlaywrightError:
+            # service worker requests have no frame
+            policy = self.default_policy
+        reason = policy.verdict(request.resource_type, request.url)
+        if reason:
+            self.blocked[f"{policy.name}: {reason}"] += 1
+        else:
+            self.allowed += 1
+        return reason
+
+    def _handle(self, route):
+        if self._verdict(route.request):
+            route.abort("blockedbyclient")
+        else:
+            # fallback (not continue) so other routes on the context still see the request
+            route.fallback()
+
+    async def _handle_async(self, route):
+        if self._verdict(route.request):
+            await route.abort("blockedbyclient")
+        else:
+            await route.fallback()
+
+    def summary(self) -> str:
+        total_blocked = sum(self.blocked.values())
+        details = ", ".join(f"{reason}={count}" for reason, count in self.blocked.most_common())
+        return f"blocked {total_blocked} requests, allowed {self.allowed}" + (f" ({details})" if details else "")
+
+def activate(page, policy_name:str | None):
+    # switch the tab to the policy of a page type, no-op when the context has no blocker
+    if not policy_name:
+        return
+    blocker = _blockers.get(page.context)
+    if blocker is not None:
+        blocker.use_policy(page, policy_name)
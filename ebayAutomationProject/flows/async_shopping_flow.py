@@ -0,0 +1,453 @@
+import asyncio
+import weakref
+
+from core import config
+from pages.async_shop_pages import AsyncLoginPage, AsyncHomePage, AsyncProductPage, AsyncCartPage, AsyncSearchResultsPage
+import time
+
+from playwright.async_api import Error as PlaywrightError
+from utils.product_cache import canonical_item_url
+from utils.product_prescreen import prescreen_async
+from flows.shopping_flow import (
+    ADDED,
+    ERROR,
+    NEEDS_VARIATION,
+    NO_ADD_TO_CART,
+    PRESCREEN_SPARE_FACTOR,
+    SKIPPED,
+    AddToCartResult,
+    _known_viability,
+    _record_prescreen,
+    _cached_search,
+    _record_added,
+    _release_budget,
+    _reserve_budget,
+    _skip_reason,
+    _store_search,
+    auth_cache,
+    cart_ledger,
+    forget_cart_ledger,
+    item_index,
+    product_facts,
+    reconcile_with_cart,
+    screenshots,
+)
+
+# async version of flows/shopping_flow.py - same steps, used by the concurrent scenario runner
+
+async def login(page, username:str, password:str, user_key:str | None = None):
+
+    # reuse a saved login of this user if its auth cookies are still valid
+    if user_key:
+        state = auth_cache.load(user_key)
+        if state:
+            await page.context.set_storage_state(state)
+            print(f"Reusing cached login for user {user_key}")
+            return True
+
+    login_page = AsyncLoginPage(page)
+    logged_in = await login_page.login_full_seq(username, password)
+
+    if logged_in and user_key:
+        auth_cache.save(user_key, await page.context.storage_state())
+    return logged_in
+
+async def _open_search_results(page, query:str, max_price:float):
+    result_page = AsyncSearchResultsPage(page)
+
+    # url mode: one navigation straight to filtered results, the home page is the fallback
+    mode = config.get_search_mode()
+    if mode != "url" or not await result_page.open_search(query, max_price):
+        mode = "ui"
+        home_page = AsyncHomePage(page)
+        result_page = await home_page.search_for(query)
+
+        # wait for results and use the price filter
+        await result_page.is_loaded()
+        await result_page.apply_max_price_filter(max_price)
+    return result_page, mode
+
+async def prescreen_items(page, item_urls:list[str], max_price:float | None, limit:int) -> list[str]:
+    # see shopping_flow.prescreen_items - here the unknown pages are fetched concurrently
+    if not config.get_prescreen_enabled():
+        return item_urls[:limit]
+
+    known = {url: _known_viability(url) for url in item_urls}
+    to_fetch = [url for url, viable in known.items() if viable is None]
+    for result in await prescreen_async(page.context.request, to_fetch, max_price):
+        _record_prescreen(result)
+        known[result.url] = result.viable
+        if not result.viable:
+            print(f"pre-check dropped {result.url}: {result.reason}")
+    return [url for url in item_urls if known[url]][:limit]
+
+async def search_items_by_name_under_price(page, query:str, max_price:float, limit:int, max_pages:int = 5):
+    wanted = limit * PRESCREEN_SPARE_FACTOR if config.get_prescreen_enabled() else limit
+
+    item_urls = _cached_search(query, max_price, wanted, max_pages)
+    if item_urls is not None:
+        print(f"Query '{query}' – search results cache hit, {len(item_urls)} item URLs")
+    else:
+        result_page, mode = await _open_search_results(page, query, max_price)
+        item_urls = await result_page.collect_items_under_price_across_pages(max_price, wanted, max_pages)
+        _store_search(result_page, query, max_price, mode)
+
+    for url in item_urls:
+        item_index.add(url, source=query)
+    item_urls = await prescreen_items(page, item_urls, max_price, limit)
+    print(f"Query '{query}' – requested limit={limit}, max_price={max_price}")
+    print(f"Collected {len(item_urls)} item URLs")
+    return item_urls
+
+# event loop -> cart key -> asyncio.Lock (see cart_lock / budget_lock)
+cart_locks = weakref.WeakKeyDictionary()
+budget_locks = weakref.WeakKeyDictionary()
+
+def _loop_lock(locks_by_loop, key) -> asyncio.Lock:
+    # locks belong to the event loop that uses them, so they are kept per loop
+    locks = locks_by_loop.setdefault(asyncio.get_running_loop(), {})
+    return locks.setdefault(key, asyncio.Lock())
+
+def budget_lock(cart_key) -> asyncio.Lock:
+    # held while an add checks the cart budget and reserves its price (see _reserve_budget_async)
+    return _loop_lock(budget_locks, cart_key)
+
+async def _reserve_budget_async(price:float | None, cart_key, max_cart_total:float | None) -> str | None:
+    # tabs and stream workers of a cart add at the same time: the check and the reservation
+    # happen under the cart's budget lock, so two adds can not both take the last of the budget
+    async with budget_lock(cart_key):
+        return _reserve_budget(price, cart_key, max_cart_total)
+
+async def _save_product_screenshot(page, scenario:str | None, item_id:str | None, status:str):
+    # see shopping_flow._save_product_screenshot
+    path = await screenshots.capture_async(page, scenario, item_id, ok=status in (ADDED, SKIPPED))
+    if path is not None:
+        print(f"saving screenshot: {path}")
+
+async def _add_product_to_cart(product_page, url:str, index:int, total:int, cart_key,
+                               max_cart_total:float | None = None, scenario:str | None = None) -> bool:
+    item_id = item_index.add(url)
+    skip_reason = _skip_reason(item_id, cart_key)
+    if skip_reason:
+        print(f"skipping product {index}/{total} (item {item_id}): {skip_reason}")
+        return False
+
+    print(f"openning product {index}/{total}")
+    await product_page.open(url)
+    status = await _add_open_product(product_page, item_id, index, total, cart_key, max_cart_total)
+    await _save_product_screenshot(product_page.page, scenario, item_id, status)
+    return status == ADDED
+
+async def _add_open_product(product_page, item_id:str | None, index:int, total:int, cart_key,
+                            max_cart_total:float | None = None) -> str:
+    if not await product_page.is_loaded():
+        print(f"Product page {index}/{total} did not fully load")
+    has_add_to_cart = await product_page.has_add_to_cart_button()
+    price = await product_page.get_price() or None
+    product_facts.put(
+        item_id,
+        price=price,
+        has_add_to_cart=has_add_to_cart,
+        needs_variation=await product_page.needs_variation(),
+    )
+    if not has_add_to_cart:
+        print(f"no add to cart button visible for product {index}")
+        return NO_ADD_TO_CART
+    over_budget = await _reserve_budget_async(price, cart_key, max_cart_total)
+    if over_budget:
+        print(f"skipping product {index}/{total}: {over_budget}")
+        return SKIPPED
+
+    status = ERROR
+    try:
+        if await product_page.add_to_cart_full_seq():
+            _record_added(product_page, item_id, price, cart_key)
+            status = ADDED
+    except Exception as e:
+        print(f"Exception while adding to cart for product {index}: {e}")
+    finally:
+        _release_budget(price, cart_key, max_cart_total)
+    return status
+
+async def add_items_to_cart(page, item_urls:list[str], cart_key=None, max_cart_total:float | None = None,
+                            scenario:str | None = None):
+
+    cart_key = cart_key or page.context
+
+    product_page = AsyncProductPage(page)
+    if not item_urls:
+        print("add_items_to_cart has been called with an empty list")
+        return
+
+    total = len(item_urls)
+    for index, url in enumerate(item_urls, start=1):
+        await _add_product_to_cart(product_page, url, index, total, cart_key, max_cart_total, scenario)
+
+async def _add_in_tab(context, url:str, item_id:str | None, timeout_ms:float, cart_key,
+                     max_cart_total:float | None = None, scenario:str | None = None) -> AddToCartResult:
+    started = time.monotonic()
+    tab = await context.new_page()
+    tab.set_default_timeout(timeout_ms)
+    try:
+        product_page = AsyncProductPage(tab)
+        await product_page.open(url)
+        if not await product_page.is_loaded(timeout=int(timeout_ms)):
+            return AddToCartResult(url, item_id, ERROR, "product page did not load", time.monotonic() - started)
+
+        has_add_to_cart = await product_page.has_add_to_cart_button()
+        needs_variation = await product_page.needs_variation()
+        price = await product_page.get_price() or None
+        product_facts.put(
+            item_id,
+            price=price,
+            has_add_to_cart=has_add_to_cart,
+            needs_variation=needs_variation,
+        )
+        over_budget = await _reserve_budget_async(price, cart_key, max_cart_total) if has_add_to_cart else None
+        if not has_add_to_cart:
+            status, detail = NO_ADD_TO_CART, ""
+        elif over_budget:
+            status, detail = SKIPPED, over_budget
+        else:
+            try:
+                if await product_page.add_to_cart_full_seq():
+                    _record_added(product_page, item_id, price, cart_key)
+                    status, detail = ADDED, ""
+                elif needs_variation:
+                    status, detail = NEEDS_VARIATION, "variation could not be selected"
+                else:
+                    signal = product_page.last_cart_signal
+                    status, detail = ERROR, signal.detail if signal else "no cart confirmation"
+            finally:
+                _release_budget(price, cart_key, max_cart_total)
+        await _save_product_screenshot(tab, scenario, item_id, status)
+    except PlaywrightError as exc:
+        status, detail = ERROR, str(exc).splitlines()[0]
+    finally:
+        await tab.close()
+    return AddToCartResult(url, item_id, status, detail, time.monotonic() - started)
+
+async def add_items_to_cart_in_tabs(page, item_urls:list[str], tabs:int | None = None,
+                                    item_timeout:float | None = None, cart_key=None,
+                                    max_cart_total:float | None = None,
+                                    scenario:str | None = None) -> list[AddToCartResult]:
+
+    # see shopping_flow.add_items_to_cart_in_tabs - here the "tabs" products run fully in parallel,
+    # and an item that takes longer than item_timeout seconds is cancelled (its tab closed)
+    tabs = max(1, tabs or config.get_cart_tabs())
+    item_timeout = item_timeout or config.get_item_timeout()
+    cart_key = cart_key or page.context
+    limiter = asyncio.Semaphore(tabs)
+
+    async def one(url:str) -> AddToCartResult:
+        item_id = item_index.add(url)
+        skip_reason = _skip_reason(item_id, cart_key)
+        if skip_reason:
+            return AddToCartResult(url, item_id, SKIPPED, skip_reason)
+        async with limiter:
+            started = time.monotonic()
+            try:
+                return await asyncio.wait_for(
+                    _add_in_tab(page.context, url, item_id, item_timeout * 1000, cart_key, max_cart_total, scenario),
+                    item_timeout,
+                )
+            except asyncio.TimeoutError:
+                return AddToCartResult(url, item_id, ERROR, f"timed out after {item_timeout:.0f}s",
+                                       time.monotonic() - started)
+
+    results = await asyncio.gather(*(one(url) for url in item_urls))
+    for index, result in enumerate(results, start=1):
+        print(f"product {index}/{len(results)}: {result.status} {result.detail}".rstrip())
+
+    cart_page = AsyncCartPage(page)
+    await cart_page.open()
+    contents = await cart_page.get_cart_contents()
+    for note in cart_ledger(cart_key).reconcile(contents):
+        print(f"cart ledger: {note}")
+    return reconcile_with_cart(list(results), contents.item_ids)
+
+async def stream_items_into_cart(page, query:str, max_price:float, limit:int, max_pages:int = 5,
+                                 workers:int = 2, queue_size:int | None = None, cart_key=None,
+                                 max_cart_total:float | None = None, scenario:str | None = None):
+
+    # producer/consumer version of search + add to cart. the producer puts qualifying urls on a
+    # bounded queue as each results page is parsed (a full queue pauses it - backpressure), and
+    # "workers" product tabs take urls off the queue. once "limit" items are confirmed in the cart
+    # the producer and the workers are cancelled, so the remaining pages are never fetched.
+    # a worker only starts an item while confirmed + in progress < limit, so the cart never gets more.
+    # returns the urls that were added
+    cart_key = cart_key or page.context
+    # one tab and one end of stream marker per worker - the two counts must agree
+    workers = max(1, workers)
+    queue = asyncio.Queue(maxsize=queue_size or workers * 2)
+    added: list[str] = []
+    in_progress = 0
+    slots = asyncio.Condition()
+    done = asyncio.Event()
+
+    cached_urls = _cached_search(query, max_price, None, max_pages)
+    result_page = mode = None
+    if cached_urls is None:
+        result_page, mode = await _open_search_results(page, query, max_price)
+    else:
+        print(f"Query '{query}' – search results cache hit, {len(cached_urls)} item URLs")
+
+    async def produce():
+        urls = result_page.iter_qualifying_urls(max_price, max_pages) if result_page else None
+        try:
+            if urls is None:
+                for url in cached_urls:
+                    await queue.put(url)
+            else:
+                async for url in urls:
+                    await queue.put(url)
+        except Exception as e:
+            # a broken search ends the stream, the workers finish what is queued
+            print(f"Search stream for '{query}' stopped: {e}")
+        finally:
+            if urls is not None:
+                await urls.aclose()
+        # end of the stream, one marker per worker
+        for _ in range(workers):
+            await queue.put(None)
+
+    async def work(tab):
+        nonlocal in_progress
+        product_page = AsyncProductPage(tab)
+        while not done.is_set():
+            async with slots:
+                await slots.wait_for(lambda: done.is_set() or len(added) + in_progress < limit)
+                if done.is_set():
+                    return
+                in_progress += 1
+                # the cart slot this item goes for (confirmed + in progress) - never above limit
+                slot = len(added) + in_progress
+            url = await queue.get()
+            ok = False
+            try:
+                if url is None:
+                    return
+                item_index.add(url, source=query)
+                ok = await _add_product_to_cart(product_page, url, slot, limit, cart_key, max_cart_total, scenario)
+            finally:
+                async with slots:
+                    in_progress -= 1
+                    if ok:
+                        added.append(url)
+                        if len(added) >= limit:
+                            done.set()
+                    slots.notify_all()
+
+    tabs = [await page.context.new_page() for _ in range(workers)]
+    producer = asyncio.ensure_future(produce())
+    consumers = [asyncio.ensure_future(work(tab)) for tab in tabs]
+    try:
+        await asyncio.gather(*consumers)
+    finally:
+        done.set()
+        for task in [producer, *consumers]:
+            task.cancel()
+        await asyncio.gather(producer, *consumers, return_exceptions=True)
+        for tab in tabs:
+            await tab.close()
+        if result_page is not None:
+            _store_search(result_page, query, max_price, mode)
+
+    print(f"Query '{query}' – {len(added)}/{limit} items added to the cart")
+    return added
+
+async def reset_cart(page, cart_key=None):
+    # see shopping_flow.reset_cart
+    cart_key = cart_key or page.context
+    cart_page = AsyncCartPage(page)
+    before = await cart_page.clear()
+    remaining = await cart_page.get_cart_contents()
+    if cart_page.cleared:
+        print(f"Cart reset: {len(before.lines)} lines removed")
+    else:
+        print(f"Cart reset: {len(remaining.lines)} of {len(before.lines)} lines could not be removed")
+
+    product_facts.forget_cart(cart_key)
+    forget_cart_ledger(cart_key)
+    for item_id in remaining.item_ids:
+        product_facts.mark_in_cart(item_id, cart_key)
+    cart_ledger(cart_key).reconcile(remaining)
+    return before
+
+async def restore_cart(page, contents, cart_key=None) -> list[str]:
+    # see shopping_flow.restore_cart
+    await reset_cart(page, cart_key)
+    cart_key = cart_key or page.context
+    product_page = AsyncProductPage(page)
+    failed = []
+    for line in contents.lines:
+        if not line.item_id:
+            continue
+        added = 0
+        for _ in range(line.qty):
+            try:
+                if await product_page.add_to_cart_full_seq(canonical_item_url(line.item_id), line.variation_values or None):
+                    _record_added(product_page, line.item_id, line.unit_price, cart_key)
+                    added += 1
+            except PlaywrightError as exc:
+                print(f"Could not restore item {line.item_id}: {exc}")
+        if added < line.qty:
+            failed.append(line.item_id)
+    print(f"Cart restored: {len(contents.lines) - len(failed)}/{len(contents.lines)} lines")
+    return failed
+
+async def assert_cart_total_not_exceeds_limit(page, max_total:float, cart_key=None):
+    # see shopping_flow.assert_cart_total_not_exceeds_limit
+    ledger = cart_ledger(cart_key or page.context)
+    assert ledger.total <= max_total, f"Cart total {ledger.total} (ledger) exceeds maximum allowed {max_total}"
+
+    cart_page = AsyncCartPage(page)
+    await cart_page.open()
+    contents = await cart_page.get_cart_contents()
+    for note in ledger.reconcile(contents):
+        print(f"cart ledger: {note}")
+    total = contents.total
+    assert total <= max_total, f"Cart total {total} exceeds maximum allowed {max_total}"
+
+def cart_lock(cart_key) -> asyncio.Lock:
+    # one eBay cart per user, and one ledger per cart: scenarios of the same user that run at the
+    # same time take turns on it, or their budget checks and reconciles would mix each other's items.
+    return _loop_lock(cart_locks, cart_key)
+
+async def run_scenario(page, scenario:dict, creds:dict, stream:bool = False):
+    # the whole e2e scenario from data/test_scenarios.json on one page.
+    # login, search and the pre-check run right away, whatever other scenarios do. the cart
+    # changes (reset, add, check, restore) hold the user's cart_lock, so a scenario of the same
+    # user never empties or refills the cart under this one.
+    # stream=True searches and adds as one stream (see stream_items_into_cart) - the search is then
+    # part of the cart changes and runs under the lock too
+    user_key = scenario.get("userKey", "defaultUser")
+    name = scenario.get("scenarioName", scenario["query"])
+    limit = scenario.get("limit", 5)
+    logged_in = await login(page, creds["username"], creds["password"], user_key)
+    assert logged_in, f"Login failed for user {user_key}"
+
+    if not stream:
+        item_urls = await search_items_by_name_under_price(
+            page, scenario["query"], scenario["maxPrice"], limit, scenario.get("maxPages", 5)
+        )
+
+    async with cart_lock(user_key):
+        # start from an empty cart - scenarios of the same user share it
+        previous_cart = await reset_cart(page, user_key) if config.get_reset_cart() else None
+        try:
+            if stream:
+                added = await stream_items_into_cart(
+                    page, scenario["query"], scenario["maxPrice"], limit, scenario.get("maxPages", 5),
+                    cart_key=user_key, max_cart_total=scenario["maxCartTotal"], scenario=name,
+                )
+            else:
+                results = await add_items_to_cart_in_tabs(
+                    page, item_urls, cart_key=user_key, max_cart_total=scenario["maxCartTotal"], scenario=name,
+                )
+                added = [result.url for result in results if result.status == ADDED]
+            await assert_cart_total_not_exceeds_limit(page, scenario["maxCartTotal"], user_key)
+        finally:
+            if previous_cart is not None and config.get_restore_cart():
+                await restore_cart(page, previous_cart, user_key)
+    return added
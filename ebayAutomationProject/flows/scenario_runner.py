@@ -0,0 +1,71 @@
+import asyncio
+import logging
+import time
+
+from playwright.async_api import async_playwright
+
+from core import config
+from core.network_policy import NetworkBlocker
+from core.har_mode import attach_har_async
+from flows import async_shopping_flow
+
+logger = logging.getLogger(__name__)
+
+# runs several scenarios at the same time, each in its own context of one shared browser.
+# a semaphore bounds how many run at once, so the total wall clock time follows
+# the slowest scenario instead of the sum of all of them.
+
+async def _run_one(browser, semaphore, scenario:dict, users:dict, stream:bool = False):
+    name = scenario.get("scenarioName", scenario["query"])
+    result = {"scenarioName": name, "passed": False, "error": None, "itemUrls": [], "seconds": 0.0}
+
+    async with semaphore:
+        started = time.perf_counter()
+        profile = config.get_profile()
+        context = await browser.new_context(**profile.context_options())
+        profile.apply_timeouts(context)
+        blocker = NetworkBlocker()
+        try:
+            # record/replay first, the blocker route has to be registered after it
+            await attach_har_async(context, name)
+            if profile.block_resources:
+                await blocker.attach_async(context)
+
+            creds = users[scenario.get("userKey", "defaultUser")]
+            page = await context.new_page()
+            result["itemUrls"] = await async_shopping_flow.run_scenario(page, scenario, creds, stream)
+            result["passed"] = True
+        except Exception as exc:
+            # one failing scenario must not cancel the others
+            result["error"] = f"{type(exc).__name__}: {exc}"
+            logger.warning("Scenario %r failed: %s", name, result["error"])
+        finally:
+            await blocker.detach_async(context)
+            await context.close()
+            result["seconds"] = round(time.perf_counter() - started, 2)
+
+    result["network"] = blocker.summary()
+    print(f"Scenario '{name}' finished in {result['seconds']}s (passed={result['passed']})")
+    return result
+
+async def run_scenarios(scenarios:list[dict], users:dict, concurrency:int = 3, stream:bool = False,
+                        **launch_options):
+    # returns one result dict per scenario, in the same order as the scenarios
+    # stream: search and add to cart as one stream (see async_shopping_flow.run_scenario)
+    # launch options default to the active execution profile, keyword arguments override it
+    semaphore = asyncio.Semaphore(max(1, int(concurrency)))
+    launch_options = {**config.get_profile().launch_options(), **launch_options}
+
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(**launch_options)
+        try:
+            return await asyncio.gather(
+                *(_run_one(browser, semaphore, scenario, users, stream) for scenario in scenarios)
+            )
+        finally:
+            await browser.close()
+
+def run_scenarios_concurrently(scenarios:list[dict], users:dict, concurrency:int = 3, stream:bool = False,
+                               **launch_options):
+    # blocking entry point for sync callers (pytest, scripts)
+    return asyncio.run(run_scenarios(scenarios, users, concurrency, stream, **launch_options))
@@ -1,73 +1,545 @@
-from pathlib import Path
+import math
+import time
+import weakref
+from collections import deque
+from typing import NamedTuple
+
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError, Error as PlaywrightError
 from pages.shop_pages import LoginPage, SearchResultsPage, ProductPage, CartPage, HomePage
+from core import config
 from utils import price_parser
+from utils.auth_state_cache import AuthStateCache
+from utils.candidate_table import CandidateTable
+from utils.cart_ledger import CartLedger
+from utils.product_cache import ItemIndex, ProductFactCache, canonical_item_url
+from utils.product_prescreen import PrescreenResult, prescreen
+from utils.screenshot_writer import ScreenshotWriter
+from utils.search_cache import SearchResultsCache
+
+# saved logins shared by every scenario of the run
+auth_cache = AuthStateCache()
+
+# every product url seen in the run by item id, and what its product page showed
+item_index = ItemIndex()
+product_facts = ProductFactCache()
+
+# extracted search results on disk, shared by runs (see utils/search_cache.py)
+search_cache = SearchResultsCache()
+
+# product screenshots, captured on the flow thread and written in the background
+screenshots = ScreenshotWriter()
+
+# cart key -> what we confirmed into that cart (see utils/cart_ledger.py). user carts start over
+# in reset_cart, anonymous carts are keyed by their browser context and go away with it
+cart_ledgers = {}
+context_ledgers = weakref.WeakKeyDictionary()
+
+def _ledgers_of(cart_key):
+    return cart_ledgers if isinstance(cart_key, str) else context_ledgers
+
+def cart_ledger(cart_key) -> CartLedger:
+    return _ledgers_of(cart_key).setdefault(cart_key, CartLedger())
+
+def forget_cart_ledger(cart_key):
+    # the cart was emptied, the next cart_ledger(cart_key) is a new ledger
+    _ledgers_of(cart_key).pop(cart_key, None)
+
+def _cached_search_modes() -> list[str]:
+    # results are stored under the mode that actually ran (see _store_search). url mode falls back
+    # to the home page search box when the direct url does not land on results, so a url mode read
+    # also accepts what that fallback stored - otherwise every fallback run would miss the cache
+    mode = config.get_search_mode()
+    return [mode, "ui"] if mode == "url" else [mode]
+
+def _cached_search(query:str, max_price:float, limit:int | None, max_pages:int) -> list[str] | None:
+    # the item urls of a fresh cached search (the best "limit", or all of them for limit=None),
+    # None when the browser has to search
+    for mode in _cached_search_modes():
+        pages, complete = search_cache.get_pages(query, max_price, SearchResultsPage.search_filters(mode))
+        if not pages:
+            continue
+        candidates = CandidateTable.from_pages(pages)
+        # the cached pages must answer the question the browser would: enough items,
+        # or every page the search had / we would have read
+        enough = limit is not None and candidates.count_qualifying(max_price) >= limit
+        if complete or len(pages) >= max_pages or enough:
+            return candidates.best_urls(max_price, limit)
+    return None
+
+def _store_search(result_page, query:str, max_price:float, mode:str):
+    filters = SearchResultsPage.search_filters(mode)
+    for page_number, cards in getattr(result_page, "result_pages", {}).items():
+        search_cache.put_page(query, max_price, filters, page_number, cards, is_last=page_number == result_page.last_page)
+
+# per item outcome of the multi-tab add to cart
+ADDED = "added"
+NEEDS_VARIATION = "needs_variation"
+NO_ADD_TO_CART = "no_add_to_cart"
+ERROR = "error"
+SKIPPED = "skipped"
+
+class AddToCartResult(NamedTuple):
+    url: str
+    item_id: str | None
+    status: str
+    detail: str = ""
+    seconds: float = 0.0
+
+def reconcile_with_cart(results:list[AddToCartResult], cart_item_ids) -> list[AddToCartResult]:
+    # the cart page has the last word: an "added" item missing from the cart becomes an error,
+    # and an item that timed out or looked failed but is in the cart becomes "added"
+    in_cart = set(cart_item_ids)
+    reconciled = []
+    for result in results:
+        if result.status == ADDED and result.item_id not in in_cart:
+            result = result._replace(status=ERROR, detail="confirmed but missing from the cart")
+        elif result.status in (ERROR, NEEDS_VARIATION) and result.item_id in in_cart:
+            result = result._replace(status=ADDED, detail=f"found in the cart ({result.status}: {result.detail})")
+        reconciled.append(result)
+    return reconciled
+
+def _over_budget(price:float | None, cart_key, max_cart_total:float | None) -> str | None:
+    # why adding an item at "price" would break the cart budget, None when it fits
+    ledger = cart_ledger(cart_key)
+    if ledger.fits(price, max_cart_total):
+        return None
+    if price is None:
+        return f"price unknown, cannot keep the cart under {max_cart_total}"
+    if ledger.unpriced:
+        return f"{ledger.unpriced} items of unknown price in the cart, cannot keep it under {max_cart_total}"
+    return f"{price} would take the cart over {max_cart_total} (at {ledger.total})"
+
+def _reserve_budget(price:float | None, cart_key, max_cart_total:float | None) -> str | None:
+    # _over_budget, and when the item fits its price is held in the ledger until _release_budget,
+    # so the next add (another tab or worker) is checked against it too
+    over_budget = _over_budget(price, cart_key, max_cart_total)
+    if over_budget is None and max_cart_total is not None:
+        cart_ledger(cart_key).reserve(price)
+    return over_budget
+
+def _release_budget(price:float | None, cart_key, max_cart_total:float | None):
+    # after the add was recorded or failed
+    if max_cart_total is not None:
+        cart_ledger(cart_key).release(price)
 
-def login(page, username:str, password:str):
+def _record_added(product_page, item_id:str | None, price:float | None, cart_key):
+    # a confirmed add to cart: the item is in this cart, at the price of the variation we picked if any
+    product_facts.mark_in_cart(item_id, cart_key)
+    variation = product_page.last_variation
+    if variation is not None and variation.price is not None:
+        price = variation.price
+    cart_ledger(cart_key).add(item_id, price)
+
+def _skip_reason(item_id:str | None, cart_key) -> str | None:
+    # why a product page visit is not needed, None when it is
+    if product_facts.is_in_cart(item_id, cart_key):
+        return "already in the cart"
+    facts = product_facts.get(item_id)
+    if facts is not None and facts.is_unbuyable:
+        return "known to have no Add to cart"
+    return None
+
+def login(page, username:str, password:str, user_key:str | None = None):
+
+    # reuse a saved login of this user if its auth cookies are still valid
+    if user_key:
+        state = auth_cache.load(user_key)
+        if state:
+            # the whole saved state, not only its cookies: eBay keeps part of the signed in
+            # session in localStorage ("origins"), which add_cookies would drop
+            page.context.set_storage_state(state)
+            print(f"Reusing cached login for user {user_key}")
+            return True
 
     login_page = LoginPage(page)
+    logged_in = login_page.login_full_seq(username, password)
+
+    # save the session so the next scenario of this user skips the login sequence
+    if logged_in and user_key:
+        auth_cache.save(user_key, page.context.storage_state())
     #return boolean result of page object
-    return login_page.login_full_seq(username, password)
+    return logged_in
+
+def _open_search_results(page, query:str, max_price:float):
+    # the first page of filtered results, and which search mode got us there
+    result_page = SearchResultsPage(page)
+
+    # url mode: one navigation straight to filtered results, the home page is the fallback
+    mode = config.get_search_mode()
+    if mode != "url" or not result_page.open_search(query, max_price):
+        mode = "ui"
+        home_page = HomePage(page)
+        result_page = home_page.search_for(query)
+
+        # wait for results and use the orice filter
+        result_page.is_loaded()
+        result_page.apply_max_price_filter(max_price)
+    return result_page, mode
+
+# with the http pre-check on, the search returns this many candidates per wanted item
+PRESCREEN_SPARE_FACTOR = 2
+
+def _record_prescreen(result:PrescreenResult):
+    # what the raw page said goes into the product facts, so no other scenario fetches it again
+    if result.has_add_to_cart is not None:
+        product_facts.put(result.item_id, price=result.price, has_add_to_cart=result.has_add_to_cart)
 
-def search_items_by_name_under_price(page, query:str, max_price:float, limit:int):
-    home_page = HomePage(page)
-    result_page = HomePage.search_for(query)
+def _known_viability(url:str) -> bool | None:
+    # True/False when the product facts already answer, None when the page has to be fetched
+    facts = product_facts.get(item_index.add(url))
+    if facts is None or facts.has_add_to_cart is None:
+        return None
+    return not facts.is_unbuyable
 
-    # wait for results and use the orice filter
-    result_page.is_loaded()
-    result_page.apply_max_price_filter(max_price)
+def prescreen_items(page, item_urls:list[str], max_price:float | None, limit:int) -> list[str]:
+    # the first "limit" urls (in the order given) whose raw product page looks buyable: not an
+    # auction, not ended or sold out, not over max_price. fetched with the context's request api,
+    # one at a time in the sync api, and only until "limit" viable items were found
+    if not config.get_prescreen_enabled():
+        return item_urls[:limit]
 
-    item_urls = result_page.collect_items_under_price_accross_pages(max_price, limit)
+    viable = []
+    for url in item_urls:
+        if len(viable) >= limit:
+            break
+        known = _known_viability(url)
+        if known is None:
+            result = prescreen(page.context.request, [url], max_price)[0]
+            _record_prescreen(result)
+            known = result.viable
+            if not known:
+                print(f"pre-check dropped {url}: {result.reason}")
+        if known:
+            viable.append(url)
+    return viable
+
+def search_items_by_name_under_price(page, query:str, max_price:float, limit:int, max_pages:int = 5):
+
+    # spare candidates for the ones the http pre-check drops
+    wanted = limit * PRESCREEN_SPARE_FACTOR if config.get_prescreen_enabled() else limit
+
+    # a fresh cached search skips the browser search entirely
+    item_urls = _cached_search(query, max_price, wanted, max_pages)
+    if item_urls is not None:
+        print(f"Query '{query}' – search results cache hit, {len(item_urls)} item URLs")
+    else:
+        result_page, mode = _open_search_results(page, query, max_price)
+        item_urls = result_page.collect_items_under_price_across_pages(max_price, wanted, max_pages)
+        _store_search(result_page, query, max_price, mode)
+
+    for url in item_urls:
+        item_index.add(url, source=query)
+    item_urls = prescreen_items(page, item_urls, max_price, limit)
     print(f"Query '{query}' – requested limit={limit}, max_price={max_price}")
     print(f"Collected {len(item_urls)} item URLs")
     return item_urls
 
-def add_items_to_cart(page, item_urls:list[str]):
+def _save_product_screenshot(page, scenario:str | None, item_id:str | None, status:str):
+    # the page as the add to cart left it (the error message, the missing button...), once the
+    # outcome is known - the capture policy keeps failures, and all or some of the rest
+    path = screenshots.capture(page, scenario, item_id, ok=status in (ADDED, SKIPPED))
+    if path is not None:
+        print(f"saving screenshot: {path}")
+
+def _add_product_to_cart(page, product_page, url:str, index:int, total:int, cart_key,
+                         max_cart_total:float | None = None, scenario:str | None = None) -> bool:
+    # open one product and add it to the cart. True when the cart confirmed it
+    item_id = item_index.add(url)
+    skip_reason = _skip_reason(item_id, cart_key)
+    if skip_reason:
+        print(f"skipping product {index}/{total} (item {item_id}): {skip_reason}")
+        return False
+
+    print(f"openning product {index}/{total}")
+    product_page.open(url)
+    status = _add_open_product(product_page, item_id, index, total, cart_key, max_cart_total)
+    _save_product_screenshot(page, scenario, item_id, status)
+    return status == ADDED
+
+def _add_open_product(product_page, item_id:str | None, index:int, total:int, cart_key,
+                      max_cart_total:float | None = None) -> str:
+    # add the product open in product_page to the cart, returns ADDED, NO_ADD_TO_CART, SKIPPED or ERROR
+
+    # make sure the page is fully loaded
+    if not product_page.is_loaded():
+        print(f"Product page {index}/{total} did not fully load")
+    has_add_to_cart = product_page.has_add_to_cart_button()
+    price = product_page.get_price() or None
+    product_facts.put(
+        item_id,
+        price=price,
+        has_add_to_cart=has_add_to_cart,
+        needs_variation=product_page.needs_variation(),
+    )
+    # add to cart
+    if not has_add_to_cart:
+        print(f"no add to cart button visible for product {index}")
+        return NO_ADD_TO_CART
+    over_budget = _reserve_budget(price, cart_key, max_cart_total)
+    if over_budget:
+        print(f"skipping product {index}/{total}: {over_budget}")
+        return SKIPPED
+
+    print(f"Add to Cart button FOUND for product {index} – clicking it")
+    status = ERROR
+    try:
+        if product_page.add_to_cart_full_seq():
+            _record_added(product_page, item_id, price, cart_key)
+            status = ADDED
+        print(f"Finished add_to_cart_full_seq for product {index}")
+    except Exception as e:
+        print(f"Exception while adding to cart for product {index}: {e}")
+    finally:
+        _release_budget(price, cart_key, max_cart_total)
+    return status
+
+def add_items_to_cart(page, item_urls:list[str], cart_key=None, max_cart_total:float | None = None,
+                      scenario:str | None = None):
+
+    # cart_key: whose cart this is (the user key). anonymous carts belong to the browser context
+    # max_cart_total: items that would take the cart (as far as the ledger knows) over it are skipped
+    # scenario: names the screenshots of this run (see utils/screenshot_writer.py)
+    cart_key = cart_key or page.context
 
     product_page = ProductPage(page)
     if not item_urls:
         print("add_items_to_cart has been called with an empty list")
         return
 
-    photos_dir = Path("photos")
-    photos_dir.mkdir(exist_ok=True)
-
     total = len(item_urls)
 
     for index, url in enumerate(item_urls, start=1):
-        print(f"openning product {index}/{total}")
-        product_page.open(url)
+        _add_product_to_cart(page, product_page, url, index, total, cart_key, max_cart_total, scenario)
+
+def _start_product_tab(context, url:str, timeout_ms:float):
+    # a new tab that starts loading the product right away (see SearchResultsPage._start_results_page)
+    tab = context.new_page()
+    tab.set_default_timeout(timeout_ms)
+    ProductPage(tab)  # network policy and popup handlers for the tab
+    try:
+        tab.evaluate("url => { location.href = url; }", url)
+    except PlaywrightError:
+        pass
+    return tab
+
+class ItemDeadline:
+    # one time budget for everything done for an item in a tab. every wait is given what is left
+    # of it (left_ms), so the waits of one item add up to "seconds" at most, not "seconds" each
+
+    def __init__(self, tab, seconds:float):
+        self.tab = tab
+        self.seconds = seconds
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def expired(self) -> bool:
+        return self.elapsed >= self.seconds
+
+    def left_ms(self) -> int:
+        # the ms left, also made the tab's default for the waits that take no timeout argument.
+        # raises a playwright TimeoutError once nothing is left
+        # rounded up, so a wait that uses all of it ends past the deadline and counts as expired
+        left = math.ceil((self.seconds - self.elapsed) * 1000)
+        if left <= 0:
+            raise PlaywrightTimeoutError(f"no time left of {self.seconds:.0f}s")
+        self.tab.set_default_timeout(left)
+        self.tab.set_default_navigation_timeout(left)
+        return left
+
+def _finish_product_tab(tab, url:str, item_id:str | None, index:int, timeout:float,
+                        cart_key, max_cart_total:float | None = None, scenario:str | None = None) -> AddToCartResult:
+    # add the product loading in "tab" to the cart and say what happened. the item's "timeout" seconds
+    # start now that its turn has come, not when its tab started loading in the background
+    deadline = ItemDeadline(tab, timeout)
+    status, detail = ERROR, ""
+    try:
+        tab.wait_for_url(lambda current: "/itm/" in current, timeout=deadline.left_ms())
+        product_page = ProductPage(tab)
+        if not product_page.is_loaded(timeout=deadline.left_ms()):
+            detail = "product page did not load"
+        else:
+            has_add_to_cart = product_page.has_add_to_cart_button()
+            needs_variation = product_page.needs_variation()
+            price = product_page.get_price() or None
+            product_facts.put(
+                item_id,
+                price=price,
+                has_add_to_cart=has_add_to_cart,
+                needs_variation=needs_variation,
+            )
+            over_budget = _reserve_budget(price, cart_key, max_cart_total) if has_add_to_cart else None
+            if not has_add_to_cart:
+                status = NO_ADD_TO_CART
+            elif over_budget:
+                status, detail = SKIPPED, over_budget
+            else:
+                try:
+                    if product_page.add_to_cart_full_seq(timeout=deadline.left_ms()):
+                        _record_added(product_page, item_id, price, cart_key)
+                        status = ADDED
+                    elif needs_variation:
+                        detail = "variation could not be selected"
+                        status = NEEDS_VARIATION
+                    else:
+                        signal = product_page.last_cart_signal
+                        detail = signal.detail if signal else "no cart confirmation"
+                finally:
+                    _release_budget(price, cart_key, max_cart_total)
+    except PlaywrightError as exc:
+        detail = str(exc).splitlines()[0]
+
+    seconds = deadline.elapsed
+    # a timeout is reported only when the item's deadline is what cut it short
+    if status in (ERROR, NEEDS_VARIATION) and deadline.expired:
+        status, detail = ERROR, f"timed out after {timeout:.0f}s" + (f" ({detail})" if detail else "")
+    _save_product_screenshot(tab, scenario, item_id, status)
+    return AddToCartResult(url, item_id, status, detail, seconds)
+
+def add_items_to_cart_in_tabs(page, item_urls:list[str], tabs:int | None = None, item_timeout:float | None = None,
+                              cart_key=None, max_cart_total:float | None = None,
+                              scenario:str | None = None) -> list[AddToCartResult]:
+
+    # add to cart with "tabs" products loading at once in tabs of the same context (same cookies,
+    # same cart). the product pages download in parallel, the add to cart clicks run one tab at a time.
+    # each item gets item_timeout seconds from its turn for all its waits together (ItemDeadline).
+    # returns one AddToCartResult
+    # per url in the order given, reconciled with the cart page at the end
+    tabs = max(1, tabs or config.get_cart_tabs())
+    item_timeout = item_timeout or config.get_item_timeout()
+    cart_key = cart_key or page.context
+
+    results = {}
+    waiting = deque()
+    for index, url in enumerate(item_urls, start=1):
+        item_id = item_index.add(url)
+        skip_reason = _skip_reason(item_id, cart_key)
+        if skip_reason:
+            results[index] = AddToCartResult(url, item_id, SKIPPED, skip_reason)
+        else:
+            waiting.append((index, url, item_id))
 
-        try:
-            existing = len(list(photos_dir.glob("product_*.png")))
-            screenshot_path = photos_dir / f"{existing +1}.png"
+    loading = deque()
+    try:
+        while waiting or loading:
+            while waiting and len(loading) < tabs:
+                index, url, item_id = waiting.popleft()
+                tab = _start_product_tab(page.context, url, item_timeout * 1000)
+                loading.append((index, url, item_id, tab))
 
+            index, url, item_id, tab = loading.popleft()
             try:
-                page.screenshot(path= str(screenshot_path),full_page=True)
-
-            except Exception:
-                #fallback
-                page.screenshot(path=str(screenshot_path))
-
-            print(f"saved screenshot: {screenshot_path}")
-        except Exception as e:
-            print(f"could't save screenshot for product: {index}:{e}")
-
-        # make sure the page is fully loaded
-        if not product_page.is_loaded():
-            print(f"Product page {index}/{total} did not fully load")
-        # add to cart
-        if product_page.has_add_to_cart_button():
-            print(f"Add to Cart button FOUND for product {index} – clicking it")
+                results[index] = _finish_product_tab(tab, url, item_id, index, item_timeout, cart_key,
+                                                     max_cart_total, scenario)
+            finally:
+                tab.close()
+            print(f"product {index}/{len(item_urls)}: {results[index].status} {results[index].detail}".rstrip())
+    finally:
+        for _, _, _, tab in loading:
             try:
-                product_page.add_to_cart_full_seq()
-                print(f"Finished add_to_cart_full_seq for product {index}")
-            except Exception as e:
-                print(f"Exception while adding to cart for product {index}: {e}")
-        else:
-            print(f"no add to cart button visible for product {index}")
+                tab.close()
+            except PlaywrightError:
+                pass
+
+    ordered = [results[index] for index in sorted(results)]
+    cart_page = CartPage(page)
+    cart_page.open()
+    contents = cart_page.get_cart_contents()
+    for note in cart_ledger(cart_key).reconcile(contents):
+        print(f"cart ledger: {note}")
+    return reconcile_with_cart(ordered, contents.item_ids)
+
+def search_and_add_to_cart(page, query:str, max_price:float, limit:int, max_pages:int = 5, cart_key=None,
+                           max_cart_total:float | None = None, scenario:str | None = None):
+
+    # search and add to cart as one stream: products are opened while the next results pages
+    # are still downloading, and the search stops once "limit" items are confirmed in the cart.
+    # an item that turns out unbuyable just means one more url is pulled from the stream.
+    # returns the urls that were added
+    cart_key = cart_key or page.context
+    product_page = ProductPage(page)
+    added: list[str] = []
+
+    cached_urls = _cached_search(query, max_price, None, max_pages)
+    if cached_urls is not None:
+        print(f"Query '{query}' – search results cache hit, {len(cached_urls)} item URLs")
+        stream, result_page, mode = iter(cached_urls), None, None
+    else:
+        result_page, mode = _open_search_results(page, query, max_price)
+        stream = result_page.iter_qualifying_urls(max_price, max_pages)
+
+    try:
+        for url in stream:
+            item_index.add(url, source=query)
+            # printed as the cart slot the item goes for, never above limit
+            if _add_product_to_cart(page, product_page, url, len(added) + 1, limit, cart_key, max_cart_total, scenario):
+                added.append(url)
+            if len(added) >= limit:
+                break
+    finally:
+        if result_page is not None:
+            stream.close()
+            _store_search(result_page, query, max_price, mode)
+
+    print(f"Query '{query}' – {len(added)}/{limit} items added to the cart")
+    return added
+
+def reset_cart(page, cart_key=None):
+    # empty the cart before a scenario, so maxCartTotal is checked against this scenario's items only
+    # (every scenario logs in as the same user, the cart would keep growing across scenarios and runs).
+    # returns what was in the cart, for restore_cart
+    cart_key = cart_key or page.context
+    cart_page = CartPage(page)
+    before = cart_page.clear()
+    remaining = cart_page.get_cart_contents()
+    if cart_page.cleared:
+        print(f"Cart reset: {len(before.lines)} lines removed")
+    else:
+        print(f"Cart reset: {len(remaining.lines)} of {len(before.lines)} lines could not be removed")
+
+    # what we know about the cart follows it
+    product_facts.forget_cart(cart_key)
+    forget_cart_ledger(cart_key)
+    for item_id in remaining.item_ids:
+        product_facts.mark_in_cart(item_id, cart_key)
+    cart_ledger(cart_key).reconcile(remaining)
+    return before
+
+def restore_cart(page, contents, cart_key=None) -> list[str]:
+    # put a cart back the way reset_cart found it: empty it, then add every line of "contents"
+    # (CartContents) again with its variation and quantity. returns the item ids that did not make it
+    reset_cart(page, cart_key)
+    cart_key = cart_key or page.context
+    product_page = ProductPage(page)
+    failed = []
+    for line in contents.lines:
+        if not line.item_id:
+            continue
+        added = 0
+        for _ in range(line.qty):
+            try:
+                if product_page.add_to_cart_full_seq(canonical_item_url(line.item_id), line.variation_values or None):
+                    _record_added(product_page, line.item_id, line.unit_price, cart_key)
+                    added += 1
+            except PlaywrightError as exc:
+                print(f"Could not restore item {line.item_id}: {exc}")
+        if added < line.qty:
+            failed.append(line.item_id)
+    print(f"Cart restored: {len(contents.lines) - len(failed)}/{len(contents.lines)} lines")
+    return failed
+
+def assert_cart_total_not_exceeds_limit(page, max_total:float, cart_key=None):
+    # the ledger kept the running total while adding - the cart page is read once, to cross-check it
+    ledger = cart_ledger(cart_key or page.context)
+    assert ledger.total <= max_total, f"Cart total {ledger.total} (ledger) exceeds maximum allowed {max_total}"
 
-def assert_cart_total_not_exceeds_limit(page, max_total:float):
     cart_page = CartPage(page)
     cart_page.open()
-    total = cart_page.get_cart_total()
-    assert total <= max_total, f"Cart total {total} exceeds maximum allowed {max_total}"
\ No newline at end of file
+    contents = cart_page.get_cart_contents()
+    for note in ledger.reconcile(contents):
+        print(f"cart ledger: {note}")
+    total = contents.total
+    assert total <= max_total, f"Cart total {total} exceeds maximum allowed {max_total}"
@@ -0,0 +1,5 @@
+from local_ebay.server import LocalEbayServer
+
+def start_server(host:str = "127.0.0.1", port:int = 0, latency_ms:int = 0) -> LocalEbayServer:
+    # start the stand-in in a background thread, port 0 picks a free port
+    return LocalEbayServer(host, port, latency_ms).start()
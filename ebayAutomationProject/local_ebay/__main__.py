@@ -0,0 +1,25 @@
+import argparse
+
+from local_ebay.server import LocalEbayServer
+
+# python -m local_ebay --port 8000
+# then run the tests against it with EBAY_BASE_URL=http://127.0.0.1:8000
+
+def main():
+    parser = argparse.ArgumentParser(description="local eBay stand-in for load and benchmark runs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency-ms", type=int, default=0, help="delay added to every response")
+    args = parser.parse_args()
+
+    server = LocalEbayServer(args.host, args.port, args.latency_ms)
+    print(f"local eBay stand-in listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
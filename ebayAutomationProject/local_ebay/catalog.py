@@ -0,0 +1,118 @@
+import random
+import zlib
+
+# deterministic fake listings. the same query always returns the same items,
+# and an item id always maps back to the same listing, across server restarts.
+
+ADJECTIVES = ["Lightweight", "Premium", "Classic", "Pro", "Compact", "Deluxe", "Sport", "Eco", "Ultra", "Vintage"]
+BRANDS = ["Acme", "Nimbus", "Zephyr", "Orion", "Vertex", "Kodiak", "Lumen", "Apex", "Solace", "Tundra"]
+SIZES = ["6", "7", "8", "9", "10", "11", "12"]
+COLORS = ["Black", "White", "Blue", "Red", "Grey"]
+
+# product page layouts eBay has served over the years (see ProductPage)
+LAYOUTS = ("legacy", "redesign", "x_testid")
+
+ITEMS_PER_QUERY = 300
+FIRST_ITEM_ID = 100_000_000_000
+
+
+class Listing:
+
+    def __init__(self, item_id:int, title:str, rng:random.Random):
+        self.item_id = item_id
+        self.title = title
+        self.price = round(rng.uniform(4, 400), 2)
+        self.shipping = 0.0 if rng.random() < 0.5 else round(rng.choice([2.99, 4.99, 5.99, 8.5, 12.99]), 2)
+
+        roll = rng.random()
+        # auction listings have no Add to cart, only Place bid
+        self.is_auction = roll < 0.15
+        # ended or sold out Buy It Now listings
+        self.is_available = not (0.15 <= roll < 0.22)
+        self.is_sponsored = rng.random() < 0.1
+        self.layout = LAYOUTS[item_id % len(LAYOUTS)]
+
+        # variation listings: option matrix with a price and a stock flag per combination
+        self.dimensions = {}
+        self.combinations = []
+        if not self.is_auction and rng.random() < 0.25:
+            self.dimensions["Size"] = rng.sample(SIZES, rng.randint(3, 5))
+            if rng.random() < 0.5:
+                self.dimensions["Color"] = rng.sample(COLORS, rng.randint(2, 3))
+            self._build_combinations(rng)
+
+    def _build_combinations(self, rng:random.Random):
+        combos = [{}]
+        for name, values in self.dimensions.items():
+            combos = [dict(combo, **{name: value}) for combo in combos for value in values]
+        # some combinations cost more and some are sold out, but at least one stays buyable
+        for combo in combos:
+            combo_price = round(self.price * rng.choice([1, 1, 1.1, 1.25]), 2)
+            self.combinations.append({"values": combo, "price": combo_price, "in_stock": rng.random() > 0.3})
+        if not any(combo["in_stock"] for combo in self.combinations):
+            self.combinations[0]["in_stock"] = True
+        self.price = min(combo["price"] for combo in self.combinations)
+
+    @property
+    def max_price(self) -> float:
+        if not self.combinations:
+            return self.price
+        return max(combo["price"] for combo in self.combinations)
+
+    @property
+    def is_range_price(self) -> bool:
+        return self.max_price > self.price
+
+    def find_combination(self, values:dict) -> dict | None:
+        for combo in self.combinations:
+            if combo["values"] == values:
+                return combo
+        return None
+
+    def option_in_stock(self, name:str, value:str) -> bool:
+        return any(combo["in_stock"] for combo in self.combinations if combo["values"].get(name) == value)
+
+
+def _seed(text:str) -> int:
+    return zlib.crc32(text.lower().strip().encode("utf-8"))
+
+# every listing ever generated, so /itm/<id> serves the same title the results showed
+_listings: dict[int, Listing] = {}
+
+def listing_for_id(item_id:int) -> Listing:
+    listing = _listings.get(item_id)
+    if listing is None:
+        rng = random.Random(item_id)
+        listing = Listing(item_id, f"{rng.choice(BRANDS)} {rng.choice(ADJECTIVES)} item {item_id}", rng)
+        _listings[item_id] = listing
+    return listing
+
+def listings_for_query(query:str) -> list[Listing]:
+    # the "best match" order for a query
+    seed = _seed(query)
+    base_id = FIRST_ITEM_ID + (seed % 1_000_000) * 1_000
+    words = query.strip() or "item"
+
+    listings = []
+    for index in range(ITEMS_PER_QUERY):
+        item_id = base_id + index
+        listing = _listings.get(item_id)
+        if listing is None:
+            rng = random.Random(seed * 7919 + index)
+            title = f"{rng.choice(BRANDS)} {rng.choice(ADJECTIVES)} {words.title()} #{index + 1}"
+            listing = Listing(item_id, title, rng)
+            _listings[item_id] = listing
+        listings.append(listing)
+    return listings
+
+def search(query:str, max_price:float | None = None, buy_it_now:bool = False, sort:str | None = None) -> list[Listing]:
+    results = listings_for_query(query)
+    if max_price is not None:
+        # like eBay: the lowest price of a range has to be under the limit, shipping is not included
+        results = [listing for listing in results if listing.price <= max_price]
+    if buy_it_now:
+        results = [listing for listing in results if not listing.is_auction]
+    if sort == "15":
+        # price + shipping: lowest first
+        results = sorted(results, key=lambda listing: listing.price + listing.shipping)
+    return results
@@ -0,0 +1,549 @@
+import html
+import json
+import logging
+import threading
+import time
+import uuid
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from local_ebay import catalog
+
+logger = logging.getLogger(__name__)
+
+# a local stand-in for the parts of eBay the page objects touch: home page search box,
+# sign in, search results with price filter and pagination, product pages in three layouts
+# with variations, and a real in-memory cart per browser context (cart cookie).
+
+ITEMS_PER_PAGE_CHOICES = (60, 120, 240)
+
+# 1x1 transparent png, served for every listing image
+PIXEL_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082"
+)
+
+def _money(value:float) -> str:
+    return f"US ${value:,.2f}"
+
+def _esc(text) -> str:
+    return html.escape(str(text), quote=True)
+
+
+class CartStore:
+    # cart id (cookie) -> lines. a line is one listing + one variation combination
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._carts: dict[str, dict] = {}
+
+    def lines(self, cart_id:str) -> list[dict]:
+        with self._lock:
+            return [dict(line) for line in self._carts.get(cart_id, {}).values()]
+
+    def count(self, cart_id:str) -> int:
+        return sum(line["qty"] for line in self.lines(cart_id))
+
+    def add(self, cart_id:str, listing:catalog.Listing, variation:dict, price:float):
+        key = f"{listing.item_id}|{json.dumps(variation, sort_keys=True)}"
+        with self._lock:
+            cart = self._carts.setdefault(cart_id, {})
+            if key in cart:
+                cart[key]["qty"] += 1
+            else:
+                cart[key] = {
+                    "key": key,
+                    "itemId": str(listing.item_id),
+                    "title": listing.title,
+                    "variation": variation,
+                    "price": price,
+                    "shipping": listing.shipping,
+                    "qty": 1,
+                }
+
+    def remove(self, cart_id:str, key:str) -> bool:
+        with self._lock:
+            return self._carts.get(cart_id, {}).pop(key, None) is not None
+
+    def clear(self, cart_id:str):
+        with self._lock:
+            self._carts.pop(cart_id, None)
+
+
+def _header(signed_in:bool, cart_count:int, query:str = "") -> str:
+    greeting = (
+        '<span id="gh-ug">Hi <b>tester</b>!</span> <a title="My eBay" href="/myb">My eBay</a>'
+        if signed_in
+        else '<a id="gh-signin" href="/signin">Sign in</a>'
+    )
+    return f"""
+<header id="gh">
+  <a id="gh-logo" href="/">eBay</a>
+  {greeting}
+  <form id="gh-f" action="/sch/i.html" method="get">
+    <input id="gh-ac" name="_nkw" type="text" placeholder="Search for anything" value="{_esc(query)}">
+    <input id="gh-btn" type="submit" value="Search">
+  </form>
+  <a id="gh-cart" href="/cart">Cart <span id="gh-cart-n">{cart_count or ""}</span></a>
+</header>"""
+
+def _document(title:str, header:str, body:str) -> str:
+    return f"""<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>{_esc(title)} | eBay</title></head>
+<body>{header}
+{body}
+</body></html>"""
+
+def _tracking_url(listing:catalog.Listing, position:int) -> str:
+    # result links carry tracking params like the real site, the same item shows up under different urls
+    params = urlencode({"hash": f"item{listing.item_id:x}:g:{position}", "amdata": f"enc:{position}"})
+    return f"/itm/{listing.item_id}?{params}"
+
+def _price_text(listing:catalog.Listing) -> str:
+    if listing.is_range_price:
+        return f"{_money(listing.price)} to {_money(listing.max_price)}"
+    return _money(listing.price)
+
+def _shipping_text(listing:catalog.Listing) -> str:
+    return "Free shipping" if listing.shipping == 0 else f"+{_money(listing.shipping)} shipping"
+
+def _result_card(listing:catalog.Listing, position:int) -> str:
+    url = _tracking_url(listing, position)
+    if listing.is_auction:
+        purchase = f'<span class="s-item__bids s-item__bidCount">{position % 9} bids</span>'
+    else:
+        purchase = '<span class="s-item__purchase-options s-item__purchaseOptionsWithIcon">Buy It Now</span>'
+    sponsored = '<span class="s-item__sep"><span role="text">Sponsored</span></span>' if listing.is_sponsored else ""
+    return f"""
+<li class="s-item s-item__pl-on-bottom" data-listing-id="{listing.item_id}">
+  <div class="s-item__wrapper">
+    <div class="s-item__image"><a href="{_esc(url)}"><img src="/img/{listing.item_id}.png" alt=""></a></div>
+    <div class="s-item__info">
+      <a class="s-item__link" href="{_esc(url)}"><div class="s-item__title"><span role="heading">{_esc(listing.title)}</span></div></a>
+      <div class="s-item__details">
+        <div class="s-item__detail"><span class="s-item__price">{_price_text(listing)}</span></div>
+        <div class="s-item__detail">{purchase}</div>
+        <div class="s-item__detail"><span class="s-item__shipping s-item__logisticsCost">{_shipping_text(listing)}</span></div>
+      </div>
+      {sponsored}
+    </div>
+  </div>
+</li>"""
+
+def _variation_controls(listing:catalog.Listing) -> str:
+    controls = []
+    for index, (name, values) in enumerate(listing.dimensions.items(), start=1):
+        options = ['<option value="">- Select -</option>']
+        for value in values:
+            if listing.option_in_stock(name, value):
+                options.append(f'<option value="{_esc(value)}">{_esc(value)}</option>')
+            else:
+                options.append(f'<option value="{_esc(value)}" disabled>{_esc(value)} (Out of stock)</option>')
+        controls.append(
+            f'<div class="x-msku__box"><label for="msku-sel-{index}">{_esc(name)}</label>'
+            f'<select id="msku-sel-{index}" class="msku-sel" name="{_esc(name)}">{"".join(options)}</select></div>'
+        )
+    return "\n".join(controls)
+
+def _msku_model(listing:catalog.Listing) -> dict:
+    # the option matrix the way eBay embeds it in product pages: menus of value ids, and a
+    # variation (price + stock) per combination of value ids joined by "_" in menu order
+    menus, values, value_ids = [], {}, {}
+    for menu_id, (name, options) in enumerate(listing.dimensions.items()):
+        ids = []
+        for value in options:
+            value_id = str(len(values))
+            values[value_id] = {"valueId": value_id, "valueName": value, "displayName": value}
+            value_ids[(name, value)] = value_id
+            ids.append(value_id)
+        menus.append({"menuId": str(menu_id), "displayLabel": name, "menuItemValueIds": ids})
+
+    variations, combinations = {}, {}
+    for variation_id, combo in enumerate(listing.combinations):
+        key = "_".join(value_ids[(name, value)] for name, value in combo["values"].items())
+        combinations[key] = str(variation_id)
+        variations[str(variation_id)] = {
+            "binModel": {"price": {"value": {"value": combo["price"], "currency": "USD"}}},
+            "quantity": {"outOfStock": not combo["in_stock"]},
+        }
+    return {
+        "selectMenus": menus,
+        "menuItemMap": values,
+        "variationsMap": variations,
+        "variationCombinations": combinations,
+    }
+
+def _msku_script(listing:catalog.Listing) -> str:
+    if not listing.combinations:
+        return ""
+    return f'<script type="application/json" id="vi-msku">{json.dumps({"MSKU": _msku_model(listing)})}</script>'
+
+def _product_body(listing:catalog.Listing) -> str:
+    title = _esc(listing.title)
+    price = _price_text(listing)
+
+    if listing.is_auction:
+        action = '<a id="bidBtn_btn" class="btn btn-prim" href="#">Place bid</a>'
+    elif not listing.is_available:
+        action = '<div class="d-statusmessage" role="alert">This listing has ended or is out of stock.</div>'
+    elif listing.layout == "legacy":
+        action = '<a id="isCartBtn_btn" class="btn btn-prim" href="#" data-atc="1">Add to cart</a>'
+    elif listing.layout == "redesign":
+        action = '<button id="atcRedesignId_btn" class="ux-call-to-action" data-atc="1">Add to cart</button>'
+    else:
+        action = '<button data-testid="x-atc-action" class="ux-call-to-action" data-atc="1">Add to cart</button>'
+
+    if listing.layout == "legacy":
+        heading = f'<h1 class="it-ttl" itemprop="name">{title}</h1>'
+        price_html = f'<span id="prcIsum" itemprop="price">{price}</span>'
+    elif listing.layout == "redesign":
+        heading = f'<h1 class="x-item-title__mainTitle" itemprop="name"><span class="ux-textspans">{title}</span></h1>'
+        price_html = f'<div class="x-price-primary"><span class="ux-textspans">{price}</span></div>'
+    else:
+        heading = f'<h1 data-testid="x-item-title"><span class="ux-textspans">{title}</span></h1>'
+        price_html = f'<div class="x-price-primary" data-testid="x-price-primary"><span class="ux-textspans">{price}</span></div>'
+
+    availability = "https://schema.org/InStock" if listing.is_available else "https://schema.org/OutOfStock"
+    structured = {
+        "@context": "https://schema.org",
+        "@type": "Product",
+        "name": listing.title,
+        "sku": str(listing.item_id),
+        "offers": {
+            "@type": "AuctionOffer" if listing.is_auction else "Offer",
+            "price": f"{listing.price:.2f}",
+            "priceCurrency": "USD",
+            "availability": availability,
+        },
+    }
+
+    return f"""
+<main id="mainContent" data-item-id="{listing.item_id}">
+  {heading}
+  {price_html}
+  <div class="ux-labels-values--shipping"><span class="ux-textspans">{_shipping_text(listing)}</span></div>
+  {_variation_controls(listing)}
+  <div id="atc-error" class="ux-message--error" role="alert" hidden></div>
+  {action}
+  <div id="atc-layer" class="lightbox-dialog" role="dialog" hidden>
+    <h2>Added to cart</h2>
+    <a href="/cart" class="btn">View cart</a>
+    <button id="atc-layer-close" aria-label="Close">Close</button>
+  </div>
+</main>
+<script type="application/ld+json">{json.dumps(structured)}</script>
+{_msku_script(listing)}
+<script>
+document.addEventListener("click", async (event) => {{
+  const button = event.target.closest("[data-atc]");
+  if (!button) return;
+  event.preventDefault();
+  const error = document.getElementById("atc-error");
+  const selects = [...document.querySelectorAll("select.msku-sel")];
+  const missing = selects.find((select) => !select.value);
+  if (missing) {{
+    error.textContent = "Please select a " + missing.name;
+    error.hidden = false;
+    return;
+  }}
+  const variation = Object.fromEntries(selects.map((select) => [select.name, select.value]));
+  const response = await fetch("/cart/add", {{
+    method: "POST",
+    headers: {{"Content-Type": "application/json"}},
+    body: JSON.stringify({{itemId: "{listing.item_id}", variation}}),
+  }});
+  const data = await response.json();
+  if (data.status === "SUCCESS") {{
+    error.hidden = true;
+    document.getElementById("gh-cart-n").textContent = data.cartCount;
+    document.getElementById("atc-layer").hidden = false;
+  }} else {{
+    error.textContent = data.message;
+    error.hidden = false;
+  }}
+}});
+document.getElementById("atc-layer-close").addEventListener("click", () => {{
+  document.getElementById("atc-layer").hidden = true;
+}});
+</script>"""
+
+def _cart_body(lines:list[dict]) -> str:
+    if not lines:
+        return """
+<div id="Cart">
+  <h1>Shopping cart</h1>
+  <div class="empty-cart"><h2 class="empty-cart__title">You don't have any items in your cart.</h2></div>
+</div>"""
+
+    rows = []
+    for line in lines:
+        variation = ", ".join(f"{name}: {value}" for name, value in line["variation"].items())
+        shipping = "Free shipping" if line["shipping"] == 0 else f"Shipping {_money(line['shipping'])}"
+        rows.append(f"""
+  <div class="cart-bucket" data-item-id="{line['itemId']}" data-line-key="{_esc(line['key'])}">
+    <a class="item-title" href="/itm/{line['itemId']}">{_esc(line['title'])}</a>
+    <span class="item-variations">{_esc(variation)}</span>
+    <span class="item-qty" data-qty="{line['qty']}">Qty {line['qty']}</span>
+    <span class="item-price">{_money(line['price'] * line['qty'])}</span>
+    <span class="item-shipping">{shipping}</span>
+    <button data-test-id="cart-remove-item" data-line-key="{_esc(line['key'])}">Remove</button>
+  </div>""")
+
+    subtotal = sum(line["price"] * line["qty"] for line in lines)
+    shipping_total = sum(line["shipping"] for line in lines)
+    return f"""
+<div id="Cart">
+  <h1>Shopping cart</h1>
+  {"".join(rows)}
+  <div class="cart-summary">
+    <div class="cart-summary-line">Subtotal <span id="SUBTOTAL">{_money(subtotal)}</span></div>
+    <div class="cart-summary-line">Shipping <span id="SHIPPING">{_money(shipping_total)}</span></div>
+  </div>
+</div>
+<script>
+document.addEventListener("click", async (event) => {{
+  const button = event.target.closest("[data-test-id='cart-remove-item']");
+  if (!button) return;
+  await fetch("/cart/remove", {{
+    method: "POST",
+    headers: {{"Content-Type": "application/json"}},
+    body: JSON.stringify({{key: button.dataset.lineKey}}),
+  }});
+  button.closest(".cart-bucket").remove();
+  location.reload();
+}});
+</script>"""
+
+def _signin_body() -> str:
+    return """
+<main id="mainContent">
+  <h1>Sign in to your account</h1>
+  <form id="signin-form" method="post" action="/signin">
+    <input id="userid" name="userid" type="text" autocomplete="username">
+    <input id="pass" name="pass" type="password" autocomplete="current-password">
+    <button id="sgnBt" type="submit">Sign in</button>
+  </form>
+</main>"""
+
+def _results_body(query:str, params:dict) -> str:
+    max_price = _float_param(params, "_udhi")
+    results = catalog.search(
+        query,
+        max_price=max_price,
+        buy_it_now=params.get("LH_BIN") == "1",
+        sort=params.get("_sop"),
+    )
+    per_page = _int_param(params, "_ipg", 60)
+    if per_page not in ITEMS_PER_PAGE_CHOICES:
+        per_page = 60
+    page_number = max(1, _int_param(params, "_pgn", 1))
+
+    start = (page_number - 1) * per_page
+    page_results = results[start:start + per_page]
+    # the first card of a real results page is a placeholder that is not a listing
+    cards = ['<li class="s-item s-item--placeholder"><a href="/itm/123456">Shop on eBay</a></li>']
+    cards += [_result_card(listing, start + offset + 1) for offset, listing in enumerate(page_results)]
+
+    pagination = ""
+    if start + per_page < len(results):
+        next_params = dict(params, _pgn=str(page_number + 1))
+        pagination = f'<a class="pagination__next" aria-label="Next page" href="/sch/i.html?{_esc(urlencode(next_params))}">Next</a>'
+
+    return f"""
+<main id="mainContent">
+  <h1 class="srp-controls__count-heading">{len(results)} results for {_esc(query)}</h1>
+  <form class="x-refine__price" action="/sch/i.html" method="get">
+    <input type="hidden" name="_nkw" value="{_esc(query)}">
+    <input name="_udlo" type="text" aria-label="Minimum Value">
+    <input name="_udhi" type="text" aria-label="Maximum Value" value="{_esc(params.get('_udhi', ''))}">
+  </form>
+  <ul class="srp-results srp-list clearfix">{"".join(cards)}</ul>
+  <nav class="pagination" aria-label="Results Pagination">{pagination}</nav>
+</main>"""
+
+def _float_param(params:dict, name:str):
+    try:
+        return float(params[name])
+    except (KeyError, ValueError):
+        return None
+
+def _int_param(params:dict, name:str, default:int) -> int:
+    try:
+        return int(params[name])
+    except (KeyError, ValueError):
+        return default
+
+
+class LocalEbayHandler(BaseHTTPRequestHandler):
+
+    server_version = "LocalEbay/1.0"
+
+    def log_message(self, format, *args):
+        logger.debug("local_ebay: " + format, *args)
+
+    # request helpers
+
+    def _cookies(self) -> SimpleCookie:
+        return SimpleCookie(self.headers.get("Cookie", ""))
+
+    def _cart_id(self) -> str:
+        morsel = self._cookies().get("cartid")
+        if morsel is not None:
+            return morsel.value
+        if not hasattr(self, "_new_cart_id"):
+            self._new_cart_id = uuid.uuid4().hex
+        return self._new_cart_id
+
+    def _signed_in(self) -> bool:
+        return "ds2" in self._cookies()
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            return json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return {}
+
+    def _send(self, status:int, body:bytes, content_type:str, extra_headers:list | None = None):
+        delay = self.server.latency_ms / 1000
+        if delay:
+            time.sleep(delay)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if hasattr(self, "_new_cart_id"):
+            self.send_header("Set-Cookie", f"cartid={self._new_cart_id}; Path=/")
+        for name, value in extra_headers or []:
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _send_html(self, title:str, body:str, query:str = "", status:int = 200):
+        cart_count = self.server.carts.count(self._cart_id())
+        document = _document(title, _header(self._signed_in(), cart_count, query), body)
+        self._send(status, document.encode("utf-8"), "text/html; charset=utf-8")
+
+    def _send_json(self, payload:dict, status:int = 200):
+        self._send(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+    def _redirect(self, location:str, extra_headers:list | None = None):
+        self._send(302, b"", "text/plain", [("Location", location)] + (extra_headers or []))
+
+    # routes
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        path = url.path.rstrip("/") or "/"
+
+        if path == "/":
+            self._send_html("Electronics, Cars, Fashion, Collectibles & More", '<main id="mainContent"></main>')
+        elif path == "/signin":
+            self._send_html("Sign in", _signin_body())
+        elif path == "/sch/i.html":
+            query = params.get("_nkw", "")
+            self._send_html(query, _results_body(query, params), query)
+        elif path.startswith("/itm/"):
+            self._get_item(path)
+        elif path == "/cart":
+            self._send_html("Shopping cart", _cart_body(self.server.carts.lines(self._cart_id())))
+        elif path.startswith("/img/"):
+            self._send(200, PIXEL_PNG, "image/png")
+        else:
+            self._send_html("Page not found", "<main id=\"mainContent\"><h1>Page not found</h1></main>", status=404)
+
+    do_HEAD = do_GET
+
+    def _get_item(self, path:str):
+        try:
+            item_id = int(path.split("/")[2])
+        except (IndexError, ValueError):
+            item_id = 0
+        if item_id < catalog.FIRST_ITEM_ID:
+            self._send_html("Item not found", "<main id=\"mainContent\"><h1>Item not found</h1></main>", status=404)
+            return
+        listing = catalog.listing_for_id(item_id)
+        self._send_html(listing.title, _product_body(listing))
+
+    def do_POST(self):
+        path = urlparse(self.path).path.rstrip("/")
+        if path == "/signin":
+            self._post_signin()
+        elif path == "/cart/add":
+            self._post_cart_add()
+        elif path == "/cart/remove":
+            removed = self.server.carts.remove(self._cart_id(), self._read_json().get("key", ""))
+            self._send_json({"status": "SUCCESS" if removed else "NOT_FOUND"})
+        else:
+            self._send_json({"status": "NOT_FOUND"}, status=404)
+
+    def _post_signin(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        form = {name: values[-1] for name, values in parse_qs(self.rfile.read(length).decode("utf-8")).items()}
+        if not form.get("userid") or not form.get("pass"):
+            self._send_html("Sign in", _signin_body(), status=401)
+            return
+        token = uuid.uuid4().hex
+        self._redirect("/", [
+            ("Set-Cookie", f"ds2=sotr/{token}; Path=/; Max-Age=86400"),
+            ("Set-Cookie", f"shs={token}; Path=/; Max-Age=86400"),
+        ])
+
+    def _post_cart_add(self):
+        payload = self._read_json()
+        try:
+            listing = catalog.listing_for_id(int(payload.get("itemId", 0)))
+        except ValueError:
+            self._send_json({"status": "ERROR", "message": "This item cannot be added to your cart"}, status=400)
+            return
+
+        if listing.is_auction or not listing.is_available:
+            self._send_json({"status": "ERROR", "message": "This item cannot be added to your cart"})
+            return
+
+        variation = payload.get("variation") or {}
+        price = listing.price
+        if listing.combinations:
+            combination = listing.find_combination(variation)
+            if combination is None:
+                self._send_json({"status": "ERROR", "message": "Please select all options"})
+                return
+            if not combination["in_stock"]:
+                self._send_json({"status": "ERROR", "message": "This item cannot be added to your cart"})
+                return
+            price = combination["price"]
+
+        cart_id = self._cart_id()
+        self.server.carts.add(cart_id, listing, variation, price)
+        self._send_json({"status": "SUCCESS", "cartCount": self.server.carts.count(cart_id)})
+
+
+class LocalEbayServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, host:str = "127.0.0.1", port:int = 0, latency_ms:int = 0):
+        super().__init__((host, port), LocalEbayHandler)
+        self.latency_ms = latency_ms
+        self.carts = CartStore()
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        # serve from a background thread, returns immediately
+        self._thread = threading.Thread(target=self.serve_forever, name="local-ebay", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
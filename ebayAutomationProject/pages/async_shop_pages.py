@@ -0,0 +1,642 @@
+from abc import ABC, abstractmethod
+from typing import List
+
+from utils.candidate_table import CandidateTable
+from utils.variation_model import VariationCombination, plan_selections
+from core import config
+from core.network_policy import activate as activate_network_policy
+from pages.cart_signals import wait_for_add_to_cart_async
+from pages.popup_watcher import DISMISS_TIMEOUT, POST_LOGIN_SELECTOR, watch_popups_async
+from pages.page_scripts import (
+    CART_HAS_NO_LINES_JS,
+    EXTRACT_CART_JS,
+    EXTRACT_SEARCH_CARDS_JS,
+    APPLY_VARIATIONS_JS,
+    LAYOUT_FINGERPRINT_JS,
+    PRODUCT_SNAPSHOT_JS,
+    REMOVE_CART_LINES_JS,
+    RESOLVE_FIRST_JS,
+    CartContents,
+    ProductSnapshot,
+    SearchCard,
+    SelectorMatch,
+)
+from pages.product_layouts import (
+    ANY_MARKER,
+    FINGERPRINT_ARGS,
+    SNAPSHOT_LAYOUTS,
+    ProductLayout,
+    layout_for,
+    layout_stats,
+)
+from pages.shop_pages import CartPage, LoginPage, ProductPage, SearchResultsPage, follow_navigations
+import asyncio
+import logging
+import time
+from collections import deque
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError, Error as PlaywrightError
+
+logger = logging.getLogger(__name__)
+
+# async twins of the page objects in pages/shop_pages.py.
+# same selectors and same public method names, so the flows read the same -
+# just awaited, which lets many scenarios share one event loop.
+
+class AsyncBasePage(ABC):
+
+    # name of the network policy (core/network_policy.py) used while this page type drives the tab
+    network_policy = "allow_all"
+
+    def __init__(self, page):
+        self.page = page
+        activate_network_policy(page, self.network_policy)
+
+    @abstractmethod
+    async def is_loaded(self) -> bool:
+        pass
+
+    async def goto(self, url):
+        activate_network_policy(self.page, self.network_policy)
+        await watch_popups_async(self.page)
+        # how long to wait for the load is part of the execution profile
+        await self.page.goto(url, wait_until=config.get_wait_strategy())
+
+    async def wait_for_visible(self, locator:str):
+        # wait until the element of the locator is visible
+        await self.page.locator(locator).wait_for(state="visible")
+
+    async def click(self, locator:str):
+        await self.page.locator(locator).click()
+
+    async def fill(self, locator:str, text:str):
+        await self.page.locator(locator).fill(text)
+
+    async def get_attribute(self, locator:str, name:str):
+        return await self.page.locator(locator).get_attribute(name)
+
+    async def get_text(self, locator:str):
+        return (await self.page.locator(locator).inner_text()).strip()
+
+    async def resolve_first(self, selectors:List[str], require:str | None = None) -> SelectorMatch | None:
+        # same as BasePage.resolve_first: the whole candidate list in one round trip
+        try:
+            result = await self.page.evaluate(RESOLVE_FIRST_JS, [list(selectors), require])
+        except PlaywrightError:
+            return None
+        return SelectorMatch(**result) if result else None
+
+
+class AsyncHomePage(AsyncBasePage):
+
+    network_policy = "home"
+
+    async def is_loaded(self):
+        try:
+            await self.wait_for_visible("input#gh-ac")
+            return True
+        except PlaywrightError:
+            return False
+
+    async def _dismiss_homepage_popups(self):
+        # the popup watcher handles them when they appear - no scanning or sleeping here
+        await watch_popups_async(self.page)
+
+    async def enter_search_term(self, query:str):
+        await self.fill("input#gh-ac", query)
+
+    async def submit_search(self):
+        match = await self.resolve_first(["input#gh-btn", "button#gh-btn", "button.btn-prim"], require="enabled")
+        if match:
+            try:
+                await self.page.locator(match.selector).first.click()
+                return
+            except PlaywrightError:
+                pass
+
+        #if it does not work, fallback to pressing "Enter"
+        try:
+            await self.page.locator("input#gh-ac").first.press("Enter")
+        except PlaywrightError:
+            raise TimeoutError("Search button not found or not clickable on the home page")
+
+    async def search_for(self, query:str):
+        try:
+            await self.goto(config.get_base_url())
+        except PlaywrightError:
+            # if the navigation fails continue on current page
+            pass
+        await self._dismiss_homepage_popups()
+        await self.is_loaded()
+        await self.enter_search_term(query)
+        await self._dismiss_homepage_popups()
+        await self.submit_search()
+
+        return AsyncSearchResultsPage(self.page)
+
+
+class AsyncLoginPage(AsyncBasePage):
+
+    network_policy = "login"
+
+    def _on_signin_page(self, url:str | None = None) -> bool:
+        # page.url is a plain property in the async api too
+        url = self.page.url if url is None else url
+        return url.startswith(config.get_signin_url().rstrip("/"))
+
+    async def is_loaded(self) -> bool:
+        try:
+            await self.wait_for_visible("input#userid")
+            return True
+        except PlaywrightError:
+            return False
+
+    async def open(self):
+        await self.goto(config.get_signin_url())
+        await self.is_loaded()
+
+    async def _fill_first_enabled(self, selectors: List[str], text: str):
+        match = await self.resolve_first(selectors, require="enabled")
+        if not match:
+            return
+        try:
+            await self.page.locator(match.selector).first.fill(text)
+        except PlaywrightError:
+            pass
+
+    async def enter_username(self, username:str):
+        await self._fill_first_enabled([
+            "input#userid",
+            "input[name='userid']",
+            "input#signin-username",
+            "input[name='email']",
+            "input#email",
+            "input[type='email']"
+        ], username)
+
+    async def enter_password(self, password:str):
+        await self._fill_first_enabled([
+            "input#pass",
+            "input[name='pass']",
+            "input[name='password']",
+            "input#password",
+            "input[type='password']"
+        ], password)
+
+    async def submit_login(self):
+        await self.click("button#sgnBt")
+
+    async def _dismiss_initial_popups(self):
+        await watch_popups_async(self.page)
+
+    async def _close_post_login_popups(self):
+        await watch_popups_async(self.page)
+
+    async def _handle_post_login_flow(self):
+        # see LoginPage._handle_post_login_flow
+        deadline = time.monotonic() + config.get_profile().navigation_timeout / 1000
+        next_screen = self.page.locator(POST_LOGIN_SELECTOR).first
+        while self._on_signin_page() and time.monotonic() < deadline:
+            try:
+                if await next_screen.is_visible():
+                    await next_screen.click(timeout=DISMISS_TIMEOUT)
+                    continue
+                await self.page.wait_for_url(
+                    lambda url: not self._on_signin_page(url), timeout=LoginPage.POST_LOGIN_POLL_MS
+                )
+            except PlaywrightError:
+                continue
+
+    async def login_full_seq(self, username:str, password:str):
+
+        await self.open()
+        await self._dismiss_initial_popups()
+
+        if await self.is_logged_in():
+            try:
+                await self.goto(config.get_base_url())
+                await self._close_post_login_popups()
+            except PlaywrightError:
+                pass
+            return True
+
+        await self.enter_username(username)
+
+        continue_button = self.page.locator(
+            "button#signin-continue-btn, button[type='submit'][id*='signin-continue']"
+        )
+        try:
+            if await continue_button.count() and await continue_button.first.is_visible():
+                await continue_button.first.click()
+                await self.page.locator(
+                    "input#pass, input[name='pass'], input[name='password'], input#password, input[type='password']"
+                ).first.wait_for(state="visible", timeout=10000)
+        except PlaywrightError:
+            pass
+
+        await self.enter_password(password)
+        await self.submit_login()
+
+        await self._handle_post_login_flow()
+        await self._close_post_login_popups()
+
+        try:
+            await self.page.goto(config.get_base_url())
+            await self._dismiss_initial_popups()
+            await self._close_post_login_popups()
+        except PlaywrightError:
+            pass
+
+        #if we are still not singed in - the login was not successful
+        if self._on_signin_page():
+            return False
+
+        return await self.is_logged_in()
+
+    async def is_logged_in(self) -> bool:
+        account_selectors = [
+            "#gh-ug",  # classic greeting container
+            "a[title*='My eBay']",
+            "a[aria-label*='My eBay']",
+            "button[aria-label*='My eBay']",
+            "a[aria-label*='חשבון']",
+            "button[aria-label*='חשבון']",
+        ]
+        try:
+            if await self.resolve_first(account_selectors, require="visible"):
+                return True
+            if self._on_signin_page():
+                return False
+            if await self.page.locator("input#userid").count():
+                return False
+            return True
+        except PlaywrightError:
+            return False
+
+
+class AsyncSearchResultsPage(AsyncBasePage):
+
+    network_policy = "search_results"
+
+    async def open_search(self, query:str, max_price:float | None = None, buy_it_now:bool = True) -> bool:
+        # see SearchResultsPage.open_search
+        url = SearchResultsPage.build_search_url(query, max_price, buy_it_now)
+        try:
+            await self.goto(url)
+        except PlaywrightError as exc:
+            print(f"Direct search url failed: {exc}")
+            return False
+        if "/sch/" not in self.page.url or not await self.is_loaded():
+            print(f"Direct search url did not land on results: {self.page.url}")
+            return False
+        return True
+
+    async def is_loaded(self):
+        try:
+            await self.wait_for_visible("main, #mainContent, ul.srp-results")
+            return True
+        except PlaywrightError:
+            return False
+
+    async def apply_max_price_filter(self, max_price:float):
+        try:
+            max_input = self.page.locator("input[name='_udhi']")
+            if await max_input.count():
+                await max_input.first.fill(str(int(max_price)))
+                await max_input.first.press("Enter")
+                await self.is_loaded()
+        except PlaywrightError:
+            #if filter is not available just continue
+            pass
+
+    async def get_item_cards_on_page(self) -> List[SearchCard]:
+        # see SearchResultsPage.get_item_cards_on_page
+        try:
+            records = await self.page.evaluate(EXTRACT_SEARCH_CARDS_JS)
+        except PlaywrightError:
+            return []
+        return [SearchCard.from_record(record) for record in records]
+
+    async def get_item_urls_on_page(self) -> List[str]:
+        return [card.url for card in await self.get_item_cards_on_page()]
+
+    async def has_next_page(self):
+        try:
+            next_button = self.page.locator("a.pagination__next, a[aria-label^='Next']")
+            if await next_button.count() == 0:
+                return False
+            return await next_button.first.is_enabled()
+        except PlaywrightError:
+            return False
+
+    async def _fetch_results_page(self, search_url:str, page_number:int) -> List[SearchCard] | None:
+        tab = await self.page.context.new_page()
+        try:
+            results = AsyncSearchResultsPage(tab)
+            await results.goto(SearchResultsPage.results_page_url(search_url, page_number))
+            await results.is_loaded()
+            return await results.get_item_cards_on_page()
+        except PlaywrightError as exc:
+            print(f"Results page {page_number} failed to load: {exc}")
+            return None
+        finally:
+            await tab.close()
+
+    async def iter_result_pages(self, max_pages:int = 5, fan_out:int | None = None, eager:bool = False):
+        # see SearchResultsPage.iter_result_pages - the prefetches are tasks, cancelled on close
+        fan_out = max(1, fan_out or config.get_pagination_fan_out())
+        search_url = self.page.url
+        self.result_pages = {1: await self.get_item_cards_on_page()}
+        self.last_page = None if await self.has_next_page() else 1
+
+        next_page = 2
+        in_flight = deque()
+
+        def _fill():
+            nonlocal next_page
+            while len(in_flight) < fan_out and next_page <= max_pages:
+                in_flight.append((next_page, asyncio.ensure_future(self._fetch_results_page(search_url, next_page))))
+                next_page += 1
+
+        try:
+            if eager and self.last_page is None:
+                _fill()
+            yield 1, self.result_pages[1]
+            if self.last_page is not None:
+                return
+
+            while True:
+                _fill()
+                if not in_flight:
+                    return
+                # merged in page order, whichever finishes first
+                page_number, task = in_flight.popleft()
+                page_cards = await task
+                if page_cards is None:
+                    return
+                self.result_pages[page_number] = page_cards
+                if not page_cards:
+                    self.last_page = page_number
+                    return
+                if eager:
+                    _fill()
+                yield page_number, page_cards
+        finally:
+            for _, task in in_flight:
+                task.cancel()
+            await asyncio.gather(*(task for _, task in in_flight), return_exceptions=True)
+
+    async def collect_items_under_price_across_pages(self, max_price:float, limit:int, max_pages:int = 5,
+                                                      fan_out:int | None = None):
+        # see SearchResultsPage.collect_items_under_price_across_pages
+        candidates = CandidateTable.empty()
+        result_pages = self.iter_result_pages(max_pages, fan_out)
+        try:
+            async for page_number, page_cards in result_pages:
+                candidates = candidates.extend(CandidateTable.from_cards(page_cards, page_number))
+                if candidates.count_qualifying(max_price) >= limit:
+                    break
+        finally:
+            await result_pages.aclose()
+        return candidates.best_urls(max_price, limit)
+
+    async def iter_qualifying_urls(self, max_price:float, max_pages:int = 5, fan_out:int | None = None):
+        # see SearchResultsPage.iter_qualifying_urls
+        seen = set()
+        result_pages = self.iter_result_pages(max_pages, fan_out, eager=True)
+        try:
+            async for page_number, page_cards in result_pages:
+                for url in CandidateTable.from_cards(page_cards, page_number).best_urls(max_price):
+                    if url not in seen:
+                        seen.add(url)
+                        yield url
+        finally:
+            await result_pages.aclose()
+
+
+class AsyncProductPage(AsyncBasePage):
+
+    network_policy = "product"
+
+    def __init__(self, page):
+        super().__init__(page)
+        self._layout = None
+        self._layout_url = None
+        self._snapshot = None
+        follow_navigations(self)
+        self.last_cart_signal = None
+        self.last_variation = None
+
+    async def detect_layout(self, timeout: int = 10_000) -> ProductLayout:
+        # see ProductPage.detect_layout
+        if self._layout is not None and self._layout_url == self.page.url:
+            return self._layout
+        try:
+            await self.page.locator(ANY_MARKER).first.wait_for(state="attached", timeout=timeout)
+        except PlaywrightError:
+            pass
+        try:
+            name = await self.page.evaluate(LAYOUT_FINGERPRINT_JS, FINGERPRINT_ARGS)
+        except PlaywrightError:
+            name = None
+        return self._set_layout(name)
+
+    def _set_layout(self, name: str | None) -> ProductLayout:
+        self._layout = layout_for(name)
+        self._layout_url = self.page.url
+        layout_stats[self._layout.name] += 1
+        return self._layout
+
+    def _on_frame_navigated(self, frame):
+        if frame == self.page.main_frame:
+            self._snapshot = None
+
+    def invalidate_snapshot(self):
+        self._snapshot = None
+
+    async def snapshot(self, refresh: bool = False) -> ProductSnapshot:
+        # see ProductPage.snapshot
+        if not refresh and self._snapshot is not None and self._snapshot.url == self.page.url:
+            return self._snapshot
+        try:
+            record = await self.page.evaluate(PRODUCT_SNAPSHOT_JS, [
+                SNAPSHOT_LAYOUTS,
+                ProductPage.variation_selectors,
+                ProductPage.variation_button_selectors,
+                list(ProductPage.error_selectors),
+            ])
+        except PlaywrightError as exc:
+            logger.debug("AsyncProductPage snapshot failed: %s", exc)
+            return ProductSnapshot.from_record({"url": self.page.url})
+        self._snapshot = ProductSnapshot.from_record(record)
+        if self._layout is None or self._layout_url != self.page.url:
+            self._set_layout(self._snapshot.layout)
+        return self._snapshot
+
+    async def open(self, url:str):
+        await self.goto(url)
+        layout = await self.detect_layout()
+        try:
+            await self.wait_for_visible(", ".join(layout.title))
+        except PlaywrightError:
+            pass
+
+    async def is_loaded(self, timeout: int = 10_000):
+        # wait for either a product title or add to cart button of the detected layout
+        layout = await self.detect_layout(timeout)
+        try:
+            await self.page.locator(", ".join(layout.title + layout.add_to_cart)).first.wait_for(
+                state="visible", timeout=timeout
+            )
+            return True
+        except PlaywrightError:
+            return False
+
+    async def get_price(self):
+        # see ProductPage.get_price
+        return (await self.snapshot()).max_price
+
+    async def has_add_to_cart_button(self) -> bool:
+        return (await self.snapshot()).has_add_to_cart
+
+    async def needs_variation(self) -> bool:
+        return bool((await self.snapshot()).variations)
+
+    async def select_cheapest_variation(self, max_price: float | None = None):
+        # see ProductPage.select_cheapest_variation
+        snapshot = await self.snapshot()
+        if not snapshot.variations:
+            return None
+        model = snapshot.variation_model
+        combination = model.cheapest_in_stock(max_price)
+        self.last_variation = combination
+        if combination is None:
+            logger.info("AsyncProductPage no in-stock variation among %d combinations: %s", len(model), self.page.url)
+            return None
+        await self._apply_variation(snapshot, combination)
+        return combination
+
+    async def select_variation(self, values: dict):
+        # see ProductPage.select_variation
+        snapshot = await self.snapshot()
+        if not snapshot.variations:
+            return None
+        combination = next(
+            (known for known in snapshot.variation_model.combinations if known.values == values),
+            VariationCombination(values, None, True),
+        )
+        self.last_variation = combination
+        await self._apply_variation(snapshot, combination)
+        return combination
+
+    async def _apply_variation(self, snapshot: ProductSnapshot, combination: VariationCombination):
+        plan = plan_selections(snapshot.variations, combination)
+        picks = [[option.selector or control.selector, None if option.selector else option.value] for control, option in plan]
+        try:
+            if picks:
+                await self.page.evaluate(APPLY_VARIATIONS_JS, picks)
+        except PlaywrightError as exc:
+            # variation fail sould not make the test as awhole fail.
+            logger.debug("AsyncProductPage ignoring exception while selecting variations: %s", exc)
+        finally:
+            self.invalidate_snapshot()
+
+    async def _click_and_wait_for_cart(self, selector: str, timeout: int = 8000) -> bool:
+        # see ProductPage._click_and_wait_for_cart
+        try:
+            signal = await wait_for_add_to_cart_async(self.page, self.page.locator(selector).first.click, timeout)
+        except PlaywrightError as exc:
+            logger.warning("Page/context closed while waiting for add to cart confirmation: %s", exc)
+            self.last_cart_signal = None
+            return False
+        finally:
+            self.invalidate_snapshot()
+
+        self.last_cart_signal = signal
+        if signal.ok:
+            logger.debug("Add to cart confirmed by %s in %.1fs (%s)", signal.signal, signal.seconds, signal.detail)
+        elif signal.signal == "timeout":
+            logger.info("No cart confirmation found - %s", signal.detail)
+        else:
+            logger.info("Add to cart appears to have failed (%s: %s)", signal.signal, signal.detail)
+        return signal.ok
+
+    async def add_to_cart_full_seq(self, product_url: str | None = None, variation: dict | None = None):
+        if product_url is not None:
+            # like ProductPage: the profile's load state, network policy and popup handlers (goto),
+            # then the title / add to cart of the layout
+            await self.goto(product_url)
+            await self.is_loaded()
+
+        if (await self.snapshot()).variations:
+            chosen = await self.select_variation(variation) if variation else await self.select_cheapest_variation()
+            if chosen is None:
+                logger.warning(" No in-stock variation for product: %s", self.page.url)
+                return False
+
+        snapshot = await self.snapshot()
+        if not snapshot.has_add_to_cart:
+            logger.warning(" No visible 'Add to cart' button for product: %s", self.page.url)
+            return False
+
+        success = await self._click_and_wait_for_cart(snapshot.add_to_cart)
+        if success:
+            logger.info("Product added to cart (confirmed): %s", self.page.url)
+        else:
+            logger.warning("Product NOT confirmed in cart: %s", self.page.url)
+        return success
+
+
+class AsyncCartPage(AsyncBasePage):
+
+    network_policy = "cart"
+
+    def __init__(self, page):
+        super().__init__(page)
+        self.cleared = None
+
+    async def is_loaded(self):
+        try:
+            await self.wait_for_visible("#Cart")
+            return True
+        except PlaywrightError:
+            return False
+
+    async def open(self):
+        await self.goto(config.get_cart_url())
+        await self.is_loaded()
+
+    async def get_cart_contents(self) -> CartContents:
+        # see CartPage.get_cart_contents
+        try:
+            return CartContents.from_record(await self.page.evaluate(EXTRACT_CART_JS))
+        except PlaywrightError:
+            return CartContents((), None, None, False)
+
+    async def get_cart_item_prices(self):
+        return [line.price for line in (await self.get_cart_contents()).lines]
+
+    async def get_cart_total(self):
+        return (await self.get_cart_contents()).total
+
+    async def get_cart_item_ids(self) -> List[str]:
+        return (await self.get_cart_contents()).item_ids
+
+    async def is_cart_empty(self):
+        return (await self.get_cart_contents()).empty
+
+    async def clear(self, max_passes: int = 3, timeout: int = 10_000) -> CartContents:
+        # see CartPage.clear
+        await self.open()
+        before = contents = await self.get_cart_contents()
+        for _ in range(max_passes):
+            if not contents.lines:
+                break
+            try:
+                if await self.page.evaluate(REMOVE_CART_LINES_JS, CartPage.remove_selectors):
+                    await self.page.wait_for_function(CART_HAS_NO_LINES_JS, timeout=timeout)
+            except PlaywrightError as exc:
+                logger.debug("AsyncCartPage removal pass did not finish: %s", exc)
+            await self.open()
+            contents = await self.get_cart_contents()
+        self.cleared = not contents.lines
+        return before
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import time
+from typing import NamedTuple
+
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError, Error as PlaywrightError
+
+from pages.page_scripts import ADD_TO_CART_SIGNAL_JS, CART_BADGE_JS
+
+# eBay keeps beaconing (tracking, ads, recommendations) so "networkidle" after an add to cart
+# click often never comes, and every click used to cost the full timeout. instead we wait for
+# the signals that actually say what happened, whichever comes first:
+#   - the add to cart request's own response (status + payload)
+#   - the cart count in the header going up
+#   - the "View cart" confirmation layer showing
+# an add to cart error message ("Please select ...") ends the wait early as a failure.
+
+class AddToCartSignal(NamedTuple):
+    ok: bool
+    signal: str  # "xhr", "badge", "layer", "error" or "timeout"
+    detail: str
+    seconds: float
+
+
+CART_BADGE_SELECTOR = "#gh-cart-n, .gh-cart__icon [aria-hidden='true'], [data-testid='cart-count']"
+
+CONFIRMATION_SELECTORS = (
+    "a[href*='cart']:has-text('View cart')",
+    "a[href*='cart']:has-text('Go to cart')",
+)
+
+ERROR_SELECTORS = (
+    "#atc-error",
+    "[data-testid='x-atc-error']",
+    ".ux-message--error",
+    "div[role='alert']:has-text('cannot be added to your cart')",
+    "div[role='alert']:has-text('Please select')",
+)
+
+# path fragments of the add to cart request (the local stand-in posts to /cart/add)
+ADD_TO_CART_URL_MARKERS = ("/cart/add", "/sc/add", "/atc/", "/cart/ajax", "addtocart", "add-to-cart")
+
+# how often the page state is checked, and how long the sync wait blocks on the page before
+# looking at the responses seen so far
+POLL_MS = 100
+SLICE_MS = 250
+
+def is_add_to_cart_request(method:str, url:str) -> bool:
+    url = url.lower()
+    return method.upper() == "POST" and any(marker in url for marker in ADD_TO_CART_URL_MARKERS)
+
+def read_add_to_cart_response(status:int, body:str) -> tuple[bool, str]:
+    # (ok, detail) from the add to cart response
+    try:
+        payload = json.loads(body) if body else None
+    except ValueError:
+        payload = None
+    message = ""
+    if isinstance(payload, dict):
+        message = str(payload.get("message") or payload.get("error") or "")
+    if status >= 400:
+        return False, f"HTTP {status} {message}".strip()
+    if not isinstance(payload, dict):
+        return True, f"HTTP {status}"
+    if payload.get("errors"):
+        return False, message or str(payload["errors"])[:200]
+    if "success" in payload:
+        return bool(payload["success"]), message or f"success={payload['success']}"
+    if "status" in payload:
+        state = str(payload["status"]).upper()
+        return state in ("SUCCESS", "OK"), message or state
+    return not message, message or f"HTTP {status}"
+
+def _timeout_signal(timeout_ms:float, started:float) -> AddToCartSignal:
+    return AddToCartSignal(
+        False, "timeout",
+        f"no add to cart response, cart count change or View cart layer within {timeout_ms / 1000:g}s",
+        time.monotonic() - started,
+    )
+
+def _dom_signal(hit:dict, started:float) -> AddToCartSignal:
+    return AddToCartSignal(hit["ok"], hit["signal"], hit["detail"], time.monotonic() - started)
+
+def _signal_args(badge_before:str) -> list:
+    return [CART_BADGE_SELECTOR, badge_before, list(CONFIRMATION_SELECTORS), list(ERROR_SELECTORS)]
+
+def wait_for_add_to_cart(page, click, timeout_ms:float = 8000) -> AddToCartSignal:
+    # run click() and wait for the first add to cart signal. the sync api waits on one thing
+    # at a time, so the page state is polled in short slices and the responses collected by
+    # the listener are looked at between them
+    started = time.monotonic()
+    badge_before = page.evaluate(CART_BADGE_JS, CART_BADGE_SELECTOR)
+    responses = []
+
+    def on_response(response):
+        if is_add_to_cart_request(response.request.method, response.url):
+            responses.append(response)
+
+    page.on("response", on_response)
+    try:
+        click()
+        deadline = started + timeout_ms / 1000
+        while True:
+            if responses:
+                response = responses[0]
+                try:
+                    body = response.text()
+                except PlaywrightError:
+                    body = ""
+                ok, detail = read_add_to_cart_response(response.status, body)
+                return AddToCartSignal(ok, "xhr", detail, time.monotonic() - started)
+            remaining_ms = (deadline - time.monotonic()) * 1000
+            if remaining_ms <= 0:
+                return _timeout_signal(timeout_ms, started)
+            try:
+                handle = page.wait_for_function(
+                    ADD_TO_CART_SIGNAL_JS, arg=_signal_args(badge_before),
+                    polling=POLL_MS, timeout=min(SLICE_MS, remaining_ms),
+                )
+            except PlaywrightTimeoutError:
+                continue
+            return _dom_signal(handle.json_value(), started)
+    finally:
+        page.remove_listener("response", on_response)
+
+async def wait_for_add_to_cart_async(page, click, timeout_ms:float = 8000) -> AddToCartSignal:
+    # async version - the response and the page state are awaited side by side
+    started = time.monotonic()
+    badge_before = await page.evaluate(CART_BADGE_JS, CART_BADGE_SELECTOR)
+    response_wait = asyncio.ensure_future(page.wait_for_event(
+        "response",
+        predicate=lambda response: is_add_to_cart_request(response.request.method, response.url),
+        timeout=timeout_ms,
+    ))
+    pending = {response_wait}
+    try:
+        await click()
+        page_wait = asyncio.ensure_future(page.wait_for_function(
+            ADD_TO_CART_SIGNAL_JS, arg=_signal_args(badge_before), polling=POLL_MS, timeout=timeout_ms,
+        ))
+        pending.add(page_wait)
+        while pending:
+            remaining = started + timeout_ms / 1000 - time.monotonic()
+            done, pending = await asyncio.wait(pending, timeout=max(0, remaining),
+                                               return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for task in done:
+                if task.exception() is not None:
+                    # that wait timed out or the page went away - the other one may still answer
+                    continue
+                if task is response_wait:
+                    response = task.result()
+                    try:
+                        body = await response.text()
+                    except PlaywrightError:
+                        body = ""
+                    ok, detail = read_add_to_cart_response(response.status, body)
+                    return AddToCartSignal(ok, "xhr", detail, time.monotonic() - started)
+                return _dom_signal(await task.result().json_value(), started)
+        return _timeout_signal(timeout_ms, started)
+    finally:
+        for task in pending:
+            task.cancel()
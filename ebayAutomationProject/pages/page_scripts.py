@@ -0,0 +1,625 @@
+from typing import NamedTuple
+
+from utils.price_parser import parse_price_range, parse_price_to_number, parse_shipping_cost
+from utils.variation_model import VariationModel
+
+# javascript evaluated inside the page. one evaluate() call replaces a loop of
+# playwright round trips (count(), is_visible(), get_attribute() per candidate/element).
+
+
+class SelectorMatch(NamedTuple):
+    # the winner of BasePage.resolve_first
+    index: int  # position in the candidate list
+    selector: str
+    visible: bool
+    enabled: bool
+    count: int  # how many elements the winning selector matched
+    text: str  # innerText of the first match (trimmed, cut at 200 chars)
+
+
+class SearchCard(NamedTuple):
+    # one search result, as read by EXTRACT_SEARCH_CARDS_JS
+    item_id: str
+    url: str  # canonical https://<host>/itm/<item id>, no tracking params
+    title: str
+    price: float  # the lower end for "X to Y" range prices, 0.0 when unreadable
+    max_price: float  # same as price unless it is a range
+    shipping: float | None  # 0.0 for free shipping, None when the card does not say
+    format: str  # "auction" or "buy_it_now"
+    sponsored: bool
+
+    @property
+    def is_range_price(self) -> bool:
+        return self.max_price > self.price
+
+    @classmethod
+    def from_record(cls, record:dict) -> "SearchCard":
+        price, max_price = parse_price_range(record.get("price") or "")
+        return cls(
+            item_id=record["itemId"],
+            url=record["url"],
+            title=record.get("title") or "",
+            price=price,
+            max_price=max_price,
+            shipping=parse_shipping_cost(record.get("shipping") or ""),
+            format="auction" if record.get("auction") else "buy_it_now",
+            sponsored=bool(record.get("sponsored")),
+        )
+
+
+class VariationOption(NamedTuple):
+    value: str
+    label: str
+    disabled: bool
+    selector: str | None = None  # what to click, for button pickers (None for <option>s)
+
+
+class VariationControl(NamedTuple):
+    # one variation picker (size, color...) as PRODUCT_SNAPSHOT_JS found it
+    kind: str  # "select" or "buttons"
+    name: str
+    selector: str  # unique to this control on the current page
+    value: str  # the selected value, "" while nothing is selected
+    options: tuple  # VariationOption, placeholders ("- Select -") left out
+
+    @property
+    def is_set(self) -> bool:
+        return bool(self.value)
+
+    @property
+    def enabled_options(self) -> tuple:
+        return tuple(option for option in self.options if not option.disabled)
+
+    @classmethod
+    def from_record(cls, record:dict) -> "VariationControl":
+        return cls(
+            kind=record["kind"],
+            name=record.get("name") or "",
+            selector=record["selector"],
+            value=record.get("value") or "",
+            options=tuple(
+                VariationOption(option["value"], option["label"], bool(option["disabled"]), option.get("selector"))
+                for option in record.get("options") or []
+            ),
+        )
+
+
+class ProductSnapshot(NamedTuple):
+    # what ProductPage needs to know about a product page, read by PRODUCT_SNAPSHOT_JS in one call
+    url: str
+    layout: str  # product layout name (pages/product_layouts.py)
+    title: str
+    price: float  # the lower end for "X to Y" range prices (variation listings), 0.0 when unreadable
+    price_text: str
+    add_to_cart: str | None  # selector of the Add to cart button, None when there is none
+    add_to_cart_match: str | None  # the layout's candidate selector that found it
+    add_to_cart_visible: bool
+    add_to_cart_enabled: bool
+    variations: tuple  # VariationControl, visible pickers only
+    errors: tuple  # texts of the visible error / status banners
+    msku: dict | None = None  # the raw MSKU model of variation listings (utils/variation_model.py)
+    max_price: float = 0.0  # same as price unless it is a range
+
+    @property
+    def is_range_price(self) -> bool:
+        return self.max_price > self.price
+
+    @property
+    def has_add_to_cart(self) -> bool:
+        # a greyed out button (ended, out of stock) is there but can not add anything
+        return self.add_to_cart is not None and self.add_to_cart_visible and self.add_to_cart_enabled
+
+    @property
+    def unset_variations(self) -> tuple:
+        return tuple(control for control in self.variations if not control.is_set)
+
+    @property
+    def variation_model(self) -> VariationModel:
+        # the page's own option matrix when it has one, else what the pickers show
+        if self.msku:
+            model = VariationModel.from_msku(self.msku)
+            if len(model):
+                return model
+        return VariationModel.from_controls(self.variations)
+
+    @classmethod
+    def from_record(cls, record:dict) -> "ProductSnapshot":
+        price_text = record.get("price") or ""
+        try:
+            price, max_price = parse_price_range(price_text) if price_text else (0.0, 0.0)
+        except (AttributeError, ValueError, TypeError):
+            price, max_price = 0.0, 0.0
+        atc = record.get("addToCart") or {}
+        return cls(
+            url=record.get("url") or "",
+            layout=record.get("layout") or "unknown",
+            title=record.get("title") or "",
+            price=price,
+            price_text=price_text,
+            add_to_cart=atc.get("selector"),
+            add_to_cart_match=atc.get("via"),
+            add_to_cart_visible=bool(atc.get("visible")),
+            add_to_cart_enabled=bool(atc.get("enabled")),
+            variations=tuple(VariationControl.from_record(control) for control in record.get("variations") or []),
+            errors=tuple(record.get("errors") or []),
+            msku=record.get("msku"),
+            max_price=max_price,
+        )
+
+
+class CartLine(NamedTuple):
+    # one line of the cart page, as read by EXTRACT_CART_JS
+    item_id: str | None
+    title: str
+    qty: int
+    price: float  # the line price as shown (unit price x qty), 0.0 when unreadable
+    shipping: float | None  # 0.0 for free shipping, None when the line does not say
+    key: str | None = None  # the cart's own id of the line, when it has one
+    variation: str = ""  # "Size: 9, Color: Red" as the cart shows it
+
+    @property
+    def unit_price(self) -> float:
+        return self.price / self.qty if self.qty else self.price
+
+    @property
+    def variation_values(self) -> dict:
+        # "Size: 9, Color: Red" -> {"Size": "9", "Color": "Red"}
+        values = {}
+        for part in self.variation.split(","):
+            name, _, value = part.partition(":")
+            if name.strip() and value.strip():
+                values[name.strip()] = value.strip()
+        return values
+
+    @classmethod
+    def from_record(cls, record:dict) -> "CartLine":
+        return cls(
+            item_id=record.get("itemId"),
+            title=record.get("title") or "",
+            qty=int(record.get("qty") or 1),
+            price=parse_price_to_number(record.get("price") or ""),
+            shipping=parse_shipping_cost(record.get("shipping") or ""),
+            key=record.get("key"),
+            variation=record.get("variation") or "",
+        )
+
+
+class CartContents(NamedTuple):
+    lines: tuple  # CartLine
+    subtotal: float | None  # None when the page shows no summary
+    shipping: float | None
+    empty: bool  # the "no items in your cart" message is showing
+
+    @property
+    def total(self) -> float:
+        # the summary's subtotal, or the sum of the lines when there is none
+        return self.subtotal if self.subtotal is not None else sum(line.price for line in self.lines)
+
+    @property
+    def item_ids(self) -> list:
+        return [line.item_id for line in self.lines if line.item_id]
+
+    @classmethod
+    def from_record(cls, record:dict) -> "CartContents":
+        subtotal = record.get("subtotal") or ""
+        shipping = record.get("shipping") or ""
+        return cls(
+            lines=tuple(CartLine.from_record(line) for line in record.get("lines") or []),
+            subtotal=parse_price_to_number(subtotal) if subtotal else None,
+            shipping=parse_price_to_number(shipping) if shipping else None,
+            empty=bool(record.get("empty")),
+        )
+
+
+# shared helpers, understand the two playwright-only selector forms our candidate lists use:
+# "css:has-text('text')" and "text=text". anything else is plain css.
+_DOM_HELPERS = """
+const normalize = (text) => (text || "").replace(/\\s+/g, " ").trim().toLowerCase();
+const isVisible = (el) => {
+  const style = getComputedStyle(el);
+  if (style.visibility === "hidden" || style.display === "none") return false;
+  const rect = el.getBoundingClientRect();
+  return rect.width > 0 && rect.height > 0;
+};
+const isEnabled = (el) => !(el.disabled || el.closest("fieldset[disabled]"));
+const queryAll = (selector, root = document) => {
+  if (selector.startsWith("text=")) {
+    const wanted = normalize(selector.slice(5).replace(/^["']|["']$/g, ""));
+    return [...root.querySelectorAll("body *")].filter(
+      (el) => normalize(el.innerText).includes(wanted)
+        && ![...el.children].some((child) => normalize(child.innerText).includes(wanted))
+    );
+  }
+  const hasText = selector.match(/^(.*?):has-text\\((['"])(.*)\\2\\)$/);
+  if (hasText) {
+    const wanted = normalize(hasText[3]);
+    return [...root.querySelectorAll(hasText[1] || "*")].filter((el) => normalize(el.textContent).includes(wanted));
+  }
+  return [...root.querySelectorAll(selector)];
+};
+"""
+
+# args: [selectors, require] with require one of null, "visible", "enabled".
+# returns the first candidate whose first match passes the requirement, like the old
+# "if locator.count() and locator.first.is_visible()" loops did, or null.
+RESOLVE_FIRST_JS = """
+([selectors, require]) => {
+""" + _DOM_HELPERS + """
+  for (let index = 0; index < selectors.length; index++) {
+    let matches;
+    try {
+      matches = queryAll(selectors[index]);
+    } catch (error) {
+      // not a selector this helper understands - skip it like a missing element
+      continue;
+    }
+    if (!matches.length) continue;
+    const el = matches[0];
+    const visible = isVisible(el);
+    const enabled = isEnabled(el);
+    if (require === "visible" && !visible) continue;
+    if (require === "enabled" && !enabled) continue;
+    return {
+      index,
+      selector: selectors[index],
+      visible,
+      enabled,
+      count: matches.length,
+      text: (el.innerText || el.value || "").trim().slice(0, 200),
+    };
+  }
+  return null;
+}
+"""
+
+# args: [[layout name, marker selector], ...] in priority order.
+# returns the name of the first layout with a marker on the page, or null.
+# plain css only - this runs once per product page, right after navigation
+LAYOUT_FINGERPRINT_JS = """
+(layouts) => {
+  for (const [name, marker] of layouts) {
+    try {
+      if (document.querySelector(marker)) return name;
+    } catch (error) {
+      continue;
+    }
+  }
+  return null;
+}
+"""
+
+# no args. one record per search result card (raw texts - SearchCard.from_record parses them),
+# in page order, deduplicated by item id (a card links the item from both its image and title).
+# placeholder "Shop on eBay" links have short ids and are skipped
+EXTRACT_SEARCH_CARDS_JS = """
+() => {
+  const text = (el) => (el ? (el.innerText || el.textContent || "").replace(/\\s+/g, " ").trim() : "");
+  const cards = [];
+  const seen = new Set();
+  for (const link of document.querySelectorAll("a[href*='/itm/']")) {
+    const match = (link.getAttribute("href") || "").match(/\\/itm\\/(?:[^\\/?#]+\\/)?(\\d{8,})/);
+    if (!match || seen.has(match[1])) continue;
+    seen.add(match[1]);
+
+    const card = link.closest("li.s-item, li.s-card, div.s-item, li[data-listing-id]") || link;
+    let title = text(card.querySelector(".s-item__title, .s-card__title, [role='heading']")) || text(link);
+    title = title.replace(/^New Listing\\s*/i, "");
+    const price = text(card.querySelector(".s-item__price, .s-card__price, span[aria-label*='Price']"));
+    const shipping = text(card.querySelector(
+      ".s-item__shipping, .s-item__logisticsCost, .s-item__freeXDays, .s-card__shipping"
+    ));
+    const bids = card.querySelector(".s-item__bids, .s-item__bidCount, .s-card__bids, span[aria-label*='Current bid']");
+    const sponsoredLabel = Boolean(card.querySelector("[aria-label*='Sponsored' i]"))
+      || [...card.querySelectorAll(".s-item__sep, .s-item__title--tag, .s-card__sponsored")]
+        .some((el) => /sponsored/i.test(text(el)));
+
+    cards.push({
+      itemId: match[1],
+      url: location.origin + "/itm/" + match[1],
+      title,
+      price,
+      shipping,
+      // auctions show a bid count, Buy It Now cards show purchase options instead
+      auction: Boolean(bids),
+      sponsored: sponsoredLabel,
+    });
+  }
+  return cards;
+}
+"""
+
+# no args. every cart line (raw texts - CartContents.from_record parses them) in cart order,
+# plus the subtotal and shipping of the summary. an item with two variations is two lines
+EXTRACT_CART_JS = """
+() => {
+  const text = (el) => (el ? (el.innerText || el.textContent || "").replace(/\\s+/g, " ").trim() : "");
+  const lines = [...document.querySelectorAll("div.cart-bucket, [data-test-id='cart-bucket']")].map((row) => {
+    const link = row.querySelector("a[href*='/itm/']");
+    const match = link && (link.getAttribute("href") || "").match(/\\/itm\\/(?:[^\\/?#]+\\/)?(\\d{8,})/);
+    const qty = row.querySelector("[data-qty], select[name*='qty' i], input[name*='qty' i], .item-qty");
+    const qtyText = qty ? (qty.dataset.qty || qty.value || text(qty)) : "1";
+    return {
+      itemId: row.dataset.itemId || (match ? match[1] : null),
+      key: row.dataset.lineKey || null,
+      title: text(row.querySelector("a.item-title, [data-test-id='cart-item-link']")) || text(link),
+      qty: parseInt(String(qtyText).replace(/\\D+/g, ""), 10) || 1,
+      price: text(row.querySelector("span.item-price, [data-test-id='cart-item-price']")),
+      shipping: text(row.querySelector(".item-shipping, [data-test-id='cart-item-shipping']")),
+      variation: text(row.querySelector(".item-variations, [data-test-id='cart-item-variations']")),
+    };
+  });
+  const first = (selectors) => {
+    for (const selector of selectors) {
+      const value = text(document.querySelector(selector));
+      if (value) return value;
+    }
+    return "";
+  };
+  return {
+    lines,
+    subtotal: first(["span#SUBTOTAL", "span#total", "div#SUBTOTAL div"]),
+    shipping: first(["span#SHIPPING", "div#SHIPPING div"]),
+    empty: Boolean(document.querySelector("#Cart .empty-cart__title")),
+  };
+}
+"""
+
+# args: badge selector. the cart count in the header ("" when the cart is empty or there is no badge)
+CART_BADGE_JS = """
+(selector) => {
+  const badge = document.querySelector(selector);
+  return badge ? (badge.textContent || "").trim() : "";
+}
+"""
+
+# args: [badge selector, badge text before the click, confirmation selectors, error selectors].
+# polled by wait_for_function after an add to cart click (pages/cart_signals.py). returns the first
+# signal found - the cart count went up, a "View cart" layer is on screen, or an add to cart
+# error is showing - or null to keep waiting
+ADD_TO_CART_SIGNAL_JS = """
+([badgeSelector, badgeBefore, confirmations, errors]) => {
+""" + _DOM_HELPERS + """
+  const visibleMatch = (selectors) => {
+    for (const selector of selectors) {
+      try {
+        const el = queryAll(selector).find(isVisible);
+        if (el) return el;
+      } catch (error) {
+        continue;
+      }
+    }
+    return null;
+  };
+  const badge = document.querySelector(badgeSelector);
+  const count = badge ? (badge.textContent || "").trim() : "";
+  if ((parseInt(count, 10) || 0) > (parseInt(badgeBefore, 10) || 0)) {
+    return {ok: true, signal: "badge", detail: `cart count ${badgeBefore || 0} -> ${count}`};
+  }
+  if (visibleMatch(confirmations)) {
+    return {ok: true, signal: "layer", detail: "View cart layer"};
+  }
+  const error = visibleMatch(errors);
+  if (error && (error.innerText || "").trim()) {
+    return {ok: false, signal: "error", detail: error.innerText.replace(/\\s+/g, " ").trim().slice(0, 200)};
+  }
+  return null;
+}
+"""
+
+# args: [layouts, variation select selectors, variation button selectors, error selectors] where layouts is
+# [[name, marker, title selectors, price selectors, add to cart selectors], ...] in priority order, ending
+# with the catch-all layout (empty marker). everything ProductSnapshot holds, in one call.
+# variation controls and their buttons get a data-snapshot-ref attribute so python can address them
+PRODUCT_SNAPSHOT_JS = """
+([layouts, selectSelectors, buttonSelectors, errorSelectors]) => {
+""" + _DOM_HELPERS + """
+  const text = (el) => (el ? (el.innerText || el.textContent || "").replace(/\\s+/g, " ").trim() : "");
+  const first = (selectors, wanted = () => true) => {
+    for (const selector of selectors) {
+      try {
+        const el = queryAll(selector).find(wanted);
+        if (el) return [selector, el];
+      } catch (error) {
+        continue;
+      }
+    }
+    return [null, null];
+  };
+  let nextRef = Number(document.documentElement.dataset.snapshotRefs || 0);
+  const ref = (el) => {
+    if (!el.dataset.snapshotRef) el.dataset.snapshotRef = String(++nextRef);
+    return `[data-snapshot-ref='${el.dataset.snapshotRef}']`;
+  };
+
+  const layout = layouts.find(([, marker]) => {
+    try {
+      return marker && document.querySelector(marker);
+    } catch (error) {
+      return false;
+    }
+  }) || layouts[layouts.length - 1];
+  const [name, , titleSelectors, priceSelectors, cartSelectors] = layout;
+
+  const [, title] = first(titleSelectors);
+  const [, price] = first(priceSelectors);
+  // a visible, enabled button wins, a greyed out or invisible one still tells us the page has one
+  const isClickable = (el) => isEnabled(el) && el.getAttribute("aria-disabled") !== "true";
+  let [cartSelector, cart] = first(cartSelectors, (el) => isVisible(el) && isClickable(el));
+  if (!cart) [cartSelector, cart] = first(cartSelectors, isVisible);
+  if (!cart) [cartSelector, cart] = first(cartSelectors);
+  const cartRef = cart && ref(cart);
+
+  const variations = [];
+  const seen = new Set();
+  for (const selector of selectSelectors) {
+    let matches;
+    try {
+      matches = queryAll(selector);
+    } catch (error) {
+      continue;
+    }
+    for (const select of matches) {
+      if (seen.has(select) || select.tagName !== "SELECT" || !isVisible(select)) continue;
+      seen.add(select);
+      const label = select.id && document.querySelector(`label[for='${CSS.escape(select.id)}']`);
+      variations.push({
+        kind: "select",
+        name: text(label) || select.name || select.id,
+        selector: ref(select),
+        value: select.value,
+        options: [...select.options].filter((option) => option.value).map((option) => ({
+          value: option.value,
+          label: text(option),
+          disabled: option.disabled,
+        })),
+      });
+    }
+  }
+  // button pickers, one control per group of buttons
+  const groups = new Map();
+  for (const selector of buttonSelectors) {
+    let matches;
+    try {
+      matches = queryAll(selector);
+    } catch (error) {
+      continue;
+    }
+    for (const button of matches) {
+      if (seen.has(button) || !isVisible(button)) continue;
+      seen.add(button);
+      const group = button.closest("[role='radiogroup'], fieldset, ul") || button.parentElement;
+      if (!groups.has(group)) groups.set(group, []);
+      groups.get(group).push(button);
+    }
+  }
+  for (const [group, buttons] of groups) {
+    const selected = buttons.find((button) => ["true", "mixed"].includes(button.getAttribute("aria-pressed"))
+      || button.getAttribute("aria-checked") === "true");
+    variations.push({
+      kind: "buttons",
+      name: group.getAttribute("aria-label") || text(group.querySelector("legend")) || "",
+      selector: ref(group),
+      value: selected ? (selected.dataset.value || text(selected)) : "",
+      options: buttons.map((button) => ({
+        value: button.dataset.value || text(button),
+        label: text(button),
+        disabled: !isEnabled(button) || button.getAttribute("aria-disabled") === "true",
+        selector: ref(button),
+      })),
+    });
+  }
+  document.documentElement.dataset.snapshotRefs = String(nextRef);
+
+  // the MSKU option matrix of variation listings, cut out of the inline script that carries it
+  let msku = null;
+  for (const script of variations.length ? document.querySelectorAll("script:not([src])") : []) {
+    const source = script.textContent || "";
+    const at = source.indexOf('"MSKU"');
+    if (at < 0 || !source.includes("variationCombinations")) continue;
+    const start = source.indexOf("{", at);
+    let depth = 0, inString = false, escaped = false, end = -1;
+    for (let i = start; i >= 0 && i < source.length; i++) {
+      const char = source[i];
+      if (inString) {
+        if (escaped) escaped = false;
+        else if (char === "\\\\") escaped = true;
+        else if (char === '"') inString = false;
+      } else if (char === '"') {
+        inString = true;
+      } else if (char === "{") {
+        depth++;
+      } else if (char === "}" && --depth === 0) {
+        end = i;
+        break;
+      }
+    }
+    try {
+      msku = JSON.parse(source.slice(start, end + 1));
+      break;
+    } catch (error) {
+      continue;
+    }
+  }
+
+  const errors = [];
+  for (const selector of errorSelectors) {
+    try {
+      for (const el of queryAll(selector)) {
+        const message = text(el);
+        if (message && isVisible(el) && !errors.includes(message)) errors.push(message.slice(0, 200));
+      }
+    } catch (error) {
+      continue;
+    }
+  }
+
+  return {
+    url: location.href,
+    layout: name,
+    title: text(title),
+    price: text(price),
+    addToCart: cart ? {selector: cartRef, via: cartSelector, visible: isVisible(cart), enabled: isClickable(cart)} : null,
+    variations,
+    msku,
+    errors,
+  };
+}
+"""
+
+# args: [[selector, value], ...] - one entry per variation picker: a <select> and the option value to
+# select, or a picker button and null (clicked). applied in order, in one call, with the input/change
+# events a user selection fires. returns the selectors that could not be applied
+APPLY_VARIATIONS_JS = """
+(picks) => {
+  const failed = [];
+  for (const [selector, value] of picks) {
+    const el = document.querySelector(selector);
+    if (!el) {
+      failed.push(selector);
+    } else if (el.tagName === "SELECT") {
+      const option = [...el.options].find((candidate) => candidate.value === value && !candidate.disabled);
+      if (!option) {
+        failed.push(selector);
+        continue;
+      }
+      el.value = value;
+      el.dispatchEvent(new Event("input", {bubbles: true}));
+      el.dispatchEvent(new Event("change", {bubbles: true}));
+    } else {
+      el.click();
+    }
+  }
+  return failed;
+}
+"""
+
+# args: remove button selectors. clicks the remove button of every cart line in one go - the removals
+# run side by side instead of one click, one wait, one re-render at a time. returns how many were clicked
+REMOVE_CART_LINES_JS = """
+(selectors) => {
+""" + _DOM_HELPERS + """
+  const rows = [...document.querySelectorAll("div.cart-bucket, [data-test-id='cart-bucket']")];
+  let clicked = 0;
+  for (const row of rows) {
+    for (const selector of selectors) {
+      let button;
+      try {
+        button = queryAll(selector, row).find((el) => isVisible(el) && isEnabled(el));
+      } catch (error) {
+        continue;
+      }
+      if (button) {
+        button.click();
+        clicked++;
+        break;
+      }
+    }
+  }
+  return clicked;
+}
+"""
+
+# no args. true once no cart line is left on the page
+CART_HAS_NO_LINES_JS = """
+() => !document.querySelector("div.cart-bucket, [data-test-id='cart-bucket']")
+"""
@@ -0,0 +1,114 @@
+import logging
+from collections import Counter
+from typing import NamedTuple
+
+from playwright.sync_api import Error as PlaywrightError
+
+logger = logging.getLogger(__name__)
+
+# instead of scanning a list of selectors after every step and sleeping after each click,
+# every known popup gets a playwright locator handler. playwright checks the handlers
+# only right before an action (click, fill, press...), and a handler runs only when its
+# popup is actually on screen.
+
+class PopupHandler(NamedTuple):
+    name: str
+    # the popup itself - the handler fires when this becomes visible
+    trigger: str
+    # what to click, looked up inside the trigger. None clicks the trigger itself
+    dismiss: str | None = None
+
+
+# screens between the password and eBay itself. they are full pages on signin.ebay.com, not
+# popups over an action of ours, so LoginPage._handle_post_login_flow clicks them itself
+PASSKEY_SKIP_SELECTOR = "button:has-text('Skip for now'), a:has-text('Skip for now')"
+POST_LOGIN_CONTINUE_SELECTOR = "button:has-text('Go to eBay'), button:has-text('Not now')"
+POST_LOGIN_SELECTOR = f"{PASSKEY_SKIP_SELECTOR}, {POST_LOGIN_CONTINUE_SELECTOR}"
+
+POPUP_HANDLERS = (
+    PopupHandler("gdpr_banner", "#gdpr-banner", "button#gdpr-banner-accept, button[aria-label='Accept all']"),
+    PopupHandler(
+        "cookie_consent",
+        "div[role='dialog']:has(button:has-text('Accept all'))",
+        "button:has-text('Accept all')",
+    ),
+    # "sign in to get the most out of eBay" nag
+    PopupHandler("sign_in_nag", "button#siNoThrottle"),
+    # passkey setup after login: "Simplify your sign-in"
+    PopupHandler("passkey_setup", PASSKEY_SKIP_SELECTOR),
+    PopupHandler("post_login_interstitial", POST_LOGIN_CONTINUE_SELECTOR),
+    PopupHandler(
+        "got_it_tip",
+        "div[role='dialog']:has(button:has-text('Got it')), div[role='dialog']:has(button:has-text('הבנתי'))",
+        "button:has-text('Got it'), button:has-text('הבנתי')",
+    ),
+    # protection plan / add-on offered after add to cart
+    PopupHandler(
+        "warranty_upsell",
+        "div[role='dialog']:has(#addonSkipBtn), div[role='dialog']:has-text('protection plan')",
+        "button#addonSkipBtn, button:has-text('No thanks')",
+    ),
+    # any other modal with a close button. the add to cart confirmation ("View cart") is left alone,
+    # it is the success signal the product page waits for
+    PopupHandler(
+        "modal_dialog",
+        "div[role='dialog'][aria-modal='true']:not(:has(a[href*='/cart']))",
+        "button[aria-label='Close'], button[title='Close'], button#dialog-close, button[aria-label='No thanks']",
+    ),
+)
+
+# how long a handler waits for its popup to go away after the click
+DISMISS_TIMEOUT = 2000
+
+# handler name -> times it fired, for the whole run
+popup_stats = Counter()
+
+_watched_pages = set()
+
+def _dismiss_target(popup, handler:PopupHandler):
+    return popup.locator(handler.dismiss).first if handler.dismiss else popup
+
+def _sync_callback(handler:PopupHandler):
+    def dismiss(popup):
+        popup_stats[handler.name] += 1
+        logger.debug("Dismissing popup %s", handler.name)
+        try:
+            _dismiss_target(popup, handler).click(timeout=DISMISS_TIMEOUT)
+            popup.wait_for(state="hidden", timeout=DISMISS_TIMEOUT)
+        except PlaywrightError as exc:
+            # the popup may close by itself or navigate away - the pending action continues anyway
+            logger.debug("Popup %s was not dismissed cleanly: %s", handler.name, exc)
+    return dismiss
+
+def _async_callback(handler:PopupHandler):
+    async def dismiss(popup):
+        popup_stats[handler.name] += 1
+        logger.debug("Dismissing popup %s", handler.name)
+        try:
+            await _dismiss_target(popup, handler).click(timeout=DISMISS_TIMEOUT)
+            await popup.wait_for(state="hidden", timeout=DISMISS_TIMEOUT)
+        except PlaywrightError as exc:
+            logger.debug("Popup %s was not dismissed cleanly: %s", handler.name, exc)
+    return dismiss
+
+def _mark_watched(page) -> bool:
+    # True the first time a page is seen
+    if page in _watched_pages:
+        return False
+    _watched_pages.add(page)
+    page.once("close", lambda _: _watched_pages.discard(page))
+    return True
+
+def watch_popups(page, handlers=POPUP_HANDLERS):
+    # register every popup handler on the page once, later calls are free
+    if not _mark_watched(page):
+        return
+    for handler in handlers:
+        # no_wait_after: the callback already waited for its own popup to go away
+        page.add_locator_handler(page.locator(handler.trigger).first, _sync_callback(handler), no_wait_after=True)
+
+async def watch_popups_async(page, handlers=POPUP_HANDLERS):
+    if not _mark_watched(page):
+        return
+    for handler in handlers:
+        await page.add_locator_handler(page.locator(handler.trigger).first, _async_callback(handler), no_wait_after=True)
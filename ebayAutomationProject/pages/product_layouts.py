@@ -0,0 +1,81 @@
+from collections import Counter
+from typing import NamedTuple
+
+# eBay serves (at least) three product page layouts. instead of trying the selectors of
+# all of them on every call, ProductPage classifies the page once after navigation
+# (LAYOUT_FINGERPRINT_JS) and then only uses the selector set of that layout.
+
+class ProductLayout(NamedTuple):
+    name: str
+    # css only, checked in the page by the fingerprint script. the first layout with a hit wins
+    marker: str
+    title: tuple
+    price: tuple
+    add_to_cart: tuple
+
+
+# "Add to cart" by text works on every layout, it is the last resort of each set
+_ATC_BY_TEXT = (
+    "button:has-text('Add to cart')",
+    "a:has-text('Add to cart')",
+    "[role='button']:has-text('Add to cart')",
+)
+
+# priority order matters: the x_testid pages still carry some of the redesign classes
+PRODUCT_LAYOUTS = (
+    ProductLayout(
+        "x_testid",
+        marker="[data-testid='x-item-title'], [data-testid='x-atc-action'], [data-testid='x-price-primary']",
+        title=("h1[data-testid='x-item-title']", "[data-testid='x-item-title'] h1"),
+        price=("[data-testid='x-price-primary'] span.ux-textspans", "[data-testid='x-price-primary']"),
+        add_to_cart=(
+            "button[data-testid='x-atc-action']",
+            "[data-testid='x-atc-action'] a",
+            "button[aria-label*='Add to cart']",
+        ) + _ATC_BY_TEXT,
+    ),
+    ProductLayout(
+        "redesign",
+        marker="h1.x-item-title__mainTitle, div.x-price-primary, #atcRedesignId_btn",
+        title=("h1.x-item-title__mainTitle",),
+        price=("div.x-price-primary span.ux-textspans", "div.x-price-primary", "div.x-bin-price__content"),
+        add_to_cart=("button#atcRedesignId_btn", "button[aria-label*='Add to cart']") + _ATC_BY_TEXT,
+    ),
+    ProductLayout(
+        "legacy",
+        marker="h1.it-ttl, h1.vi-atw-title, span#prcIsum, span#prcIsum_bidPrice, a#isCartBtn_btn",
+        title=("h1.it-ttl", "h1.vi-atw-title"),
+        # standard, auction and sale price
+        price=("span#prcIsum", "span#prcIsum_bidPrice", "span#mm-saleDscPrc"),
+        add_to_cart=("a#isCartBtn_btn", "button#atcBtn_btn", "button#binBtn_btn") + _ATC_BY_TEXT,
+    ),
+)
+
+# a page no fingerprint matched (new layout, error page, captcha...) - try everything we know
+UNKNOWN_LAYOUT = ProductLayout(
+    "unknown",
+    marker="",
+    title=tuple(dict.fromkeys(sel for layout in PRODUCT_LAYOUTS for sel in layout.title + ("h1[itemprop='name']",))),
+    price=tuple(dict.fromkeys(sel for layout in PRODUCT_LAYOUTS for sel in layout.price)),
+    add_to_cart=tuple(dict.fromkeys(sel for layout in PRODUCT_LAYOUTS for sel in layout.add_to_cart)),
+)
+
+LAYOUTS_BY_NAME = {layout.name: layout for layout in PRODUCT_LAYOUTS + (UNKNOWN_LAYOUT,)}
+
+# the argument of LAYOUT_FINGERPRINT_JS
+FINGERPRINT_ARGS = [[layout.name, layout.marker] for layout in PRODUCT_LAYOUTS]
+
+# the layouts argument of PRODUCT_SNAPSHOT_JS - the catch-all goes last
+SNAPSHOT_LAYOUTS = [
+    [layout.name, layout.marker, list(layout.title), list(layout.price), list(layout.add_to_cart)]
+    for layout in PRODUCT_LAYOUTS + (UNKNOWN_LAYOUT,)
+]
+
+# every marker at once - what to wait for before fingerprinting
+ANY_MARKER = ", ".join(layout.marker for layout in PRODUCT_LAYOUTS)
+
+# layout name -> product pages classified as it, for the whole run
+layout_stats = Counter()
+
+def layout_for(name:str | None) -> ProductLayout:
+    return LAYOUTS_BY_NAME.get(name or "unknown", UNKNOWN_LAYOUT)
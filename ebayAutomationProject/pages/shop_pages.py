@@ -1,28 +1,64 @@
 import re
 import selectors
+import time
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Iterator, List, Tuple
 
-from pytest_base_url.plugin import base_url
-
-from utils.price_parser import parse_price_to_number
+from utils.candidate_table import CandidateTable
+from utils.variation_model import VariationCombination, plan_selections
 from core import config
+from core.network_policy import activate as activate_network_policy
+from pages.cart_signals import ERROR_SELECTORS, wait_for_add_to_cart
+from pages.popup_watcher import DISMISS_TIMEOUT, POST_LOGIN_SELECTOR, watch_popups
+from pages.page_scripts import (
+    CART_HAS_NO_LINES_JS,
+    EXTRACT_CART_JS,
+    EXTRACT_SEARCH_CARDS_JS,
+    APPLY_VARIATIONS_JS,
+    LAYOUT_FINGERPRINT_JS,
+    PRODUCT_SNAPSHOT_JS,
+    REMOVE_CART_LINES_JS,
+    RESOLVE_FIRST_JS,
+    CartContents,
+    ProductSnapshot,
+    SearchCard,
+    SelectorMatch,
+)
+from pages.product_layouts import (
+    ANY_MARKER,
+    FINGERPRINT_ARGS,
+    SNAPSHOT_LAYOUTS,
+    ProductLayout,
+    layout_for,
+    layout_stats,
+)
 import logging
+import weakref
+from collections import deque
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 from playwright.sync_api import TimeoutError as PlaywrightTimeoutError, Error as PlaywrightError
 
 logger = logging.getLogger(__name__)
 
 class BasePage(ABC):
 
+    # name of the network policy (core/network_policy.py) used while this page type drives the tab
+    network_policy = "allow_all"
+
     def __init__(self, page):
         self.page = page
+        activate_network_policy(page, self.network_policy)
+        # popups are dismissed by locator handlers whenever they show up (pages/popup_watcher.py)
+        watch_popups(page)
 
     @abstractmethod
     def is_loaded(self) -> bool:
         pass
 
     def goto(self, url):
-        self.page.goto(url)
+        activate_network_policy(self.page, self.network_policy)
+        # how long to wait for the load is part of the execution profile
+        self.page.goto(url, wait_until=config.get_wait_strategy())
 
     def wait_for_visible(self, locator:str):
         # wait until the element of the locator is visible
@@ -40,9 +76,21 @@ class BasePage(ABC):
     def get_text(self, locator:str):
         return self.page.locator(locator).inner_text().strip()
 
+    def resolve_first(self, selectors:List[str], require:str | None = None) -> SelectorMatch | None:
+        # walk an ordered list of candidate selectors inside the page, in one round trip.
+        # require: None, "visible" or "enabled" - a candidate whose first element fails it is skipped.
+        # returns the winner (index, selector, visible, enabled, count, text) or None
+        try:
+            result = self.page.evaluate(RESOLVE_FIRST_JS, [list(selectors), require])
+        except PlaywrightError:
+            return None
+        return SelectorMatch(**result) if result else None
+
 
 class HomePage(BasePage):
 
+    network_policy = "home"
+
     def __init__(self, page):
         super().__init__(page)
 
@@ -57,28 +105,8 @@ class HomePage(BasePage):
 
     def _dismiss_homepage_popups(self):
 
-        # try to avoid popups with common selectors
-        selectors = [
-            "button#gdpr-banner-accept",
-            "button[aria-label='Accept all']",
-            "button:has-text('Accept')",
-            "button:has-text('Got it')",
-            "button:has-text('הבנתי')",
-            "button[aria-label='Close']",
-            "button:has-text('Close')",
-            "button#dialog-close",
-            "button#siNoThrottle",
-            "button[aria-label='No thanks']",
-        ]
-        for select in selectors:
-            try:
-                some_locator = self.page.locator(select)
-                if some_locator.count() and some_locator.first.is_visible():
-                    some_locator.first.click()
-                    #allow dialog to close
-                    self.page.wait_for_timeout(500)
-            except (PlaywrightError, AttributeError, TypeError):
-                continue
+        # the popup watcher handles them when they appear - no scanning or sleeping here
+        watch_popups(self.page)
 
 
     def enter_search_term(self, query:str):
@@ -88,7 +116,7 @@ class HomePage(BasePage):
 
     def submit_search(self):
         # not every place in eBay use input elements
-        #that is why i try several seletors
+        #that is why i try several seletors - resolved in one call
 
         clicked = False
 
@@ -98,26 +126,22 @@ class HomePage(BasePage):
             "button.btn-prim"
         ]
 
-        for candidate in candidates:
+        match = self.resolve_first(candidates, require="enabled")
+        if match:
             try:
-                some_locator = self.page.locator(candidate)
-                if some_locator.count() and some_locator.first.is_enabled():
-                    some_locator.first.click()
-                    clicked = True
-                    break
-            except (PlaywrightError, AttributeError, TypeError):
-                continue
+                self.page.locator(match.selector).first.click()
+                clicked = True
+            except PlaywrightError:
+                pass
         #if it does not work, fallback to pressing "Enter"
         if not clicked:
             try:
-                search_input = self.page.locator("input#gh-ac")
-                if search_input.count() and search_input.first.is_enabled():
-                    search_input.first.press("Enter")
-                    clicked = True
+                if self.resolve_first(["input#gh-ac"], require="enabled"):
+                    self.page.locator("input#gh-ac").first.press("Enter")
                 else:
                     self.page.keyboard.press("Enter")
-                    clicked = True
-            except (PlaywrightError, AttributeError, TypeError):
+                clicked = True
+            except PlaywrightError:
                 pass
         #if none os working just raise TimeoutError
         if not clicked:
@@ -145,9 +169,18 @@ class HomePage(BasePage):
 
 class LoginPage(BasePage):
 
+    network_policy = "login"
+
+    # how long the post login wait blocks before looking for a screen to click through
+    POST_LOGIN_POLL_MS = 500
+
     def __init__(self, page):
         super().__init__(page)
 
+    def _on_signin_page(self, url:str | None = None) -> bool:
+        url = self.page.url if url is None else url
+        return url.startswith(config.get_signin_url().rstrip("/"))
+
     def is_loaded(self) -> bool:
         try:
             self.wait_for_visible("input#userid")
@@ -157,36 +190,31 @@ class LoginPage(BasePage):
 
     def open(self):
 
-        self.goto("https://signin.ebay.com/")
+        self.goto(config.get_signin_url())
         self.is_loaded()
 
     def enter_username(self, username:str):
 
-    # try to fill the username/email field using several possible selectors
+    # fill the username/email field - the first enabled of several possible selectors
         selectors = [
             "input#userid",
             "input[name='userid']",
             "input#signin-username",
             "input[name='email']",
             "input#email",
-            "input[type='email']"
+            "input[type='email']",
+            #fallback - the first input
+            "input",
         ]
+        self._fill_first_enabled(selectors, username)
 
-        for selector in selectors:
-            try:
-                some_locator = self.page.locator(selector)
-                if some_locator.count() and some_locator.first.is_enabled():
-                    some_locator.first.fill(username)
-                    return
-            except (PlaywrightError, AttributeError, TypeError):
-                continue
-
-        #fallback - fill the first visible input
+    def _fill_first_enabled(self, selectors:List[str], text:str):
+        match = self.resolve_first(selectors, require="enabled")
+        if not match:
+            return
         try:
-            some_locator = self.page.locator("input")
-            if some_locator.count():
-                some_locator.first.fill(username)
-        except (PlaywrightError, AttributeError, TypeError):
+            self.page.locator(match.selector).first.fill(text)
+        except PlaywrightError:
             pass
 
     # try to fill the password field using several possible selectors
@@ -199,63 +227,30 @@ class LoginPage(BasePage):
             "input#password",
             "input[type='password']"
         ]
-        for selector in selectors:
-            try:
-                some_locator = self.page.locator(selector)
-                if some_locator.count() and some_locator.first.is_enabled():
-                    some_locator.first.fill(password)
-                    return
-            except (PlaywrightError, AttributeError, TypeError):
-                continue
-        # fallback - type into any input of type password
-        try:
-            some_locator = self.page.locator("input[type='password']")
-            if some_locator.count():
-                some_locator.first.fill(password)
-        except (PlaywrightError, AttributeError, TypeError):
-            pass
+        self._fill_first_enabled(selectors, password)
 
     def submit_login(self):
         self.click("button#sgnBt")
 
     def _dismiss_initial_popups(self):
-        # try to avoid popups with common selectors
-
-        selectors = [
-            "button#gdpr-banner-accept",
-            "button[aria-label='Accept all']",
-            "button:has-text('Accept')",
-            "button:has-text('Got it')",
-            "button:has-text('הבנתי')",
-            "button[aria-label='Close']",
-        ]
-        for selector in selectors:
-            try:
-                some_locator = self.page.locator(selector)
-                if some_locator.count() and some_locator.first.is_visible():
-                    some_locator.first.click()
-                    self.page.wait_for_timeout(500)
-            except (PlaywrightError, AttributeError, TypeError):
-                continue
+        # consent banners are handled by the popup watcher when they appear
+        watch_popups(self.page)
 
     def _handle_post_login_flow(self):
 
-        # it handles screens that appear after inserting a password
-        selectors = [
-            "button:has-text('Continue')",
-            "button:has-text('Go to eBay')",
-            "button:has-text('Not now')",
-            "button:has-text('No thanks')",
-            "button:has-text('המשך')",
-        ]
-        for sel in selectors:
+        # screens that appear after inserting a password ("Skip for now", "Go to eBay", "Not now"):
+        # wait until eBay lets us leave the sign in page, clicking them whenever one shows up. the popup
+        # watcher handlers only run before an action of ours, so they would never see these on their own
+        # (with the debug profile the wait is also the time to solve a CAPTCHA by hand)
+        deadline = time.monotonic() + config.get_profile().navigation_timeout / 1000
+        next_screen = self.page.locator(POST_LOGIN_SELECTOR).first
+        while self._on_signin_page() and time.monotonic() < deadline:
             try:
-                loc = self.page.locator(sel)
-                if loc.count() and loc.first.is_visible():
-                    loc.first.click()
-                    self.page.wait_for_timeout(1000)
-                    break
-            except (PlaywrightError, AttributeError, TypeError):
+                if next_screen.is_visible():
+                    next_screen.click(timeout=DISMISS_TIMEOUT)
+                    continue
+                self.page.wait_for_url(lambda url: not self._on_signin_page(url), timeout=self.POST_LOGIN_POLL_MS)
+            except PlaywrightError:
                 continue
 
     def login_full_seq(self, username:str, password:str):
@@ -296,7 +291,7 @@ class LoginPage(BasePage):
                     some_locator.first.click()
 
                     try:
-                        self.page.wait_for_selectors(
+                        self.page.wait_for_selector(
                             "input#pass, input[name='pass'], input[name='password'], input#password, input[type='password']",
                             timeout=10000
                         )
@@ -309,21 +304,11 @@ class LoginPage(BasePage):
         self.enter_password(password)
         self.submit_login()
 
-        #for window "Simplify your sign‑in" with the "Skip for now"
-        try:
-            skip = self.page.locator("text=Skip for now")
-            if skip.count() and skip.first.is_visible():
-                skip.first.click()
-                self.page.wait_for_timeout(1000)
-        except PlaywrightError:
-            pass
-
+        # "Simplify your sign‑in" / "Skip for now" and other post login popups are popup watcher handlers
         self._handle_post_login_flow()
         self._handle_additional_security
         self._close_post_login_popups()
 
-        # wait for page to update.
-        self.page.wait_for_timeout(2000)
         try:
             base_url = config.get_base_url()
         except (ImportError, AttributeError):
@@ -338,7 +323,7 @@ class LoginPage(BasePage):
             pass
 
         #if we are still not singed in - the login was not successful
-        if self.page.url.startswith("https://signin.ebay."):
+        if self._on_signin_page():
             return False
 
         return self.is_logged_in()
@@ -390,27 +375,8 @@ class LoginPage(BasePage):
 
     def _close_post_login_popups(self):
 
-        close_selectors = [
-            "button[aria-label='Close']",
-            "button[aria-label='Skip for now']",
-            "button[title='Close']",
-            "button#gdpr-banner-accept",
-            "button:has-text('Close')",
-            "button:has-text('Got it')",
-            "button#dialog-close",
-            "button#siNoThrottle",
-            "button[aria-label='No thanks']"
-        ]
-        for selector in close_selectors:
-            try:
-                btn = self.page.locator(selector)
-                if btn.is_visible():
-                    btn.click()
-                    # Wait a moment for the modal to disappear
-                    self.page.wait_for_timeout(500)
-                    break
-            except (PlaywrightError, AttributeError, TypeError):
-                continue
+        # handled by the popup watcher when they appear
+        watch_popups(self.page)
 
     def is_logged_in(self) -> bool:
 
@@ -424,12 +390,10 @@ class LoginPage(BasePage):
         ]
         try:
             # if greeting is visible assume logged in
-            for selector in account_selectors:
-                some_locator = self.page.locator(selector)
-                if some_locator.count() and some_locator.first.is_visible():
-                    return True
+            if self.resolve_first(account_selectors, require="visible"):
+                return True
             # If we  see  sign in url or username assume not logged in
-            if self.page.url.startswith("https://signin.ebay."):
+            if self._on_signin_page():
                 return False
             if self.page.locator("input#userid").count():
                 return False
@@ -440,6 +404,47 @@ class LoginPage(BasePage):
 
 class SearchResultsPage(BasePage):
 
+    network_policy = "search_results"
+
+    # url search defaults: the most results per page eBay allows, and "Price + Shipping: lowest first"
+    results_per_page = 240
+    sort_order = "15"
+
+    @classmethod
+    def build_search_url(cls, query:str, max_price:float | None = None, buy_it_now:bool = True,
+                         per_page:int | None = None, sort:str | None = None) -> str:
+        # the url the home page search box and the price filter end up on
+        params = {"_nkw": query, "_sacat": "0"}
+        if max_price is not None:
+            # plain decimals - eBay does not read an exponent ("1e+06", which :g gives for large prices)
+            params["_udhi"] = f"{max_price:.2f}"
+        if buy_it_now:
+            params["LH_BIN"] = "1"
+        params["_ipg"] = str(per_page or cls.results_per_page)
+        params["_sop"] = sort or cls.sort_order
+        return f"{config.get_search_url()}?{urlencode(params)}"
+
+    @classmethod
+    def search_filters(cls, mode:str) -> dict:
+        # what besides query and max price decides which results a search shows (search cache key)
+        if mode == "url":
+            return {"mode": mode, "buy_it_now": True, "per_page": cls.results_per_page, "sort": cls.sort_order}
+        return {"mode": mode}
+
+    def open_search(self, query:str, max_price:float | None = None, buy_it_now:bool = True) -> bool:
+        # land on filtered results in one navigation. False when the results did not show up
+        # (bot check, redirect...) - the caller falls back to the home page search box
+        url = self.build_search_url(query, max_price, buy_it_now)
+        try:
+            self.goto(url)
+        except PlaywrightError as exc:
+            print(f"Direct search url failed: {exc}")
+            return False
+        if "/sch/" not in self.page.url or not self.is_loaded():
+            print(f"Direct search url did not land on results: {self.page.url}")
+            return False
+        return True
+
     def is_loaded(self):
         try:
             # common locators
@@ -460,106 +465,40 @@ class SearchResultsPage(BasePage):
             #if filter is not available just continue
             pass
 
-    def get_item_cards_on_page(self):
-       #i did not succeed with css locators so i will collect href that contains /itm/
-        links = self.page.locator("a[href*='/itm/']")
-        count = links.count()
-
-        handles = []
-        for index in range(count):
-            link = links.nth(index)
-            try:
-                href = link.get_attribute("href")
-            except PlaywrightError:
-                href = None
-            if not href:
-                continue
-            # filters out placeholder links takes only /itm/with 8 numbers after
-            matched_link = re.search(r"/itm/(\d{8,})", href)
-            if not matched_link:
-                continue
-            handles.append(link)
-
-        print(
-            f"get_item_cards_on_page: "
-            f"found  product links with href*='/itm/'"
-        )
-        return handles
-
-    def extract_item_price(self, item_element):
-        #get father li item
+    def get_item_cards_on_page(self) -> List[SearchCard]:
+        # every result card of the page (item id, canonical url, title, price, shipping,
+        # format, sponsored) read inside the page in one call, in page order.
+        # placeholder links (/itm/ with less than 8 digits) are skipped by the script
         try:
-            li = item_element.query_selector(
-                "xpath=ancestor::li[contains(@class, 's-item')]"
-            )
-        except (PlaywrightError, AttributeError):
-            li = None
-
-        root = li or item_element
-
-        price_selectors = [
-            ".s-item__price",
-            ".s-item__detail span.s-item__price",
-            "span[aria-label*='Price']",
-            "span[aria-label*='Current bid']",
-            "span[aria-label*='Buy It Now']",
-        ]
-
-        for selector in price_selectors:
-            try:
-                el = root.query_selector(selector)
-                if not el:
-                    continue
-                text = el.inner_text().strip()
-                value = parse_price_to_number(text)
-                if value and value > 0:
-                    return value
-            except (PlaywrightError, AttributeError, ValueError, TypeError):
-                # ignore failures to parse or access price element
-                continue
-
-        return None
+            records = self.page.evaluate(EXTRACT_SEARCH_CARDS_JS)
+        except PlaywrightError as exc:
+            print(f"get_item_cards_on_page: extraction failed: {exc}")
+            return []
 
-# try returning a product href
-    def extract_item_url(self, item_element):
-        try:
-            href = item_element.get_attribute("href")
-            return href
-        except (PlaywrightError, AttributeError):
-            return None
+        cards = [SearchCard.from_record(record) for record in records]
+        print(f"get_item_cards_on_page: found {len(cards)} product cards")
+        return cards
 
-    def _get_any_item_urls_on_page(self, limit: int) -> List[str]:
-        #fallback for returning up to limit from the result page
-        urls: List[str] = []
+    def extract_item_price(self, card:SearchCard):
+        # the card price, None when it could not be read
+        return card.price if card.price > 0 else None
 
-        for link in self.get_item_cards_on_page():
-            if len(urls) >= limit:
-                break
-            url = self.extract_item_url(link)
-            if url:
-                urls.append(url)
+# canonical product url of a card
+    def extract_item_url(self, card:SearchCard):
+        return card.url
 
-        print(
-            f" _get_any_item_urls_on_page: returning "
-            f" URLs (limit={limit})"
-        )
-        return urls
+    def get_candidates_on_page(self, page_number:int = 1) -> CandidateTable:
+        return CandidateTable.from_cards(self.get_item_cards_on_page(), page_number)
 
     def get_items_under_price_on_page(self, max_price:float):
 
-        #collect urls on the current page. do not enforce max_price
-        # alwqays returns a list (possibly empty)
-
-        urls: list[str] = []
-
-        for link in self.get_item_cards_on_page():
-            url = self.extract_item_url(link)
-            if url:
-                urls.append(url)
+        # urls of the cards on the current page that really qualify (Buy It Now, single price,
+        # price + shipping <= max_price), cheapest first. always returns a list (possibly empty)
+        urls = self.get_candidates_on_page().best_urls(max_price)
 
         print(
             f" get_items_under_price_on_page: returning "
-
+            f"{len(urls)} URLs under {max_price}"
         )
         return urls
 
@@ -574,360 +513,375 @@ class SearchResultsPage(BasePage):
         except PlaywrightError:
             return False
 
-    def collect_items_under_price_across_pages(self, max_price:float, limit:int):
+    @staticmethod
+    def results_page_url(url:str, page_number:int) -> str:
+        # the same search (query, filters, sort) on another results page
+        parts = urlsplit(url)
+        params = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if key != "_pgn"]
+        params.append(("_pgn", str(page_number)))
+        return urlunsplit(parts._replace(query=urlencode(params)))
+
+    def _start_results_page(self, search_url:str, page_number:int):
+        # open results page N in a new tab of the same context without waiting for it.
+        # location.href returns right away, so the tabs of a batch download in parallel
+        # while we read them one by one in page order
+        tab = self.page.context.new_page()
+        SearchResultsPage(tab)  # network policy and popup handlers for the tab
+        url = self.results_page_url(search_url, page_number)
+        try:
+            tab.evaluate("url => { location.href = url; }", url)
+        except PlaywrightError:
+            # the navigation already replaced the blank page - nothing to do
+            pass
+        return tab
 
-        #collecting the "limit" uurls found on each page. if no items found using the price filter uses a fallback to get
-        #any urls and still enforces the max_cart_total after item are added to cart
-        collected: List[str] = []
+    def _read_results_page(self, tab, page_number:int) -> List[SearchCard] | None:
+        # the cards of a prefetched page, None when it did not load
+        try:
+            tab.wait_for_url(lambda url: "/sch/" in url)
+            results = SearchResultsPage(tab)
+            results.is_loaded()
+            return results.get_item_cards_on_page()
+        except PlaywrightError as exc:
+            print(f"Results page {page_number} failed to load: {exc}")
+            return None
 
-        seen: set[str] = set()
+    def iter_result_pages(self, max_pages:int = 5, fan_out:int | None = None,
+                          eager:bool = False) -> Iterator[Tuple[int, List[SearchCard]]]:
+        # (page number, cards) of the current results page and the ones after it, in page order.
+        # pages 2..max_pages are prefetched "fan_out" at a time in extra tabs. they are opened once
+        # the caller asks for page 2, or right after page 1 was read with eager=True (the caller
+        # works on page 1 while the next pages download). closing the generator closes the tabs
+        # still loading.
+        # self.result_pages: the cards of every page read by number (what the search cache stores)
+        # self.last_page: the number of the page known to be the last one of the results, if we got there
+        fan_out = max(1, fan_out or config.get_pagination_fan_out())
+        search_url = self.page.url
+        self.result_pages = {1: self.get_item_cards_on_page()}
+        self.last_page = None if self.has_next_page() else 1
+
+        next_page = 2
+        in_flight = deque()
+
+        def _fill():
+            nonlocal next_page
+            while len(in_flight) < fan_out and next_page <= max_pages:
+                in_flight.append((next_page, self._start_results_page(search_url, next_page)))
+                next_page += 1
 
-        def _add_unique(urls: List[str]):
-            # adds urls to the list if not already seen
-            for url in urls:
-                if url not in seen:
-                    seen.add(url)
-                    collected.append(url)
-                    if len(collected) >= limit:
-                        break
+        try:
+            if eager and self.last_page is None:
+                _fill()
+            yield 1, self.result_pages[1]
+            if self.last_page is not None:
+                return
 
-        # try to collect from the current page
-        page_urls = self.get_items_under_price_on_page(max_price)
-        _add_unique(page_urls)
+            while True:
+                _fill()
+                if not in_flight:
+                    return
+                page_number, tab = in_flight.popleft()
+                page_cards = self._read_results_page(tab, page_number)
+                tab.close()
+                if page_cards is None:
+                    return
+                self.result_pages[page_number] = page_cards
+                if not page_cards:
+                    # the results ran out
+                    self.last_page = page_number
+                    return
+                if eager:
+                    _fill()
+                yield page_number, page_cards
+        finally:
+            for _, tab in in_flight:
+                try:
+                    tab.close()
+                except PlaywrightError:
+                    pass
 
-        #fall back to any items on this page
-        if not collected:
-            print(
-                f"No items found under price {max_price}; "
-                f"falling back to first results without price filter"
-            )
-            fallback_urls = self._get_any_item_urls_on_page(limit)
-            _add_unique(fallback_urls)
-
-        # optionally if we still need more and there is a next page run on
-        # the pages until limit (right now hard coded to 5)
-        max_pages = 5
-        pages_visited = 1
-        while len(collected) < limit and pages_visited < max_pages and self.has_next_page():
-            try:
-                self.page.locator("a.pagination__next, a[aria-label^='Next']").first.click()
-                self.is_loaded()
-                pages_visited += 1
+    def collect_items_under_price_across_pages(self, max_price:float, limit:int, max_pages:int = 5,
+                                                fan_out:int | None = None):
 
-                page_urls = self.get_items_under_price_on_page(max_price)
-                _add_unique(page_urls)
+        # the cards of every visited page go into one CandidateTable. pages are visited until
+        # "limit" cards qualify (see CandidateTable.qualifying_mask) or we run out of pages,
+        # then the cheapest "limit" qualifying items are returned. a card that does not fit the
+        # budget never reaches the product page, so there is no "any item" fallback anymore.
+        candidates = CandidateTable.empty()
+        pages_visited = 0
 
-                if len(collected) >= limit:
+        result_pages = self.iter_result_pages(max_pages, fan_out)
+        try:
+            for page_number, page_cards in result_pages:
+                pages_visited += 1
+                candidates = candidates.extend(CandidateTable.from_cards(page_cards, page_number))
+                # enough items - the tabs still loading are not needed
+                if candidates.count_qualifying(max_price) >= limit:
                     break
+        finally:
+            result_pages.close()
 
-                if not page_urls:
-                    # using fallback for this page too
-                    remaining = limit - len(collected)
-                    if remaining <= 0:
-                        break
-                    fallback_urls = self._get_any_item_urls_on_page(remaining)
-                    _add_unique(fallback_urls)
-            except PlaywrightError:
-                break
+        collected = candidates.best_urls(max_price, limit)
+        if not collected:
+            print(f"No items found under price {max_price} in {pages_visited} result pages")
 
         print(
             f"collect_items_under_price_across_pages: "
-            f"final collected {len(collected)} URLs (limit={limit})"
+            f"final collected {len(collected)} URLs (limit={limit}) "
+            f"out of {len(candidates)} cards from {pages_visited} pages"
         )
         return collected
 
+    def iter_qualifying_urls(self, max_price:float, max_pages:int = 5, fan_out:int | None = None) -> Iterator[str]:
+        # qualifying item urls as each results page is parsed, cheapest first within a page.
+        # pulling from the generator is the backpressure: the next page is only read when the
+        # consumer wants more, and closing it (e.g. enough items in the cart) stops the prefetch
+        seen = set()
+        result_pages = self.iter_result_pages(max_pages, fan_out, eager=True)
+        try:
+            for page_number, page_cards in result_pages:
+                for url in CandidateTable.from_cards(page_cards, page_number).best_urls(max_price):
+                    if url not in seen:
+                        seen.add(url)
+                        yield url
+        finally:
+            result_pages.close()
+
+# page -> the product page objects made on it (see follow_navigations)
+_product_pages = weakref.WeakKeyDictionary()
+
+def follow_navigations(product_page):
+    # one "framenavigated" listener per page for every product page object made on it (sync or async),
+    # so the flows can make a new object per item without piling listeners on a long lived tab
+    page = product_page.page
+    product_pages = _product_pages.get(page)
+    if product_pages is None:
+        product_pages = _product_pages[page] = weakref.WeakSet()
+
+        def on_frame_navigated(frame):
+            for known in list(product_pages):
+                known._on_frame_navigated(frame)
+
+        page.on("framenavigated", on_frame_navigated)
+    product_pages.add(product_page)
+
 class ProductPage(BasePage):
 # Provides helpers for opening product url, read its price, and add it to cart
 
+    network_policy = "product"
+
     def __init__(self, page):
         super().__init__(page)
+        # layout of the last classified product page and its url - a navigation makes it stale
+        self._layout = None
+        self._layout_url = None
+        # state of the current page from one evaluation (see snapshot), dropped on navigation and on our clicks
+        self._snapshot = None
+        follow_navigations(self)
+        # AddToCartSignal of the last add to cart click (pages/cart_signals.py)
+        self.last_cart_signal = None
+        # VariationCombination picked by the last select_cheapest_variation (utils/variation_model.py)
+        self.last_variation = None
+
+    def detect_layout(self, timeout: int = 10_000) -> ProductLayout:
+        # classify the current page once from a dom fingerprint (pages/product_layouts.py),
+        # every later call on the same url is free
+        if self._layout is not None and self._layout_url == self.page.url:
+            return self._layout
 
-    def _try_select_simple_variations(self) -> None:
-
-       # try to select simple size\colors - ignore non-valid options
-        logger.debug(" Trying to select simple variations (size/color/etc.)")
-
-        #<select> dropdowns
         try:
-            selects = self.page.locator("select")
-
-            for i in range(selects.count()):
-                select = selects.nth(i)
-                if not select.is_visible():
-                    continue
-
-                # select the first non-disabled, non-empty option
-                options = select.locator("option:not([disabled]):not([value=''])")
-                if options.count() == 0:
-                    continue
-
-                # of already a value selected
-                try:
-                    current_value = select.input_value()
-                except (PlaywrightError, AttributeError):
-                    current_value = None
-
-                if current_value:
-                    continue
-
-                first = options.first
-                value = first.get_attribute("value")
-                label = (first.text_content() or "").strip()
-
-                try:
-                    if value:
-                        select.select_option(value)
-                    elif label:
-                        select.select_option(label=label)
-                    else:
-                        # weird option - skip
-                        continue
-                except (PlaywrightError, AttributeError) as e:
-                    logger.debug(
-                        "ProductPage Failed to select option on a <select>: %s", e
-                    )
-                    continue
-
-                logger.debug(
-                    "ProductPage selected variation on <select>: value=%r, label=%r",value,label,
-                )
-
-
-            # Very generic selector for button-based variations
-            variation_buttons = self.page.locator(
-                "button[role='radio'], "
-                "li[role='radio'] button, "
-                "li[role='button'] button"
-            )
-
-            if variation_buttons.count() > 0:
-                for i in range(variation_buttons.count()):
-                    btn = variation_buttons.nth(i)
-                    if not btn.is_visible():
-                        continue
-
-                    aria_pressed = btn.get_attribute("aria-pressed")
-                    aria_checked = btn.get_attribute("aria-checked")
-
-                    # skip buttons if already selected
-                    if aria_pressed in ("true", "mixed") or aria_checked == "true":
-                        continue
-
-                    try:
-                        btn.click()
-                    except PlaywrightError as e:
-                        logger.debug(
-                            "ProductPage Failed to click variation button: %s", e
-                        )
-                        continue
-
-                    logger.debug(
-                        "ProductPage Auto-clicked variation button with text=%r",
-                        (btn.text_content() or "").strip(),
-                    )
-                    break  # only one is needed
+            # markers of all the layouts at once - returns as soon as any of them is there
+            self.page.locator(ANY_MARKER).first.wait_for(state="attached", timeout=timeout)
+        except PlaywrightError:
+            pass
+        try:
+            name = self.page.evaluate(LAYOUT_FINGERPRINT_JS, FINGERPRINT_ARGS)
+        except PlaywrightError:
+            name = None
+        return self._set_layout(name)
+
+    def _set_layout(self, name: str | None) -> ProductLayout:
+        self._layout = layout_for(name)
+        self._layout_url = self.page.url
+        layout_stats[self._layout.name] += 1
+        logger.debug("Product page layout: %s (%s)", self._layout.name, self.page.url)
+        return self._layout
+
+    def _on_frame_navigated(self, frame):
+        if frame == self.page.main_frame:
+            self._snapshot = None
+
+    def invalidate_snapshot(self):
+        self._snapshot = None
+
+    def snapshot(self, refresh: bool = False) -> ProductSnapshot:
+        # title, price, layout, add to cart button, variation pickers and error banners of the
+        # current page, read in one evaluation (PRODUCT_SNAPSHOT_JS). the page methods answer from it
+        # until the page navigates or we click something
+        if not refresh and self._snapshot is not None and self._snapshot.url == self.page.url:
+            return self._snapshot
+        try:
+            record = self.page.evaluate(PRODUCT_SNAPSHOT_JS, [
+                SNAPSHOT_LAYOUTS,
+                self.variation_selectors,
+                self.variation_button_selectors,
+                list(self.error_selectors),
+            ])
+        except PlaywrightError as exc:
+            # page in the middle of a navigation - an empty answer, not cached
+            logger.debug("ProductPage snapshot failed: %s", exc)
+            return ProductSnapshot.from_record({"url": self.page.url})
+        self._snapshot = ProductSnapshot.from_record(record)
+        if self._layout is None or self._layout_url != self.page.url:
+            # the snapshot classified the page on the way
+            self._set_layout(self._snapshot.layout)
+        return self._snapshot
+
+    @property
+    def layout(self) -> ProductLayout:
+        return self.detect_layout()
+
+    def select_cheapest_variation(self, max_price: float | None = None):
+        # multi variation listings: read the option matrix (MSKU model) from the snapshot, solve for the
+        # cheapest in-stock combination and set every picker to it in one call (APPLY_VARIATIONS_JS).
+        # returns the VariationCombination, or None when nothing in stock fits (or nothing to select)
+        snapshot = self.snapshot()
+        if not snapshot.variations:
+            return None
+        model = snapshot.variation_model
+        combination = model.cheapest_in_stock(max_price)
+        self.last_variation = combination
+        if combination is None:
+            logger.info("ProductPage no in-stock variation among %d combinations: %s", len(model), self.page.url)
+            return None
+        self._apply_variation(snapshot, combination)
+        return combination
+
+    def select_variation(self, values: dict):
+        # set the pickers to a given combination, e.g. the "Size: 9, Color: Red" of a cart line.
+        # returns the VariationCombination (with its price when the model knows it), None without pickers
+        snapshot = self.snapshot()
+        if not snapshot.variations:
+            return None
+        combination = next(
+            (known for known in snapshot.variation_model.combinations if known.values == values),
+            VariationCombination(values, None, True),
+        )
+        self.last_variation = combination
+        self._apply_variation(snapshot, combination)
+        return combination
 
+    def _apply_variation(self, snapshot: ProductSnapshot, combination: VariationCombination):
+        plan = plan_selections(snapshot.variations, combination)
+        picks = [[option.selector or control.selector, None if option.selector else option.value] for control, option in plan]
+        try:
+            failed = self.page.evaluate(APPLY_VARIATIONS_JS, picks) if picks else []
         except PlaywrightError as exc:
             # variation fail sould not make the test as awhole fail.
-            logger.debug(
-                "ProductPage Ignoring exception while trying to auto-select variations: %s",
-                exc,
-            )
-
-# check if add to cart is a success or a failure (success on view of cart)
-    def _wait_for_add_to_cart_confirmation(self, timeout: int = 8000) -> bool:
-
+            logger.debug("ProductPage Ignoring exception while selecting variations: %s", exc)
+            failed = [selector for selector, _ in picks]
+        finally:
+            self.invalidate_snapshot()
+
+        if failed:
+            logger.debug("ProductPage could not apply variation pickers %s", failed)
+        logger.debug("ProductPage selected variation %s (price %s)", combination.values, combination.price)
+
+# click add to cart and check if it is a success or a failure
+    def _click_and_wait_for_cart(self, selector: str, timeout: int = 8000) -> bool:
+        # click add to cart and wait for the first signal of the outcome (pages/cart_signals.py):
+        # the add to cart response, the cart count going up or the "View cart" layer.
+        # an error message like "Please select" ends the wait right away
         try:
-            # give the page time to react
-            try:
-                self.page.wait_for_load_state("networkidle", timeout=timeout)
-            except PlaywrightTimeoutError:
-                # continue to check forconfirmation anyway
-                pass
-
-            #success condition
-            self.page.wait_for_selector(
-                "a[href*='/cart'] >> text=View cart",
-                timeout=timeout,
-                state="visible",
-            )
-            logger.debug("View cart - confirmation detected.")
-            return True
-
-        except PlaywrightTimeoutError:
-            # No cart confirmation - "This item cannot be added to your cart" or "Please select"
-
-            error_locator = self.page.locator(
-                "text=\"This item cannot be added to your cart\", "
-                "text=\"Add to cart failed\", "
-                "text=\"Please select\""
-            )
-            if error_locator.first.is_visible():
-                logger.info("Add to cart appears to have failed (error message visible).")
-            else:
-                logger.info("No cart confirmation found - assuming add-to-cart failed.")
-            return False
-
+            signal = wait_for_add_to_cart(self.page, self.page.locator(selector).first.click, timeout)
         except PlaywrightError as exc:
             # page or context closed while waiting
             logger.warning(
                 "Page/context closed while waiting for add to cart confirmation: %s",
                 exc,
             )
+            self.last_cart_signal = None
             return False
+        finally:
+            self.invalidate_snapshot()
+
+        self.last_cart_signal = signal
+        if signal.ok:
+            logger.debug("Add to cart confirmed by %s in %.1fs (%s)", signal.signal, signal.seconds, signal.detail)
+        elif signal.signal == "timeout":
+            logger.info("No cart confirmation found - %s", signal.detail)
+        else:
+            logger.info("Add to cart appears to have failed (%s: %s)", signal.signal, signal.detail)
+        return signal.ok
 
     def open(self, url:str):
         self.goto(url)
-        # Wait for product title
+        # Wait for product title of this layout only
+        layout = self.detect_layout()
         try:
-            self.wait_for_visible("h1.it-ttl, h1.vi-atw-title")
+            self.wait_for_visible(", ".join(layout.title))
         except PlaywrightError:
             # ignore if title is not found
             pass
 
 # check if the page is appears loaded
     def is_loaded(self, timeout: int = 10_000):
-        # wait for either a product title or add to cart button
-
-        title_locator = self.page.locator(
-            "h1[data-testid='x-item-title'], h1[itemprop='name']"
-        ) # product title
-        atc_locator = self.page.locator(
-            "a:has-text('Add to cart'), button:has-text('Add to cart'), button[aria-label*='Add to cart']"
-        )# add to cart button
-
+        # wait for either a product title or add to cart button of the detected layout
+        layout = self.detect_layout(timeout)
         try:
-            title_locator.first.wait_for(state="visible", timeout=timeout)
-            #loaded
-            return True
-        except PlaywrightError:
-            pass
-
-        try:
-            atc_locator.first.wait_for(state="visible", timeout=timeout)
+            self.page.locator(", ".join(layout.title + layout.add_to_cart)).first.wait_for(
+                state="visible", timeout=timeout
+            )
             #loaded
             return True
         except PlaywrightError:
-            pass
-
-        return False
+            return False
 
     def choose_default_variant(self) -> bool:
-        # try <select> elements
-        selects = self.page.locator(
-            "select[name*='variant'], select[id*='msku-sel'], select[name*='size'], select[name*='color']"
-        )
-        if selects.count():
-            sel = selects.first
-            options = sel.locator("option:not([disabled])")
-            if options.count() > 1:
-                # pick first real option
-                options.nth(1).click()
-                return True
-            elif options.count() == 1:
-                options.first.click()
-                return True
-
-        # buttons / swatches / radio inputs
-        variant_buttons = self.page.locator(
-            "button[aria-label*='Select'], button[aria-label*='Color'], button[aria-label*='Size'], input[type='radio'], .msku-swatch--selectable"
-        )
-        if variant_buttons.count():
-            for i in range(variant_buttons.count()):
-                btn = variant_buttons.nth(i)
-                try:
-                    if btn.is_enabled() and btn.is_visible():
-                        btn.click()
-                        return True
-                except (PlaywrightError, AttributeError):
-                    continue
-
-        # No variant found so assume no variant needed
-        return True
+        # the cheapest in-stock combination of every picker (selects, swatches, radio buttons), in one go
+        if not self.snapshot().variations:
+            # No variant found so assume no variant needed
+            return True
+        return self.select_cheapest_variation() is not None
 
     # trying to get the price and send it through my price parser
     def get_price(self):
+        # price selectors of the detected layout, first one present wins (parsed by the snapshot).
+        # a range price ("$10.00 to $20.00") is the most the item can cost before a variation
+        # is picked - its upper end, so the budget checks never count it too low
+        return self.snapshot().max_price
 
-        price_selectors = [
-            "span#prcIsum",  # standard price
-            "span#prcIsum_bidPrice",  # auction price
-            "span#mm-saleDscPrc"  # sale price
-        ]
-        for selector in price_selectors:
-            try:
-                price_text = self.page.locator(selector).inner_text().strip()
-                price_value = parse_price_to_number(price_text)
-                if price_value > 0:
-                    return price_value
-            except (PlaywrightError, AttributeError, ValueError, TypeError):
-                continue
-        return 0.0
-
-    # tries adding the product to cart, return bool
+    # tries adding the product to cart, return True only when the cart confirmed it
     def click_add_to_cart(self):
         # wait for page content to load
         try:
             self.page.wait_for_load_state("domcontentloaded", timeout=10_000)
-            self.page.wait_for_timeout(300)
         except PlaywrightError:
             print(f"Product page load state timeout: {self.page.url}")
 
-        add_button_selectors = [
-            "button#atcBtn_btn",
-            "button#atcRedesignId_btn",
-            "button:has-text('Add to cart')",
-            "a:has-text('Add to cart')",
-            "button[aria-label*='Add to cart']",
-            "button[data-test-id='x-atc-action']",
-        ]
-
-        for selector in add_button_selectors:
-            try:
-                btn = self.page.locator(selector).first
-                if btn.count() and btn.is_visible():
-                    print(f"Clicking Add to Cart using selector: {selector}")
-                    btn.click()
-                    # wait for cart update or popups
-                    try:
-                        self.page.wait_for_load_state("networkidle", timeout=10_000)
-                    except PlaywrightError:
-                        #ignore -  still consider click as attempted
-                        pass
-                    return True
-            except PlaywrightError as e:
-                print(f"Selector '{selector}' failed: {e}")
-                continue
+        snapshot = self.snapshot()
+        if not snapshot.has_add_to_cart:
+            print(f"No Add to Cart button visible on product page: {self.page.url}")
+            return False
 
-        print(f"No Add to Cart button visible on product page: {self.page.url}")
-        return False
+        print(f"Clicking Add to Cart using selector: {snapshot.add_to_cart_match}")
+        # wait for the cart update (or an error) instead of a quiet network, which may never come.
+        # the details (which signal, how long) are in last_cart_signal for callers that retry
+        return self._click_and_wait_for_cart(snapshot.add_to_cart, 10_000)
 
 # tries to handle all post add to cart click popups like warranty or things like that
     def handle_post_add_popups(self):
 
-        popup_selectors = [
-            "button#ADDON_0-cta",  # warranty upsell
-            "button#addonSkipBtn",  # skip add‑on
-            "button[aria-label='Close']",  # close icon
-            "button:has-text('No thanks')",  # decline upsell
-            "button:has-text('Continue shopping')",  # continue shopping
-            "button:has-text('Go to cart')",  # proceed to cart
-            "button:has-text('View cart')"  # view cart popup
-        ]
-        for selector in popup_selectors:
-            try:
-                btn = self.page.locator(selector)
-                if btn.count() and btn.first.is_visible():
-                    btn.first.click()
-                    #wait for popup to close
-                    self.page.wait_for_timeout(500)
-                    break
-            except PlaywrightError:
-                continue
+        # warranty upsells and add-on offers are popup watcher handlers
+        watch_popups(self.page)
 
     # add to cart full sequence - url is provided: navigate to url
     #                           - url is None: assume already navigated to url
     #                           - return True if item confirmed as added to cart, False otherwise.
-    def add_to_cart_full_seq(self, product_url: str | None = None):
+    #                           - variation: {picker name: value} to select, None for the cheapest in stock
+    #                           - timeout: ms to wait for the cart to confirm the click
+    def add_to_cart_full_seq(self, product_url: str | None = None, variation: dict | None = None,
+                             timeout: int = 8000):
 
         if product_url is None:
             # did not get a url – use current page
@@ -939,34 +893,32 @@ class ProductPage(BasePage):
         else:
             #navigate to the product page
             logger.debug("Opening product page: %s", product_url)
-            self.page.goto(product_url, wait_until="networkidle")
-
-        # select simple dropdown (if there is one)
-        self._try_select_simple_variations()
-
-        # try finding to cart button
-        add_btn = self.page.locator(
-            "a:has-text('Add to cart'), button:has-text('Add to cart')"
-        ).first
+            # the profile's load state, then the title / add to cart of the layout - not networkidle
+            self.goto(product_url)
+            self.is_loaded()
+
+        # variation listings: the cheapest in-stock combination (or the one asked for), all pickers set at once.
+        # nothing in stock - no point clicking and waiting for "Please select"
+        if self.snapshot().variations:
+            chosen = self.select_variation(variation) if variation else self.select_cheapest_variation()
+            if chosen is None:
+                logger.warning(" No in-stock variation for product: %s", product_url)
+                return False
 
-        if not add_btn.is_visible():
+        # try finding to cart button of this layout
+        snapshot = self.snapshot()
+        if not snapshot.has_add_to_cart:
             logger.warning(
                 " No visible 'Add to cart' button for product: %s", product_url
             )
             return False
 
-        logger.debug(
-            "ProductPage found 'Add to cart' using selector: "
-            "a/button:has-text('Add to cart')"
-        )
+        logger.debug("ProductPage found 'Add to cart' using selector: %s", snapshot.add_to_cart_match)
 
-        #click the button
-        add_btn.click()
+        #click the button and wait for confirmation / error
+        success = self._click_and_wait_for_cart(snapshot.add_to_cart, timeout)
         logger.debug("Clicked Add to cart for: %s", product_url)
 
-        # Wait for confirmation / error
-        success = self._wait_for_add_to_cart_confirmation()
-
         if success:
             logger.info("Product added to cart (confirmed): %s", product_url)
         else:
@@ -981,68 +933,44 @@ class ProductPage(BasePage):
     #since eBay making it difficult for me
     def has_add_to_cart_button(self) -> bool:
 
-        # common selectors on different eBay layouts
-        candidate_selectors = [
-            "button#atcRedesignId_btn",
-            "a#isCartBtn_btn",
-            "button#binBtn_btn",
-
-            # Newer layouts
-            "button[data-testid='x-atc-action']",
-            "button[aria-label*='Add to cart']",
-            "button[aria-label*='Add to Cart']",
-            "a[aria-label*='Add to cart']",
-            "a[aria-label*='Add to Cart']",
-
-            #  CSS selectors text based
-            "button:has-text('Add to cart')",
-            "a:has-text('Add to cart')",
-        ]
-        for selector in candidate_selectors:
-            try:
-                some_locator = self.page.locator(selector).first
-                # if there is no element
-                if some_locator.count() == 0:
-                    continue
-
-                if some_locator.is_visible():
-                    print(
-                        f"ProductPage Found 'Add to cart' using selector: {selector}"
-                    )
-                    return True
-            except PlaywrightError as e:
-                # continue trying other selectors
-                print(
-                    f"ProductPage Selector {selector} raised {type(e).__name__}: {e}"
-                )
-                continue
-
-        # fallback using role/text helpers
-        try:
-            btn = self.page.get_by_role("button", name="Add to cart")
-            if btn.is_visible():
-                print(
-                    "ProductPage Found 'Add to cart' via get_by_role(button, 'Add to cart')."
-                )
-                return True
-        except PlaywrightError:
-            pass
-
-        try:
-            btn_text = self.page.get_by_text("Add to cart", exact=False)
-            if btn_text.is_visible():
-                print(
-                    "ProductPage Found 'Add to cart' via get_by_text('Add to cart')."
-                )
-                return True
-        except PlaywrightError:
-            pass
+        # the add to cart selectors of the detected layout, resolved by the snapshot
+        snapshot = self.snapshot()
+        if snapshot.has_add_to_cart:
+            print(f"ProductPage Found 'Add to cart' using selector: {snapshot.add_to_cart_match}")
+            return True
 
         return False
 
+    # variation pickers (size, color...) that must be set before Add to cart works
+    variation_selectors = [
+        "select.msku-sel",
+        "select[id*='msku-sel']",
+        "select[name*='variant']",
+        "[data-testid='x-msku-evo'] select",
+        "div.x-msku-evo select",
+    ]
+    # button pickers (swatches, size chips)
+    variation_button_selectors = [
+        "button[role='radio']",
+        "li[role='radio'] button",
+        "li[role='button'] button",
+        ".msku-swatch--selectable",
+        "button[aria-label*='Color']",
+        "button[aria-label*='Size']",
+    ]
+    # add to cart errors and listing status banners ("This listing has ended")
+    error_selectors = ERROR_SELECTORS + ("div.d-statusmessage", "[data-testid='d-statusmessage']")
+
+    def needs_variation(self) -> bool:
+        return bool(self.snapshot().variations)
+
 class CartPage(BasePage):
+
+    network_policy = "cart"
     def __init__(self, page):
         super().__init__(page)
+        # whether the last clear() left the cart verified empty
+        self.cleared = None
 
     def is_loaded(self):
         try:
@@ -1053,66 +981,72 @@ class CartPage(BasePage):
 
     def open(self):
 
-        self.goto("https://cart.ebay.com/")
+        self.goto(config.get_cart_url())
         self.is_loaded()
 
     def get_cart_item_rows(self):
-        # return a list of elements for eaxh item row in the cart
-        rows = self.page.locator("div.cart-bucket")
-        return rows.element_handles()
+        # return a locator for each item row in the cart (locators, not element handles - nothing to dispose)
+        return self.page.locator("div.cart-bucket").all()
+
+    def get_cart_contents(self) -> CartContents:
+        # every cart line (item id, title, qty, price, shipping) and the summary, read in one call
+        try:
+            return CartContents.from_record(self.page.evaluate(EXTRACT_CART_JS))
+        except PlaywrightError:
+            return CartContents((), None, None, False)
 
     def get_cart_item_titles(self):
         # return the titles of all items in the cart as a list
-        #the titles are stored inside the utem row. iterate on the rows and get the text.
-        titles = []
-        for row in self.get_cart_item_rows():
-            try:
-                title = row.query_selector("a.item-title").inner_text().strip()
-                titles.append(title)
-            except (PlaywrightError, AttributeError):
-                continue
-        return titles
+        return [line.title for line in self.get_cart_contents().lines if line.title]
 
-    # return a list of prices per item. each row contains proce element.
-    # then we pass the price through price parser. if a price cannot be parsed - ignore it.
+    # return a list of prices per item (the line price, passed through the price parser)
     def get_cart_item_prices(self):
-        prices = []
-        for row in self.get_cart_item_rows():
-            try:
-                price_text = row.query_selector("span.item-price").inner_text().strip()
-                price_value = parse_price_to_number(price_text)
-                prices.append(price_value)
-            except (PlaywrightError, AttributeError, ValueError, TypeError):
-                continue
+        return [line.price for line in self.get_cart_contents().lines]
 
-        return prices
+    def get_cart_item_ids(self) -> List[str]:
+        # item id of every cart line
+        return self.get_cart_contents().item_ids
 
     # return the total car price. if no total can be found return 0.0
-    # if total found parse it  with our price parser
+    # the summary subtotal, or the sum of the line prices when there is none
     def get_cart_total(self):
-
-        total_price_selectors = [
-            "span#SUBTOTAL",  # sometimes used
-            "span#total",  # fallback
-            "div#SUBTOTAL div"  # older markup
-        ]
-        for selector in total_price_selectors:
-            try:
-                elem = self.page.locator(selector)
-                if elem.is_visible():
-                    text = elem.inner_text().strip()
-                    return parse_price_to_number(text)
-            except (PlaywrightError, AttributeError, ValueError, TypeError):
-                continue
-        #fallback - sum individual prices
-        return sum(self.get_cart_item_prices())
+        return self.get_cart_contents().total
 
     # return True if cart is empty, otherwise False.
     # check for "you dont have any items in your cart" message
     def is_cart_empty(self):
-        try:
-            empty_msg = self.page.locator("#Cart .empty-cart__title")
-            return empty_msg.is_visible()
-        except PlaywrightError:
-            return False
+        return self.get_cart_contents().empty
+
+    # remove buttons of a cart line, the first visible one per line is clicked
+    remove_selectors = [
+        "button[data-test-id='cart-remove-item']",
+        "[data-test-id='cart-remove-item']",
+        "button:has-text('Remove')",
+    ]
+
+    def clear(self, max_passes: int = 3, timeout: int = 10_000) -> CartContents:
+        # empty the cart: click every line's remove button at once (REMOVE_CART_LINES_JS), wait for
+        # the lines to go, then reload the cart to verify. a cart that re-renders after the first
+        # removal gets another pass. returns what was in the cart before (see restore_cart in
+        # flows/shopping_flow.py) - self.cleared tells whether the reloaded cart was really empty
+        self.open()
+        before = contents = self.get_cart_contents()
+        for _ in range(max_passes):
+            if not contents.lines:
+                break
+            try:
+                clicked = self.page.evaluate(REMOVE_CART_LINES_JS, self.remove_selectors)
+                if clicked:
+                    self.page.wait_for_function(CART_HAS_NO_LINES_JS, timeout=timeout)
+            except PlaywrightError as exc:
+                logger.debug("CartPage removal pass did not finish: %s", exc)
+            self.open()
+            contents = self.get_cart_contents()
+
+        self.cleared = not contents.lines
+        if self.cleared:
+            logger.info("Cart cleared (%d lines removed)", len(before.lines))
+        else:
+            logger.warning("Cart still has %d lines after clearing", len(contents.lines))
+        return before
 
@@ -1,70 +1,242 @@
-
-from playwright.sync_api import sync_playwright
 import base64
-from pathlib import Path
 import pytest
 from pytest_html import extras
 
+from core import config as app_config
+from core.browser_pool import BrowserPool
+from core.network_policy import NetworkBlocker
+from core.har_mode import HAR_MODES, HAR_NOT_FOUND_RULES, attach_har
+from flows.shopping_flow import screenshots, search_cache
+from local_ebay import start_server
+from pages.popup_watcher import popup_stats
+from pages.product_layouts import layout_stats
+
+SCREENSHOT_MIME_TYPES = {".jpg": "image/jpeg", ".webp": "image/webp", ".png": "image/png"}
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--profile",
+        action="store",
+        default=None,
+        choices=sorted(app_config.PROFILES),
+        help="execution profile (default: EBAY_PROFILE or debug)",
+    )
+    parser.addoption(
+        "--browser-pool-size",
+        action="store",
+        type=int,
+        default=None,
+        help="number of chromium processes shared by the whole session (default: EBAY_BROWSER_POOL_SIZE or 1)",
+    )
+    parser.addoption(
+        "--local-ebay",
+        action="store_true",
+        default=False,
+        help="run against the bundled local eBay stand-in instead of the live site",
+    )
+    parser.addoption(
+        "--local-ebay-latency",
+        action="store",
+        type=int,
+        default=0,
+        help="milliseconds the local stand-in waits before every response",
+    )
+    parser.addoption(
+        "--har-mode",
+        action="store",
+        default=None,
+        choices=HAR_MODES,
+        help="record every scenario into hars/<scenario>.har or replay it from there (default: EBAY_HAR_MODE or off)",
+    )
+    parser.addoption(
+        "--har-not-found",
+        action="store",
+        default=None,
+        choices=HAR_NOT_FOUND_RULES,
+        help="replay rule for requests missing from the HAR (default: EBAY_HAR_NOT_FOUND or abort)",
+    )
+    parser.addoption(
+        "--search-mode",
+        action="store",
+        default=None,
+        choices=app_config.SEARCH_MODES,
+        help="open search results by url or through the home page search box (default: EBAY_SEARCH_MODE or url)",
+    )
+    parser.addoption(
+        "--no-search-cache",
+        action="store_true",
+        default=False,
+        help="always search in the browser, ignore and do not update the search results cache",
+    )
+    parser.addoption(
+        "--cart-tabs",
+        action="store",
+        type=int,
+        default=None,
+        help="add the products to the cart N at a time, each in its own tab",
+    )
+    parser.addoption(
+        "--stream",
+        action="store_true",
+        default=False,
+        help="search and add to cart as one stream, the search stops once the limit is in the cart",
+    )
+    parser.addoption(
+        "--concurrency",
+        action="store",
+        type=int,
+        default=None,
+        help="run the scenarios with the async runner, N at a time",
+    )
+
+def pytest_configure(config):
+    # resolve the execution profile once, before any browser starts
+    profile_name = config.getoption("--profile")
+    try:
+        if profile_name:
+            app_config.set_profile(profile_name)
+        else:
+            app_config.get_profile()
+    except ValueError as exc:
+        raise pytest.UsageError(str(exc))
+    app_config.set_search_mode(config.getoption("--search-mode"))
+    app_config.set_har_mode(config.getoption("--har-mode"))
+    if config.getoption("--no-search-cache"):
+        search_cache.enabled = False
+
+def pytest_collection_modifyitems(config, items):
+    # with --concurrency the async runner (test_e2e_concurrent.py) runs every scenario. the sequential
+    # e2e test would run them all again against the same users' carts, so it is skipped
+    if not config.getoption("--concurrency"):
+        return
+    skip = pytest.mark.skip(reason="the scenarios run concurrently (--concurrency)")
+    for item in items:
+        if getattr(item, "originalname", None) == "test_e2e_add_items_and_verify_total":
+            item.add_marker(skip)
+
+def pytest_report_header(config):
+    return f"execution profile: {app_config.get_profile().name}"
+
+def pytest_terminal_summary(terminalreporter):
+    if popup_stats:
+        fired = ", ".join(f"{name}={count}" for name, count in popup_stats.most_common())
+        terminalreporter.write_line(f"popups dismissed: {fired}")
+    if layout_stats:
+        seen = ", ".join(f"{name}={count}" for name, count in layout_stats.most_common())
+        terminalreporter.write_line(f"product page layouts: {seen}")
+    # anything still queued (screenshots of the last test's teardown) is written before the run ends
+    screenshots.close()
+    if screenshots.written or screenshots.failed:
+        terminalreporter.write_line(
+            f"screenshots: {screenshots.written} written to {screenshots.directory} ({screenshots.failed} failed)"
+        )
+
 @pytest.hookimpl(hookwrapper=True)
 def pytest_runtest_makereport(item, call):
     #attach screenshots from photos folder to report
     outcome = yield
     report = outcome.get_result()
 
+    # remember the result of every phase so fixtures can tell if the test failed
+    setattr(item, f"rep_{report.when}", report)
+
     # attach only during the main test phase
     if report.when != "call":
         return
 
-    photos_dir = Path("photos")
-    if not photos_dir.exists():
-        return
-
+    # the screenshots this test queued - wait for the writer, then attach what it wrote
     extra = getattr(report, "extra", [])
 
-    for screenshot in sorted(photos_dir.glob("product_*.png")):
+    for screenshot in screenshots.flush():
         try:
             with screenshot.open("rb") as f:
                 b64_data = base64.b64encode(f.read()).decode("utf-8")
 
-            # use PNG helper with base64 string
-            extra.append(extras.png(b64_data))
+            mime_type = SCREENSHOT_MIME_TYPES.get(screenshot.suffix, "image/png")
+            extra.append(extras.image(b64_data, name=screenshot.stem, mime_type=mime_type,
+                                      extension=screenshot.suffix.lstrip(".")))
 
         except Exception as e:
             print(f"[WARN] Failed to attach screenshot {screenshot}: {e}")
 
     report.extra = extra
 
+@pytest.fixture(scope="session", autouse=True)
+def local_ebay_server(pytestconfig):
+    # start the stand-in and point config.get_base_url() (and every page object) at it
+    if not pytestconfig.getoption("--local-ebay"):
+        yield None
+        return
+    server = start_server(latency_ms=pytestconfig.getoption("--local-ebay-latency"))
+    app_config.set_base_url(server.base_url)
+    print(f"local eBay stand-in: {server.base_url}")
+    yield server
+    app_config.set_base_url(None)
+    server.stop()
+
+@pytest.fixture(scope="session")
+def browser_pool(pytestconfig):
+    # one pool of running browsers for the whole session instead of a cold launch per test
+    size = pytestconfig.getoption("--browser-pool-size") or app_config.get_browser_pool_size()
+    launch_options = app_config.get_profile().launch_options()
+    # pytest-playwright's --headed still forces a visible browser (needed for the login CAPTCHA)
+    if pytestconfig.getoption("--headed", default=False):
+        launch_options["headless"] = False
+    pool = BrowserPool(size=size, **launch_options)
+    pool.start()
+    yield pool
+    print(f"BrowserPool: {pool.launches} browser launches, {pool.recycled} recycled")
+    pool.close()
+
+def _scenario_name(request):
+    # parametrized scenario tests are named after the scenario, anything else after the test
+    callspec = getattr(request.node, "callspec", None)
+    scenario = callspec.params.get("scenario") if callspec else None
+    if isinstance(scenario, dict) and scenario.get("scenarioName"):
+        return scenario["scenarioName"]
+    return request.node.name
+
 @pytest.fixture
-def page():
-
-    with sync_playwright() as p:
-        browser = p.chromium.launch(
-            headless=False,
-            slow_mo=1000,
-            args=[
-                "--disable-features=WebAuthentication", # blocks Windows Hello
-                "--disable-webauthn",  # newer Chromium flag
-                "--disable-usb-keyboard-detect", # prevents security key prompt
-                "--disable-extensions",
-                "--disable-logging",
-                "--disable-infobars",
-                "--start-maximized"  # start browser in maximized window
-            ]
-        )
-        # Create a new context
-        # ensure elements are visible during tests.
-        context = browser.new_context()
-        page = context.new_page()
+def context(browser_pool, request, pytestconfig):
+    # a fresh isolated context for every test (every scenario)
+    profile = app_config.get_profile()
+    context = browser_pool.acquire(**profile.context_options())
+    profile.apply_timeouts(context)
 
-        # Ensure the page is also set to the same viewport size.
-        try:
-            page.set_viewport_size({"width": 1920, "height": 1080})
-        except Exception:
-            pass
+    # record or replay the traffic of this scenario (must be routed before the blocker)
+    har_path = attach_har(
+        context,
+        _scenario_name(request),
+        mode=pytestconfig.getoption("--har-mode"),
+        not_found=pytestconfig.getoption("--har-not-found"),
+    )
+    if har_path is not None:
+        print(f"HAR: {har_path}")
+
+    # drop images, fonts and trackers the page objects never read
+    blocker = NetworkBlocker().attach(context) if profile.block_resources else None
+
+    yield context
+
+    if blocker is not None:
+        print(f"NetworkBlocker: {blocker.summary()}")
+        blocker.detach(context)
+
+    # a failed test gets its browser recycled so the next scenario starts clean
+    report = getattr(request.node, "rep_call", None)
+    browser_pool.release(context, failed=report is not None and report.failed)
+
+@pytest.fixture
+def page(context):
+
+    # viewport and timeouts come from the execution profile of the context
+    page = context.new_page()
 
-        # Give the test a usable page object
-        yield page
+    # Give the test a usable page object
+    yield page
 
-        # Cleanup after the test
-        context.close()
-        browser.close()
\ No newline at end of file
+    # Cleanup after the test
+    try:
+        page.close()
+    except Exception:
+        pass
@@ -0,0 +1,89 @@
+import time
+
+import pytest
+
+from flows import shopping_flow
+from flows.shopping_flow import ADDED, ERROR, NO_ADD_TO_CART, AddToCartResult, reconcile_with_cart
+
+def test_cart_has_the_last_word():
+    results = [
+        AddToCartResult("u1", "100000001", ADDED),
+        AddToCartResult("u2", "100000002", ERROR, "timed out after 45s"),
+        AddToCartResult("u3", "100000003", ADDED),
+        AddToCartResult("u4", "100000004", NO_ADD_TO_CART),
+    ]
+    reconciled = reconcile_with_cart(results, ["100000001", "100000002"])
+    assert [result.status for result in reconciled] == [ADDED, ADDED, ERROR, NO_ADD_TO_CART]
+    assert "found in the cart" in reconciled[1].detail
+    assert reconciled[2].detail == "confirmed but missing from the cart"
+
+
+class FakeTab:
+
+    def __init__(self):
+        self.default_timeouts = []
+
+    def set_default_timeout(self, timeout):
+        self.default_timeouts.append(timeout)
+
+    def set_default_navigation_timeout(self, timeout):
+        pass
+
+    def wait_for_url(self, predicate, timeout=None):
+        pass
+
+
+class SlowProductPage:
+    # every wait takes "wait" seconds, or the timeout it was given if that is shorter
+
+    wait = 0.0
+
+    def __init__(self, tab):
+        self.tab = tab
+        self.last_variation = None
+        self.last_cart_signal = None
+        self.add_timeout = None
+
+    def _wait(self, timeout_ms):
+        time.sleep(min(self.wait, timeout_ms / 1000))
+        return self.wait <= timeout_ms / 1000
+
+    def is_loaded(self, timeout):
+        return self._wait(timeout)
+
+    def has_add_to_cart_button(self):
+        return True
+
+    def needs_variation(self):
+        return False
+
+    def get_price(self):
+        return 10.0
+
+    def add_to_cart_full_seq(self, timeout):
+        self.add_timeout = timeout
+        return self._wait(timeout) and False
+
+
+@pytest.fixture
+def slow_product(monkeypatch):
+    monkeypatch.setattr(shopping_flow, "ProductPage", SlowProductPage)
+    monkeypatch.setattr(shopping_flow, "_save_product_screenshot", lambda *args: None)
+    return SlowProductPage
+
+def _finish(timeout:float):
+    url = "https://www.ebay.com/itm/100000000001"
+    return shopping_flow._finish_product_tab(FakeTab(), url, "100000000001", 1, timeout, "deadlineUser")
+
+def test_item_deadline_covers_all_its_waits(slow_product):
+    # two waits of 0.15s each, 0.2s for the whole item
+    slow_product.wait = 0.15
+    result = _finish(0.2)
+    assert result.status == ERROR
+    assert result.detail.startswith("timed out after")
+    assert result.seconds < 0.3
+
+def test_quick_failure_is_not_a_timeout(slow_product):
+    slow_product.wait = 0.0
+    result = _finish(5)
+    assert result.status == ERROR and result.detail == "no cart confirmation"
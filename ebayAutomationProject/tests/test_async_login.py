@@ -0,0 +1,123 @@
+import asyncio
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from core import config
+from pages.async_shop_pages import AsyncLoginPage
+from pages.popup_watcher import POST_LOGIN_SELECTOR
+
+# a scripted stand-in for a playwright async page: each url shows a set of selectors,
+# and clicking some of them moves to another url. enough to drive the login sequence
+# without a browser.
+
+SIGNIN_URL = config.get_signin_url()
+HOME_URL = config.get_base_url()
+PASSKEY_URL = SIGNIN_URL.rstrip("/") + "/passkey"
+
+SCREENS = {
+    SIGNIN_URL: {"input#userid", "input#pass", "button#sgnBt"},
+    PASSKEY_URL: {"button:has-text('Skip for now')"},
+}
+
+
+class FakeLocator:
+
+    def __init__(self, page, selector:str):
+        self.page = page
+        self.selector = selector
+
+    @property
+    def first(self):
+        return self
+
+    async def count(self):
+        return int(self.page.shows(self.selector))
+
+    async def is_visible(self):
+        return self.page.shows(self.selector)
+
+    async def wait_for(self, state:str = "visible", timeout=None):
+        if not self.page.shows(self.selector):
+            raise PlaywrightTimeoutError(f"{self.selector} not visible")
+
+    async def fill(self, text:str):
+        self.page.filled[self.selector] = text
+
+    async def click(self, timeout=None):
+        await self.wait_for()
+        self.page.clicks.append(self.selector)
+        self.page.on_click(self.selector)
+
+
+class FakeLoginPage:
+
+    def __init__(self, passkey_screen:bool = False):
+        self.url = "about:blank"
+        self.context = object()
+        self.passkey_screen = passkey_screen
+        self.signed_in = False
+        self.filled = {}
+        self.clicks = []
+
+    def screen(self) -> set:
+        if self.url.startswith(HOME_URL):
+            return {"input#gh-ac", "#gh-ug"} if self.signed_in else {"input#gh-ac"}
+        return SCREENS.get(self.url, set())
+
+    def shows(self, selector:str) -> bool:
+        return any(part.strip() in self.screen() for part in selector.split(","))
+
+    def on_click(self, selector:str):
+        if selector == "button#sgnBt":
+            self.signed_in = True
+            self.url = PASSKEY_URL if self.passkey_screen else HOME_URL
+        elif "Skip for now" in selector:
+            self.url = HOME_URL
+
+    def locator(self, selector:str):
+        return FakeLocator(self, selector)
+
+    async def goto(self, url:str, wait_until=None):
+        self.url = url
+
+    async def evaluate(self, script:str, args):
+        # RESOLVE_FIRST_JS: the first candidate that is on screen
+        selectors, _ = args
+        for index, selector in enumerate(selectors):
+            if self.shows(selector):
+                return {"index": index, "selector": selector, "visible": True, "enabled": True,
+                        "count": 1, "text": ""}
+        return None
+
+    async def wait_for_url(self, predicate, timeout=None):
+        if not predicate(self.url):
+            await asyncio.sleep(0)
+            raise PlaywrightTimeoutError("url did not change")
+
+    async def add_locator_handler(self, *args, **kwargs):
+        pass
+
+    def once(self, event:str, callback):
+        pass
+
+
+def test_is_logged_in_reads_the_page():
+    page = FakeLoginPage()
+    login_page = AsyncLoginPage(page)
+    asyncio.run(page.goto(SIGNIN_URL))
+    assert asyncio.run(login_page.is_logged_in()) is False
+    page.signed_in = True
+    asyncio.run(page.goto(HOME_URL))
+    assert asyncio.run(login_page.is_logged_in()) is True
+
+def test_login_full_seq_signs_in():
+    page = FakeLoginPage()
+    assert asyncio.run(AsyncLoginPage(page).login_full_seq("user@example.com", "secret")) is True
+    assert page.filled == {"input#userid": "user@example.com", "input#pass": "secret"}
+    assert page.clicks == ["button#sgnBt"]
+    assert page.url == HOME_URL
+
+def test_login_clicks_through_the_passkey_screen():
+    page = FakeLoginPage(passkey_screen=True)
+    assert asyncio.run(AsyncLoginPage(page).login_full_seq("user@example.com", "secret")) is True
+    assert page.clicks == ["button#sgnBt", POST_LOGIN_SELECTOR]
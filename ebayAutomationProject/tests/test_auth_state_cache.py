@@ -0,0 +1,55 @@
+import os
+import time
+
+from flows import shopping_flow
+from utils.auth_state_cache import AuthStateCache, has_valid_auth_cookies
+
+def _state(name="ds2", expires=-1):
+    return {"cookies": [{"name": name, "value": "x", "domain": ".ebay.com", "expires": expires}], "origins": []}
+
+def test_auth_cookie_validity():
+    now = time.time()
+    assert has_valid_auth_cookies(_state(expires=-1), now)
+    assert has_valid_auth_cookies(_state(expires=now + 60), now)
+    assert not has_valid_auth_cookies(_state(expires=now - 60), now)
+    assert not has_valid_auth_cookies(_state(name="dp1"), now)
+    assert not has_valid_auth_cookies({}, now)
+
+def test_cache_round_trip_and_invalidate(tmp_path):
+    cache = AuthStateCache(cache_dir=str(tmp_path), ttl_seconds=60)
+    assert cache.load("defaultUser") is None
+
+    cache.save("defaultUser", _state())
+    assert cache.load("defaultUser") == _state()
+
+    cache.invalidate("defaultUser")
+    assert cache.load("defaultUser") is None
+
+def test_cache_entry_expires_after_ttl(tmp_path):
+    cache = AuthStateCache(cache_dir=str(tmp_path), ttl_seconds=60)
+    cache.save("defaultUser", _state())
+
+    old = time.time() - 120
+    os.utime(cache._path("defaultUser"), (old, old))
+    assert cache.load("defaultUser") is None
+
+def test_cache_rejects_state_without_auth_cookie(tmp_path):
+    cache = AuthStateCache(cache_dir=str(tmp_path), ttl_seconds=60)
+    cache.save("defaultUser", _state(name="nonsession"))
+    assert cache.load("defaultUser") is None
+
+def test_cached_login_restores_the_whole_state(tmp_path, monkeypatch):
+    class FakeContext:
+        def set_storage_state(self, state):
+            self.state = state
+
+    class FakePage:
+        context = FakeContext()
+
+    state = dict(_state(), origins=[{"origin": "https://www.ebay.com", "localStorage": [{"name": "k", "value": "v"}]}])
+    cache = AuthStateCache(cache_dir=str(tmp_path), ttl_seconds=60)
+    cache.save("defaultUser", state)
+    monkeypatch.setattr(shopping_flow, "auth_cache", cache)
+    page = FakePage()
+    assert shopping_flow.login(page, "user@example.com", "secret", "defaultUser") is True
+    assert page.context.state == state
@@ -0,0 +1,124 @@
+import pytest
+from playwright.sync_api import Error as PlaywrightError
+
+from core.browser_pool import BrowserPool
+
+# BrowserPool over a fake playwright: "chromium.launch" hands out FakeBrowsers that
+# can be disconnected (a crash) and count what was done with them.
+
+
+class FakeContext:
+
+    def __init__(self, browser, options):
+        self.browser = browser
+        self.options = options
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+
+    def __init__(self, number:int, options:dict):
+        self.number = number
+        self.options = options
+        self.connected = True
+        self.closed = False
+        self.contexts = []
+
+    def is_connected(self):
+        return self.connected
+
+    def new_context(self, **options):
+        context = FakeContext(self, options)
+        self.contexts.append(context)
+        return context
+
+    def close(self):
+        if not self.connected:
+            raise PlaywrightError("browser has been closed")
+        self.closed = True
+        self.connected = False
+
+
+class FakeBrowserType:
+
+    def __init__(self):
+        self.browsers = []
+
+    def launch(self, **options):
+        browser = FakeBrowser(len(self.browsers), options)
+        self.browsers.append(browser)
+        return browser
+
+
+class FakePlaywright:
+
+    def __init__(self):
+        self.chromium = FakeBrowserType()
+        self.stopped = False
+
+    def stop(self):
+        self.stopped = True
+
+
+def _pool(size:int) -> BrowserPool:
+    pool = BrowserPool(size=size, headless=True)
+    pool._playwright = FakePlaywright()
+    return pool.start()
+
+def test_contexts_rotate_over_the_browsers():
+    pool = _pool(size=2)
+    launched = pool._playwright.chromium.browsers
+    assert pool.launches == 2
+    assert all(browser.options == {"headless": True} for browser in launched)
+
+    contexts = [pool.acquire(viewport={"width": 800, "height": 600}) for _ in range(4)]
+    assert [context.browser.number for context in contexts] == [0, 1, 0, 1]
+    assert contexts[0].options == {"viewport": {"width": 800, "height": 600}}
+
+    pool.release(contexts[0])
+    assert contexts[0].closed
+    # releasing after a pass keeps the browser, no new launches
+    assert pool.launches == 2 and pool.recycled == 0
+
+def test_disconnected_browser_is_relaunched():
+    pool = _pool(size=2)
+    first, second = pool._playwright.chromium.browsers
+    first.connected = False
+
+    context = pool.acquire()
+    # slot 0 was dead, so its browser was replaced before the context was created
+    assert context.browser is not first and context.browser.number == 2
+    assert pool.launches == 3 and pool.recycled == 1
+    assert pool.acquire().browser is second
+
+    # a browser that dies while its context is out is replaced on release
+    context.browser.connected = False
+    pool.release(context)
+    assert pool.recycled == 2
+    assert pool._browsers[0].number == 3
+
+def test_failed_release_recycles_the_browser():
+    pool = _pool(size=1)
+    with pytest.raises(RuntimeError):
+        with pool.context() as context:
+            raise RuntimeError("scenario failed")
+    assert context.closed
+    assert context.browser.closed
+    assert pool.recycled == 1 and pool._browsers[0] is not context.browser
+
+def test_close_closes_everything():
+    pool = _pool(size=2)
+    playwright = pool._playwright
+    open_context = pool.acquire()
+    pool._playwright.chromium.browsers[1].connected = False  # an already crashed browser
+
+    pool.close()
+    assert open_context.closed
+    assert playwright.chromium.browsers[0].closed
+    assert playwright.stopped
+    assert pool._browsers == [] and pool._playwright is None
+    # closing twice is harmless
+    pool.close()
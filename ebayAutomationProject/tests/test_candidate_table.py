@@ -0,0 +1,43 @@
+import math
+
+from pages.page_scripts import SearchCard
+from utils.candidate_table import CandidateTable
+
+def _card(item_id, price, shipping=0.0, max_price=None, auction=False):
+    return SearchCard(
+        item_id=str(item_id),
+        url=f"https://www.ebay.com/itm/{item_id}",
+        title=f"item {item_id}",
+        price=price,
+        max_price=price if max_price is None else max_price,
+        shipping=shipping,
+        format="auction" if auction else "buy_it_now",
+        sponsored=False,
+    )
+
+def test_only_real_buy_it_now_items_under_budget_qualify():
+    table = CandidateTable.from_cards([
+        _card(100000001, 20.0),
+        _card(100000002, 18.0, shipping=5.0),  # 23 with shipping
+        _card(100000003, 5.0, auction=True),
+        _card(100000004, 10.0, max_price=30.0),  # range price
+        _card(100000005, 0.0),  # unreadable price
+        _card(100000006, 9.0, shipping=None),
+    ])
+    assert table.best_urls(max_price=21) == [
+        "https://www.ebay.com/itm/100000006",
+        "https://www.ebay.com/itm/100000001",
+    ]
+
+def test_rank_across_pages_keeps_cheapest_and_drops_duplicates():
+    first = CandidateTable.from_cards([_card(100000001, 15.0), _card(100000002, 12.0)], page_number=1)
+    second = CandidateTable.from_cards([_card(100000002, 12.0), _card(100000003, 11.0, shipping=1.0)], page_number=2)
+    table = first.extend(second)
+    assert len(table) == 4
+    assert table.count_qualifying(20) == 3
+    # 12.0 ties: the page 1 row wins
+    assert list(table.rank(20, limit=2)) == [1, 3]
+    assert math.isclose(table.total_costs()[3], 12.0)
+
+def test_empty_table():
+    assert CandidateTable.empty().best_urls(100) == []
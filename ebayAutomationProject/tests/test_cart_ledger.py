@@ -0,0 +1,192 @@
+import asyncio
+import gc
+
+from flows import async_shopping_flow, shopping_flow
+from flows.async_shopping_flow import cart_lock
+from flows.shopping_flow import ADDED, ERROR, SKIPPED
+from pages.page_scripts import CartContents
+from utils.cart_ledger import CartLedger
+
+CART_RECORD = {
+    "lines": [
+        {"itemId": "100000000001", "key": "a", "title": "Acme Running Shoes", "qty": 2,
+         "price": "US $40.00", "shipping": "Free shipping"},
+        {"itemId": "100000000002", "key": "b", "title": "Nimbus Socks", "qty": 1,
+         "price": "US $9.99", "shipping": "Shipping US $4.99"},
+    ],
+    "subtotal": "US $49.99",
+    "shipping": "US $4.99",
+    "empty": False,
+}
+
+def test_cart_contents_from_record():
+    contents = CartContents.from_record(CART_RECORD)
+    assert contents.item_ids == ["100000000001", "100000000002"]
+    assert contents.lines[0].unit_price == 20.0
+    assert contents.lines[0].shipping == 0.0
+    assert contents.lines[1].shipping == 4.99
+    assert contents.total == 49.99
+
+def test_cart_line_variation_values():
+    line = CartContents.from_record(
+        {"lines": [dict(CART_RECORD["lines"][0], variation="Size: 9, Color: Red")]}
+    ).lines[0]
+    assert line.variation_values == {"Size": "9", "Color": "Red"}
+    assert CartContents.from_record(CART_RECORD).lines[1].variation_values == {}
+
+def test_total_falls_back_to_the_lines():
+    contents = CartContents.from_record(dict(CART_RECORD, subtotal=""))
+    assert contents.subtotal is None
+    assert contents.total == 49.99
+    assert CartContents.from_record({"lines": [], "empty": True}).total == 0
+
+def test_ledger_keeps_the_budget():
+    ledger = CartLedger()
+    ledger.add("100000000001", 30.0)
+    ledger.add("100000000002", 15.5)
+    assert ledger.total == 45.5
+    assert ledger.fits(4.5, 50)
+    assert not ledger.fits(4.51, 50)
+    assert ledger.fits(100, None)
+
+def test_unknown_prices_never_fit_a_budget():
+    ledger = CartLedger()
+    assert not ledger.fits(None, 50)
+    assert ledger.fits(None, None)
+    ledger.add("100000000001", None)
+    assert ledger.total == 0 and ledger.unpriced == 1
+    assert not ledger.fits(1.0, 50)
+    # the cart page fills in the price
+    ledger.reconcile(CartContents.from_record(CART_RECORD))
+    assert ledger.unpriced == 0
+    assert ledger.fits(0.01, 50)
+
+def test_reconcile_reports_differences_and_takes_the_cart_word():
+    ledger = CartLedger()
+    ledger.add("100000000001", 20.0)
+    ledger.add("100000000003", 5.0)
+    notes = ledger.reconcile(CartContents.from_record(CART_RECORD))
+    assert any("100000000003" in note for note in notes)
+    assert any("100000000002" in note for note in notes)
+    assert ledger.item_ids == ["100000000001", "100000000002"]
+    assert ledger.total == 49.99
+    assert ledger.reconcile(CartContents.from_record(CART_RECORD)) == []
+
+def test_cart_lock_is_per_cart_and_per_loop():
+    async def locks():
+        return cart_lock("defaultUser"), cart_lock("defaultUser"), cart_lock("anotherUser")
+
+    first = asyncio.run(locks())
+    assert first[0] is first[1]
+    assert first[0] is not first[2]
+    # a new event loop (another run) gets new locks
+    assert asyncio.run(locks())[0] is not first[0]
+
+def test_reserved_prices_count_against_the_budget():
+    ledger = CartLedger()
+    ledger.add("100000000001", 30.0)
+    ledger.reserve(50.0)
+    assert not ledger.fits(30.0, 100)
+    assert ledger.fits(20.0, 100)
+    ledger.release(50.0)
+    assert ledger.fits(30.0, 100)
+
+
+class FakeProductPage:
+    # an open product at "price" whose add to cart takes a moment and succeeds or fails
+
+    def __init__(self, price:float, ok:bool = True):
+        self.price = price
+        self.ok = ok
+        self.last_variation = None
+        self.clicked = False
+
+    async def is_loaded(self):
+        return True
+
+    async def has_add_to_cart_button(self):
+        return True
+
+    async def get_price(self):
+        return self.price
+
+    async def needs_variation(self):
+        return False
+
+    async def add_to_cart_full_seq(self):
+        self.clicked = True
+        await asyncio.sleep(0.01)
+        return self.ok
+
+def test_concurrent_adds_do_not_share_the_last_of_the_budget(monkeypatch):
+    monkeypatch.setattr(shopping_flow, "cart_ledgers", {})
+
+    async def add(page, item_id:str):
+        return await async_shopping_flow._add_open_product(page, item_id, 1, 2, "budgetUser", 100)
+
+    async def two_adds(first, second):
+        return await asyncio.gather(add(first, "100000000001"), add(second, "100000000002"))
+
+    # 60 + 60 fit one at a time but not together
+    first, second = FakeProductPage(60.0), FakeProductPage(60.0)
+    assert sorted(asyncio.run(two_adds(first, second))) == sorted([ADDED, SKIPPED])
+    assert first.clicked != second.clicked
+    ledger = async_shopping_flow.cart_ledger("budgetUser")
+    assert ledger.total == 60.0 and ledger.reserved == []
+
+    # a failed add gives its reservation back
+    ledger.clear()
+    failing, after = FakeProductPage(60.0, ok=False), FakeProductPage(60.0)
+    assert asyncio.run(add(failing, "100000000003")) == ERROR
+    assert ledger.reserved == []
+    assert asyncio.run(add(after, "100000000004")) == ADDED
+
+def test_same_user_scenarios_only_wait_for_each_other_on_the_cart(monkeypatch):
+    events = []
+
+    def step(name):
+        async def run(page, *args, **kwargs):
+            events.append((name, page))
+            await asyncio.sleep(0.01)
+            if name == "search":
+                return [f"https://www.ebay.com/itm/10000000000{page}"]
+            if name == "add":
+                return [shopping_flow.AddToCartResult(args[0][0], None, ADDED)]
+            return True
+        return run
+
+    for name, function in [("login", "login"), ("search", "search_items_by_name_under_price"),
+                           ("reset", "reset_cart"), ("add", "add_items_to_cart_in_tabs"),
+                           ("check", "assert_cart_total_not_exceeds_limit")]:
+        monkeypatch.setattr(async_shopping_flow, function, step(name))
+    monkeypatch.setattr(async_shopping_flow.config, "get_restore_cart", lambda: False)
+
+    scenario = {"query": "running shoes", "maxPrice": 100, "maxCartTotal": 500}
+
+    async def two_scenarios():
+        creds = {"username": "user@example.com", "password": "secret"}
+        return await asyncio.gather(*(async_shopping_flow.run_scenario(page, scenario, creds) for page in (1, 2)))
+
+    assert asyncio.run(two_scenarios()) == [["https://www.ebay.com/itm/100000000001"],
+                                            ["https://www.ebay.com/itm/100000000002"]]
+    names = [name for name, _ in events]
+    # both searches run before any cart change, the cart changes of one scenario are not interleaved
+    assert names[:4] == ["login", "login", "search", "search"]
+    first = events[4][1]
+    assert events[4:7] == [("reset", first), ("add", first), ("check", first)]
+
+def test_ledgers_are_dropped_with_the_cart(monkeypatch):
+    class Context:
+        pass
+
+    monkeypatch.setattr(shopping_flow, "cart_ledgers", {})
+    shopping_flow.cart_ledger("defaultUser").add("100000000001", 10.0)
+    shopping_flow.forget_cart_ledger("defaultUser")
+    assert shopping_flow.cart_ledger("defaultUser").total == 0
+
+    context = Context()
+    shopping_flow.cart_ledger(context).add("100000000001", 10.0)
+    alive = len(shopping_flow.context_ledgers)
+    del context
+    gc.collect()
+    assert len(shopping_flow.context_ledgers) == alive - 1
@@ -0,0 +1,21 @@
+from pages.cart_signals import is_add_to_cart_request, read_add_to_cart_response
+
+def test_add_to_cart_request_is_a_post_to_the_cart():
+    assert is_add_to_cart_request("POST", "http://127.0.0.1:8000/cart/add")
+    assert is_add_to_cart_request("post", "https://cart.payments.ebay.com/sc/add?item=1")
+    assert not is_add_to_cart_request("GET", "http://127.0.0.1:8000/cart/add")
+    assert not is_add_to_cart_request("POST", "https://www.ebay.com/nap/napkinapi/v1/ticketing")
+
+def test_success_payload():
+    assert read_add_to_cart_response(200, '{"status": "SUCCESS", "cartCount": 2}') == (True, "SUCCESS")
+    assert read_add_to_cart_response(200, '{"success": true}')[0]
+    assert read_add_to_cart_response(200, "<html>ok</html>") == (True, "HTTP 200")
+
+def test_error_payload_carries_the_message():
+    ok, detail = read_add_to_cart_response(200, '{"status": "ERROR", "message": "Please select all options"}')
+    assert not ok
+    assert detail == "Please select all options"
+    assert read_add_to_cart_response(200, '{"errors": [{"code": 7}]}')[0] is False
+    assert read_add_to_cart_response(400, '{"message": "This item cannot be added to your cart"}') == (
+        False, "HTTP 400 This item cannot be added to your cart"
+    )
@@ -0,0 +1,26 @@
+import pytest
+
+from utils.data_loader import load_test_scenarios, load_user_credentials
+from flows.scenario_runner import run_scenarios_concurrently
+
+def test_e2e_scenarios_concurrently(pytestconfig):
+
+    # opt in with --concurrency N, otherwise the sequential e2e test covers the scenarios
+    concurrency = pytestconfig.getoption("--concurrency")
+    if not concurrency:
+        pytest.skip("concurrent run not requested (use --concurrency N)")
+
+    launch_options = {}
+    if pytestconfig.getoption("--headed", default=False):
+        launch_options["headless"] = False
+
+    results = run_scenarios_concurrently(
+        load_test_scenarios(),
+        load_user_credentials(),
+        concurrency=concurrency,
+        stream=pytestconfig.getoption("--stream"),
+        **launch_options,
+    )
+
+    failed = [f"{result['scenarioName']}: {result['error']}" for result in results if not result["passed"]]
+    assert not failed, "Failed scenarios:\n" + "\n".join(failed)
@@ -1,13 +1,16 @@
-
 from utils.data_loader import load_test_scenarios, load_user_credentials
 from flows.shopping_flow import login, search_items_by_name_under_price, add_items_to_cart, assert_cart_total_not_exceeds_limit
+from flows.shopping_flow import add_items_to_cart_in_tabs, reset_cart, restore_cart, search_and_add_to_cart
+from core import config
 import shutil
 from pathlib import Path
+import pytest
 
-def test_e2e_add_items_and_verify_total(page):
+@pytest.fixture(scope="module", autouse=True)
+def clean_photos_dir():
 
     # try removing any screenshots left from priviuos run
-    photos_dir = Path("photos")
+    photos_dir = Path(config.get_screenshot_dir())
     if photos_dir.exists():
         try:
             shutil.rmtree(photos_dir)
@@ -17,23 +20,42 @@ def test_e2e_add_items_and_verify_total(page):
     #make a new one
     photos_dir.mkdir(parents=True, exist_ok=True)
 
-    # load scenarios and user credentials
-    scenarios = load_test_scenarios()
+# every scenario runs as its own test so it gets a fresh context from the browser pool
+@pytest.mark.parametrize("scenario", load_test_scenarios(), ids=lambda scenario: scenario.get("scenarioName"))
+def test_e2e_add_items_and_verify_total(page, scenario, request):
+
+    # load user credentials
     users = load_user_credentials()
 
-    for scenario in scenarios:
-        query = scenario["query"]
-        max_price = scenario["maxPrice"]
-        limit = scenario.get("limit", 5)
-        max_cart_total = scenario["maxCartTotal"]
-        user_key = scenario.get("userKey", "defaultUser")
-        creds = users[user_key]
-        # perform login
-        logged_in = login(page, creds["username"], creds["password"])
-        assert logged_in, f"Login failed for user {user_key}"
+    query = scenario["query"]
+    max_price = scenario["maxPrice"]
+    limit = scenario.get("limit", 5)
+    max_pages = scenario.get("maxPages", 5)
+    max_cart_total = scenario["maxCartTotal"]
+    scenario_name = scenario.get("scenarioName", query)
+    user_key = scenario.get("userKey", "defaultUser")
+    creds = users[user_key]
+    # perform login (or reuse the cached login of this user)
+    logged_in = login(page, creds["username"], creds["password"], user_key)
+    assert logged_in, f"Login failed for user {user_key}"
+    # every scenario is the same user - start from an empty cart (EBAY_RESET_CART=0 to keep it)
+    previous_cart = reset_cart(page, user_key) if config.get_reset_cart() else None
+    if previous_cart is not None and config.get_restore_cart():
+        # EBAY_RESTORE_CART=1: put the user's cart back once the scenario is done
+        request.addfinalizer(lambda: restore_cart(page, previous_cart, user_key))
+    cart_tabs = request.config.getoption("--cart-tabs")
+    if request.config.getoption("--stream"):
+        # --stream: products are opened while the next results pages are still downloading
+        search_and_add_to_cart(page, query, max_price, limit, max_pages, user_key, max_cart_total, scenario_name)
+    else:
         # search for items and collect urls
-        item_urls = search_items_by_name_under_price(page, query, max_price, limit)
-        # add items to cart
-        add_items_to_cart(page, item_urls)
-        # verify cart total
-        assert_cart_total_not_exceeds_limit(page, max_cart_total)
\ No newline at end of file
+        item_urls = search_items_by_name_under_price(page, query, max_price, limit, max_pages)
+        # add items to cart - one by one, or in parallel tabs with --cart-tabs
+        if cart_tabs:
+            for result in add_items_to_cart_in_tabs(page, item_urls, tabs=cart_tabs, cart_key=user_key,
+                                                    max_cart_total=max_cart_total, scenario=scenario_name):
+                print(f"{result.status:<16} {result.url} {result.detail}")
+        else:
+            add_items_to_cart(page, item_urls, user_key, max_cart_total, scenario_name)
+    # verify cart total (the ledger as we went, then the cart page once)
+    assert_cart_total_not_exceeds_limit(page, max_cart_total, user_key)
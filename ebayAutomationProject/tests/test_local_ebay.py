@@ -0,0 +1,86 @@
+import json
+import re
+import urllib.request
+from http.cookiejar import CookieJar
+
+import pytest
+
+from local_ebay import start_server, catalog
+from utils.price_parser import parse_price_to_number
+
+@pytest.fixture(scope="module")
+def server():
+    server = start_server()
+    yield server
+    server.stop()
+
+@pytest.fixture
+def browser():
+    # a cookie jar per test plays the role of a browser context
+    return urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+
+def _get(browser, url):
+    with browser.open(url) as response:
+        return response.read().decode("utf-8")
+
+def _post_json(browser, url, payload):
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode("utf-8"), headers={"Content-Type": "application/json"}
+    )
+    with browser.open(request) as response:
+        return json.loads(response.read())
+
+def test_home_page_has_search_box(server, browser):
+    page = _get(browser, server.base_url + "/")
+    assert 'id="gh-ac"' in page
+    assert 'id="gh-btn"' in page
+
+def test_search_results_respect_max_price_and_paginate(server, browser):
+    page = _get(browser, f"{server.base_url}/sch/i.html?_nkw=running+shoes&_udhi=100")
+    prices = re.findall(r'<span class="s-item__price">(US \$[\d,.]+)', page)
+    assert prices
+    assert all(parse_price_to_number(price) <= 100 for price in prices)
+    assert re.search(r'href="/itm/\d{12}\?hash=', page)
+    assert "pagination__next" in page
+
+def test_buy_it_now_filter_drops_auctions(server, browser):
+    page = _get(browser, f"{server.base_url}/sch/i.html?_nkw=laptop+stand&LH_BIN=1&_ipg=240")
+    assert "s-item__bids" not in page
+
+def test_cart_add_and_remove(server, browser):
+    listing = next(
+        item for item in catalog.listings_for_query("wireless headphones")
+        if not item.is_auction and item.is_available and not item.combinations
+    )
+
+    result = _post_json(browser, server.base_url + "/cart/add", {"itemId": str(listing.item_id)})
+    assert result == {"status": "SUCCESS", "cartCount": 1}
+
+    cart = _get(browser, server.base_url + "/cart")
+    assert listing.title in cart
+    subtotal = re.search(r'<span id="SUBTOTAL">([^<]+)</span>', cart).group(1)
+    assert parse_price_to_number(subtotal) == pytest.approx(listing.price)
+
+    key = re.search(r'data-line-key="([^"]+)"', cart).group(1).replace("&quot;", '"')
+    assert _post_json(browser, server.base_url + "/cart/remove", {"key": key}) == {"status": "SUCCESS"}
+    assert "empty-cart__title" in _get(browser, server.base_url + "/cart")
+
+def test_carts_are_isolated_per_cookie(server, browser):
+    listing = next(
+        item for item in catalog.listings_for_query("laptop stand")
+        if not item.is_auction and item.is_available and not item.combinations
+    )
+    _post_json(browser, server.base_url + "/cart/add", {"itemId": str(listing.item_id)})
+
+    other_browser = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+    assert "empty-cart__title" in _get(other_browser, server.base_url + "/cart")
+
+def test_variation_listing_needs_in_stock_selection(server, browser):
+    listing = next(item for item in catalog.listings_for_query("running shoes") if item.combinations)
+    assert _post_json(browser, server.base_url + "/cart/add", {"itemId": str(listing.item_id)})["status"] == "ERROR"
+
+    in_stock = next(combo for combo in listing.combinations if combo["in_stock"])
+    result = _post_json(
+        browser, server.base_url + "/cart/add", {"itemId": str(listing.item_id), "variation": in_stock["values"]}
+    )
+    assert result["status"] == "SUCCESS"
@@ -0,0 +1,86 @@
+import asyncio
+
+from core.network_policy import POLICIES, NetworkBlocker, activate, is_first_party, is_tracker
+
+
+class FakeContext:
+    # records route() / unroute() like a playwright context, sync or async
+
+    def __init__(self, is_async:bool = False):
+        self.is_async = is_async
+        self.routes = []
+
+    def _done(self):
+        async def done():
+            pass
+        return done() if self.is_async else None
+
+    def route(self, url, handler):
+        self.routes.append((url, handler))
+        return self._done()
+
+    def unroute(self, url, handler=None):
+        # without a handler every route of the url goes
+        self.routes = [route for route in self.routes if route[0] != url or handler not in (None, route[1])]
+        return self._done()
+
+
+class FakePage:
+
+    def __init__(self, context):
+        self.context = context
+
+    def once(self, event, callback):
+        pass
+
+def test_first_party_hosts():
+    assert is_first_party("https://www.ebay.com/sch/i.html")
+    assert is_first_party("https://i.ebayimg.com/images/g/abc/s-l500.jpg")
+    assert is_first_party("data:image/png;base64,AAAA")
+    assert not is_first_party("https://www.googletagmanager.com/gtm.js")
+    assert not is_first_party("https://notebay.com/x.js")
+
+def test_trackers():
+    assert is_tracker("https://securepubads.g.doubleclick.net/tag/js/gpt.js")
+    assert is_tracker("https://www.ebay.com/marketingtracking/v1/impression")
+    assert not is_tracker("https://www.ebay.com/itm/123456789012")
+
+def test_search_results_policy():
+    policy = POLICIES["search_results"]
+    assert policy.verdict("image", "https://i.ebayimg.com/thumbs/1.jpg") == "image"
+    assert policy.verdict("script", "https://cdn.example.com/lib.js") == "third-party"
+    assert policy.verdict("xhr", "https://www.ebay.com/sch/ajax/refine") is None
+    # navigations are never blocked
+    assert policy.verdict("document", "https://ads.example.com/") is None
+
+def test_cart_policy_allows_only_first_party_xhr():
+    policy = POLICIES["cart"]
+    assert policy.verdict("xhr", "https://cart.ebay.com/api/cart") is None
+    assert policy.verdict("fetch", "https://api.example.com/cart") == "third-party fetch"
+    assert policy.verdict("script", "https://cdn.example.com/lib.js") is None
+
+def test_allow_all_policy():
+    assert POLICIES["allow_all"].verdict("image", "https://ads.doubleclick.net/x.gif") is None
+
+def test_detach_removes_the_route():
+    context = FakeContext()
+    other = ("**/*.png", lambda route: None)
+    context.routes.append(other)
+    blocker = NetworkBlocker().attach(context)
+    assert context.routes == [other, ("**/*", blocker._handle)]
+    blocker.detach(context)
+    assert context.routes == [other]
+    # the page policies are not applied any more either
+    activate(FakePage(context), "search_results")
+    assert not blocker._page_policies
+
+def test_detach_async_removes_the_route():
+    async def attach_and_detach():
+        context = FakeContext(is_async=True)
+        blocker = NetworkBlocker()
+        await blocker.attach_async(context)
+        assert context.routes == [("**/*", blocker._handle_async)]
+        await blocker.detach_async(context)
+        return context.routes
+
+    assert asyncio.run(attach_and_detach()) == []
@@ -0,0 +1,48 @@
+import gc
+
+from utils.product_cache import ItemIndex, ProductFactCache, item_id_from_url
+
+def test_item_id_ignores_tracking_params_and_slugs():
+    assert item_id_from_url("https://www.ebay.com/itm/123456789012?hash=item1&_skw=shoes") == "123456789012"
+    assert item_id_from_url("https://www.ebay.com/itm/Acme-Shoes/123456789012") == "123456789012"
+    assert item_id_from_url("https://www.ebay.com/itm/123456") is None
+
+def test_index_collapses_urls_of_one_item():
+    index = ItemIndex()
+    first = index.add("https://www.ebay.com/itm/123456789012?hash=a", source="shoes")
+    second = index.add("https://www.ebay.com/itm/123456789012?hash=b", source="sneakers")
+    assert first == second and len(index) == 1
+    assert index.sources(first) == {"shoes", "sneakers"}
+
+def test_fact_cache_ttl_and_lru():
+    cache = ProductFactCache(max_items=2, ttl_seconds=60)
+    cache.put("1", now=0, has_add_to_cart=False)
+    cache.put("2", now=0, price=5.0)
+    assert cache.get("1", now=10).is_unbuyable
+    cache.put("3", now=10, price=7.0)  # evicts "2", "1" was used more recently
+    assert cache.get("2", now=10) is None
+    assert cache.get("1", now=100) is None  # expired
+    # facts merge
+    cache.put("3", now=20, has_add_to_cart=True)
+    assert cache.get("3", now=20).price == 7.0
+
+def test_cart_membership_is_per_cart():
+    cache = ProductFactCache()
+    cache.mark_in_cart("1", "alice")
+    assert cache.is_in_cart("1", "alice")
+    assert not cache.is_in_cart("1", "bob")
+    cache.forget_cart("alice")
+    assert not cache.is_in_cart("1", "alice")
+
+def test_anonymous_carts_go_with_their_context():
+    class Context:
+        pass
+
+    cache = ProductFactCache(max_items=10, ttl_seconds=60)
+    context = Context()
+    cache.mark_in_cart("1", context)
+    assert cache.is_in_cart("1", context)
+    assert not cache.is_in_cart("1", Context())
+    del context
+    gc.collect()
+    assert len(cache._context_carts) == 0
@@ -0,0 +1,12 @@
+from pages.product_layouts import PRODUCT_LAYOUTS, UNKNOWN_LAYOUT, layout_for
+
+def test_unknown_layout_tries_every_known_selector():
+    for layout in PRODUCT_LAYOUTS:
+        assert set(layout.price) <= set(UNKNOWN_LAYOUT.price)
+        assert set(layout.add_to_cart) <= set(UNKNOWN_LAYOUT.add_to_cart)
+        assert set(layout.title) <= set(UNKNOWN_LAYOUT.title)
+
+def test_layout_for_falls_back_to_unknown():
+    assert layout_for("legacy").price[0] == "span#prcIsum"
+    assert layout_for(None) is UNKNOWN_LAYOUT
+    assert layout_for("something new") is UNKNOWN_LAYOUT
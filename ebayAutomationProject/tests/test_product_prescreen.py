@@ -0,0 +1,70 @@
+import pytest
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from playwright.async_api import async_playwright
+from playwright.sync_api import sync_playwright
+
+from local_ebay import start_server, catalog
+from core import config
+from utils.product_prescreen import judge, parse_product_html, prescreen, prescreen_async
+
+@pytest.fixture(scope="module")
+def server():
+    server = start_server()
+    yield server
+    server.stop()
+
+@pytest.fixture(scope="module")
+def request_context(server):
+    # the same api a browser context exposes as context.request - no browser needed
+    with sync_playwright() as playwright:
+        context = playwright.request.new_context(base_url=server.base_url)
+        yield context
+        context.dispose()
+
+def test_prescreen_matches_the_catalog(server, request_context):
+    listings = catalog.listings_for_query("running shoes")[:40]
+    urls = [f"{server.base_url}/itm/{listing.item_id}" for listing in listings]
+    results = prescreen(request_context, urls)
+    for listing, result in zip(listings, results):
+        assert result.viable == (listing.is_available and not listing.is_auction), result
+        assert result.price == listing.price
+        assert result.format == ("auction" if listing.is_auction else "buy_it_now")
+
+def test_async_prescreen_matches_the_sequential_prescreen(server, request_context):
+    listings = catalog.listings_for_query("running shoes")[:40]
+    urls = [f"{server.base_url}/itm/{listing.item_id}" for listing in listings]
+
+    async def fetch_concurrently():
+        async with async_playwright() as playwright:
+            context = await playwright.request.new_context()
+            try:
+                return await prescreen_async(context, urls, concurrency=8)
+            finally:
+                await context.dispose()
+
+    # the sync playwright of request_context owns this thread's event loop
+    with ThreadPoolExecutor(max_workers=1) as thread:
+        results = thread.submit(asyncio.run, fetch_concurrently()).result()
+    assert results == prescreen(request_context, urls)
+    assert [result.url for result in results] == urls
+
+def test_prescreen_is_off_with_a_har_mode(monkeypatch):
+    monkeypatch.delenv("EBAY_PRESCREEN", raising=False)
+    monkeypatch.setattr(config, "_har_mode_override", None)
+    assert config.get_prescreen_enabled()
+    monkeypatch.setenv("EBAY_HAR_MODE", "replay")
+    assert not config.get_prescreen_enabled()
+    config.set_har_mode("record")
+    monkeypatch.delenv("EBAY_HAR_MODE")
+    assert not config.get_prescreen_enabled()
+
+def test_parse_without_structured_data():
+    assert parse_product_html('<a id="bidBtn_btn">Place bid</a>')["format"] == "auction"
+    facts = parse_product_html('<button id="atcRedesignId_btn">Add to cart</button>')
+    assert facts["has_add_to_cart"] and facts["available"] is None
+    assert not judge("https://www.ebay.com/itm/123456789012", "<p>This listing has ended.</p>").viable
+    # a page we could not fetch or read goes to the browser
+    assert judge("https://www.ebay.com/itm/123456789012", None).viable
+    assert judge("https://www.ebay.com/itm/123456789012", "<html></html>").viable
@@ -0,0 +1,101 @@
+from pages.page_scripts import ProductSnapshot
+from pages.product_layouts import SNAPSHOT_LAYOUTS
+from pages.shop_pages import ProductPage
+
+RECORD = {
+    "url": "http://127.0.0.1:8000/itm/100000007",
+    "layout": "redesign",
+    "title": "Nike Air Zoom Pegasus 40",
+    "price": "US $74.99",
+    "addToCart": {"selector": "[data-snapshot-ref='3']", "via": "button#atcRedesignId_btn", "visible": True, "enabled": True},
+    "variations": [
+        {
+            "kind": "select",
+            "name": "US Shoe Size",
+            "selector": "[data-snapshot-ref='1']",
+            "value": "",
+            "options": [
+                {"value": "8", "label": "8 (Out of stock)", "disabled": True},
+                {"value": "9", "label": "9", "disabled": False},
+            ],
+        },
+        {
+            "kind": "select",
+            "name": "Color",
+            "selector": "[data-snapshot-ref='2']",
+            "value": "Black",
+            "options": [{"value": "Black", "label": "Black", "disabled": False}],
+        },
+    ],
+    "errors": ["Please select a US Shoe Size"],
+}
+
+def test_snapshot_from_record():
+    snapshot = ProductSnapshot.from_record(RECORD)
+    assert snapshot.price == 74.99
+    assert snapshot.has_add_to_cart
+    assert snapshot.add_to_cart_match == "button#atcRedesignId_btn"
+    assert [control.name for control in snapshot.unset_variations] == ["US Shoe Size"]
+    assert [option.value for option in snapshot.variations[0].enabled_options] == ["9"]
+    assert snapshot.errors == ("Please select a US Shoe Size",)
+
+def test_greyed_out_add_to_cart_is_not_addable():
+    record = dict(RECORD, addToCart=dict(RECORD["addToCart"], enabled=False))
+    snapshot = ProductSnapshot.from_record(record)
+    assert snapshot.add_to_cart is not None
+    assert not snapshot.has_add_to_cart
+
+def test_range_price_keeps_both_ends():
+    snapshot = ProductSnapshot.from_record(dict(RECORD, price="US $10.00 to US $20.00"))
+    assert (snapshot.price, snapshot.max_price) == (10.0, 20.0)
+    assert snapshot.is_range_price
+    single = ProductSnapshot.from_record(RECORD)
+    assert single.max_price == single.price == 74.99
+    assert not single.is_range_price
+
+def test_empty_snapshot_when_the_page_could_not_be_read():
+    snapshot = ProductSnapshot.from_record({"url": "http://127.0.0.1:8000/itm/100000007"})
+    assert snapshot.layout == "unknown"
+    assert snapshot.price == 0.0
+    assert not snapshot.has_add_to_cart
+    assert snapshot.variations == ()
+
+def test_catch_all_layout_is_tried_last():
+    assert SNAPSHOT_LAYOUTS[-1][0] == "unknown"
+    assert SNAPSHOT_LAYOUTS[-1][1] == ""
+
+
+class FakePage:
+    # records the listeners a product page object registers
+
+    def __init__(self):
+        self.main_frame = object()
+        self.context = object()
+        self.listeners = []
+
+    def on(self, event, callback):
+        self.listeners.append((event, callback))
+
+    def once(self, event, callback):
+        pass
+
+    def locator(self, selector):
+        return self
+
+    @property
+    def first(self):
+        return self
+
+    def add_locator_handler(self, *args, **kwargs):
+        pass
+
+def test_one_navigation_listener_per_page():
+    page = FakePage()
+    product_pages = [ProductPage(page) for _ in range(5)]
+    navigated = [callback for event, callback in page.listeners if event == "framenavigated"]
+    assert len(navigated) == 1
+    # the one listener still drops the snapshot of every object on the page
+    for product_page in product_pages:
+        product_page._snapshot = ProductSnapshot.from_record(RECORD)
+    navigated[0](page.main_frame)
+    assert all(product_page._snapshot is None for product_page in product_pages)
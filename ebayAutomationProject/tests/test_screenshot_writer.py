@@ -0,0 +1,41 @@
+from utils.screenshot_writer import ScreenshotWriter, parse_clip, slug
+
+
+def _writer(tmp_path, **overrides):
+    options = dict(directory=str(tmp_path), policy="always", image_format="jpeg", quality=60,
+                   full_page=False, clip=None, sample_rate=0.5, workers=2, seed=1)
+    options.update(overrides)
+    return ScreenshotWriter(**options)
+
+def test_files_are_named_by_scenario_and_item(tmp_path):
+    writer = _writer(tmp_path)
+    first = writer.submit(b"one", "Buy cheap shoes", "100000000001")
+    again = writer.submit(b"two", "Buy cheap shoes", "100000000001")
+    failed = writer.submit(b"three", "Buy headphones", "100000000002", ok=False)
+    assert writer.flush() == [first, again, failed]
+    assert first.name == "product_buy-cheap-shoes_100000000001.jpg"
+    assert again.name == "product_buy-cheap-shoes_100000000001_2.jpg"
+    assert failed.name == "product_buy-headphones_100000000002_failed.jpg"
+    assert first.read_bytes() == b"one" and again.read_bytes() == b"two"
+    assert not list(tmp_path.glob("*.part"))
+    writer.close()
+
+def test_capture_policies(tmp_path):
+    assert _writer(tmp_path, policy="always").wants(True)
+    assert not _writer(tmp_path, policy="on_failure").wants(True)
+    assert _writer(tmp_path, policy="on_failure").wants(False)
+    sampled = _writer(tmp_path, policy="sampled", sample_rate=0.5)
+    kept = sum(sampled.wants(True) for _ in range(200))
+    assert 50 < kept < 150
+    assert all(sampled.wants(False) for _ in range(20))
+    assert not any(_writer(tmp_path, policy="sampled", sample_rate=0).wants(True) for _ in range(20))
+
+def test_screenshot_options(tmp_path):
+    assert _writer(tmp_path).screenshot_options() == {"type": "jpeg", "full_page": False, "quality": 60}
+    clip = parse_clip("0,0,1280,720")
+    assert clip == {"x": 0, "y": 0, "width": 1280, "height": 720}
+    assert _writer(tmp_path, image_format="png", clip=clip).screenshot_options() == {
+        "type": "png", "full_page": False, "clip": clip,
+    }
+    assert parse_clip("") is None
+    assert slug("  ") == "run"
@@ -0,0 +1,49 @@
+from flows import shopping_flow
+from pages.page_scripts import SearchCard
+from pages.shop_pages import SearchResultsPage
+from utils.search_cache import SearchResultsCache
+
+FILTERS = {"mode": "url", "buy_it_now": True}
+
+def _cards(*item_ids):
+    return [
+        SearchCard(str(item_id), f"https://www.ebay.com/itm/{item_id}", "item", 10.0, 10.0, 0.0, "buy_it_now", False)
+        for item_id in item_ids
+    ]
+
+def test_pages_round_trip_in_order(tmp_path):
+    cache = SearchResultsCache(path=tmp_path / "search.sqlite", ttl_seconds=60, max_pages=10, enabled=True)
+    cache.put_page("Running  Shoes", 100, FILTERS, 1, _cards(100000001, 100000002), now=0)
+    cache.put_page("running shoes", 100, FILTERS, 2, _cards(100000003), is_last=True, now=0)
+    pages, complete = cache.get_pages("running shoes", 100, FILTERS, now=10)
+    assert [card.item_id for card in pages[1]] == ["100000001", "100000002"]
+    assert complete and sorted(pages) == [1, 2]
+    # other price or filters are other searches
+    assert cache.get_pages("running shoes", 50, FILTERS, now=10) == ({}, False)
+    assert cache.get_pages("running shoes", 100, {"mode": "ui"}, now=10) == ({}, False)
+
+def test_ttl_size_cap_and_bypass(tmp_path):
+    cache = SearchResultsCache(path=tmp_path / "search.sqlite", ttl_seconds=60, max_pages=2, enabled=True)
+    cache.put_page("a", 10, FILTERS, 1, _cards(100000001), now=0)
+    assert cache.get_page("a", 10, FILTERS, 1, now=100) is None
+    cache.put_page("b", 10, FILTERS, 1, _cards(100000002), now=200)
+    cache.put_page("c", 10, FILTERS, 1, _cards(100000003), now=201)
+    cache.get_page("b", 10, FILTERS, 1, now=202)
+    cache.put_page("d", 10, FILTERS, 1, _cards(100000004), now=203)  # "c" is the least recently used
+    assert len(cache) == 2
+    assert cache.get_page("c", 10, FILTERS, 1, now=204) is None
+    cache.enabled = False
+    assert cache.get_page("b", 10, FILTERS, 1, now=204) is None
+
+def test_url_mode_reads_what_the_ui_fallback_stored(tmp_path, monkeypatch):
+    cache = SearchResultsCache(path=tmp_path / "search.sqlite", ttl_seconds=60, max_pages=10, enabled=True)
+    monkeypatch.setattr(shopping_flow, "search_cache", cache)
+    monkeypatch.setenv("EBAY_SEARCH_MODE", "url")
+    assert shopping_flow._cached_search("running shoes", 100, 1, 2) is None
+    # the url search fell back to the search box, so its pages went in under the "ui" filters
+    cache.put_page("running shoes", 100, SearchResultsPage.search_filters("ui"), 1, _cards(100000001), is_last=True)
+    assert shopping_flow._cached_search("running shoes", 100, 1, 2) == ["https://www.ebay.com/itm/100000001"]
+    # and a ui mode run does not take url mode pages
+    monkeypatch.setenv("EBAY_SEARCH_MODE", "ui")
+    cache.put_page("boots", 100, SearchResultsPage.search_filters("url"), 1, _cards(100000002), is_last=True)
+    assert shopping_flow._cached_search("boots", 100, 1, 2) is None
@@ -0,0 +1,51 @@
+from urllib.parse import parse_qs, urlparse
+
+from pages.page_scripts import SearchCard
+from pages.shop_pages import SearchResultsPage
+from utils.price_parser import parse_price_range, parse_shipping_cost
+
+def test_price_range():
+    assert parse_price_range("US $12.99 to US $20.00") == (12.99, 20.0)
+    assert parse_price_range("$7.50") == (7.5, 7.5)
+    assert parse_price_range("") == (0.0, 0.0)
+
+def test_shipping_cost():
+    assert parse_shipping_cost("Free shipping") == 0.0
+    assert parse_shipping_cost("+$4.99 shipping") == 4.99
+    assert parse_shipping_cost("Shipping not specified") is None
+    assert parse_shipping_cost("") is None
+
+def test_card_from_record():
+    card = SearchCard.from_record({
+        "itemId": "100000000042",
+        "url": "https://www.ebay.com/itm/100000000042",
+        "title": "Acme Pro Shoes",
+        "price": "$10.00 to $12.50",
+        "shipping": "+$3.00 shipping",
+        "auction": False,
+        "sponsored": True,
+    })
+    assert card.price == 10.0 and card.is_range_price
+    assert card.shipping == 3.0
+    assert card.format == "buy_it_now"
+    assert card.sponsored
+
+def test_direct_search_url():
+    url = SearchResultsPage.build_search_url("running shoes", max_price=100)
+    assert urlparse(url).path == "/sch/i.html"
+    assert parse_qs(urlparse(url).query) == {
+        "_nkw": ["running shoes"], "_sacat": ["0"], "_udhi": ["100.00"],
+        "LH_BIN": ["1"], "_ipg": ["240"], "_sop": ["15"],
+    }
+
+def test_direct_search_url_large_and_fractional_prices():
+    def max_price_param(max_price):
+        return parse_qs(urlparse(SearchResultsPage.build_search_url("tv", max_price=max_price)).query)["_udhi"]
+
+    assert max_price_param(1_000_000) == ["1000000.00"]
+    assert max_price_param(12_345_678.9) == ["12345678.90"]
+    assert max_price_param(19.99) == ["19.99"]
+
+def test_results_page_url_keeps_the_search():
+    url = SearchResultsPage.results_page_url("https://www.ebay.com/sch/i.html?_nkw=shoes&_udhi=50&_pgn=1", 3)
+    assert parse_qs(urlparse(url).query) == {"_nkw": ["shoes"], "_udhi": ["50"], "_pgn": ["3"]}
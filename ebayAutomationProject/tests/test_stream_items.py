@@ -0,0 +1,187 @@
+import asyncio
+
+import pytest
+from playwright.async_api import Error as PlaywrightError
+
+from flows import async_shopping_flow
+from pages.async_shop_pages import AsyncSearchResultsPage
+from pages.page_scripts import SearchCard
+
+# stream_items_into_cart and iter_qualifying_urls without a browser: the search results are a
+# scripted url stream and "adding to the cart" is a coroutine of the test.
+
+def _url(number:int) -> str:
+    return f"https://www.ebay.com/itm/1000000000{number:02d}"
+
+def _card(number:int, price:float) -> SearchCard:
+    return SearchCard(str(number), _url(number), f"item {number}", price, price, 0.0, "buy_it_now", False)
+
+
+class FakeTab:
+
+    def __init__(self, context):
+        self.context = context
+        self.closed = False
+
+    def on(self, event:str, callback):
+        pass
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeContext:
+
+    def __init__(self):
+        self.tabs = []
+
+    async def new_page(self):
+        tab = FakeTab(self)
+        self.tabs.append(tab)
+        return tab
+
+
+class FakePage:
+
+    def __init__(self):
+        self.context = FakeContext()
+
+
+class FakeResults:
+    # the AsyncSearchResultsPage of a search: urls come out one by one, optionally breaking after "fail_after"
+
+    def __init__(self, urls, fail_after:int | None = None):
+        self.urls = urls
+        self.fail_after = fail_after
+        self.pulled = 0
+        self.closed = False
+
+    async def iter_qualifying_urls(self, max_price:float, max_pages:int):
+        try:
+            for number, url in enumerate(self.urls):
+                if number == self.fail_after:
+                    raise PlaywrightError("results page crashed")
+                self.pulled += 1
+                yield url
+                await asyncio.sleep(0)
+        finally:
+            self.closed = True
+
+
+@pytest.fixture
+def search(monkeypatch):
+    # stream_items_into_cart over FakeResults, returns a function that sets them up
+    def setup(results:FakeResults, add):
+        async def open_search_results(page, query, max_price):
+            return results, "url"
+
+        monkeypatch.setattr(async_shopping_flow, "_cached_search", lambda *args: None)
+        monkeypatch.setattr(async_shopping_flow, "_open_search_results", open_search_results)
+        monkeypatch.setattr(async_shopping_flow, "_store_search", lambda *args: None)
+        monkeypatch.setattr(async_shopping_flow, "_add_product_to_cart", add)
+    return setup
+
+def _stream(page, limit:int, workers:int = 2):
+    return async_shopping_flow.stream_items_into_cart(page, "running shoes", 100, limit, workers=workers)
+
+def test_stream_stops_at_limit(search):
+    results = FakeResults([_url(number) for number in range(20)])
+    slots = []
+
+    async def add(product_page, url, index, total, *args):
+        slots.append(index)
+        await asyncio.sleep(0)
+        # every other item fails, so more urls than "limit" are pulled
+        return url.endswith(("0", "2", "4", "6", "8"))
+
+    search(results, add)
+    page = FakePage()
+    added = asyncio.run(asyncio.wait_for(_stream(page, limit=3), 5))
+
+    assert added == [_url(0), _url(2), _url(4)]
+    assert max(slots) <= 3
+    # the search stopped early: only what the queue and the workers could hold was pulled
+    assert results.pulled < 20
+    assert results.closed
+    assert all(tab.closed for tab in page.context.tabs)
+
+def test_broken_search_ends_the_stream(search):
+    results = FakeResults([_url(number) for number in range(10)], fail_after=2)
+
+    async def add(product_page, url, index, total, *args):
+        return True
+
+    search(results, add)
+    added = asyncio.run(asyncio.wait_for(_stream(FakePage(), limit=5), 5))
+
+    assert added == [_url(0), _url(1)]
+    assert results.closed
+
+def test_zero_workers_still_ends(search):
+    results = FakeResults([_url(0), _url(1)])
+
+    async def add(product_page, url, index, total, *args):
+        return True
+
+    search(results, add)
+    page = FakePage()
+    added = asyncio.run(asyncio.wait_for(_stream(page, limit=5, workers=0), 5))
+
+    assert added == [_url(0), _url(1)]
+    assert len(page.context.tabs) == 1
+
+def test_cancelling_the_stream_closes_tabs_and_search(search):
+    results = FakeResults([_url(number) for number in range(20)])
+    started = []
+
+    async def add(product_page, url, index, total, *args):
+        started.append(url)
+        # an add to cart that never finishes
+        await asyncio.Event().wait()
+
+    search(results, add)
+    page = FakePage()
+
+    async def run_and_cancel():
+        task = asyncio.ensure_future(_stream(page, limit=3))
+        while len(started) < 2:
+            await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(asyncio.wait_for(run_and_cancel(), 5))
+    assert results.closed
+    assert page.context.tabs and all(tab.closed for tab in page.context.tabs)
+
+def test_iter_qualifying_urls_ranks_each_page_and_skips_repeats():
+    results_page = AsyncSearchResultsPage(FakePage())
+    closed = []
+
+    async def iter_result_pages(max_pages, fan_out=None, eager=False):
+        try:
+            yield 1, [_card(1, 30.0), _card(2, 10.0), _card(3, 500.0)]
+            yield 2, [_card(2, 10.0), _card(4, 5.0)]
+            yield 3, [_card(5, 1.0)]
+        finally:
+            closed.append(True)
+
+    results_page.iter_result_pages = iter_result_pages
+
+    async def take(count:int | None):
+        urls = []
+        stream = results_page.iter_qualifying_urls(max_price=100)
+        try:
+            async for url in stream:
+                urls.append(url)
+                if len(urls) == count:
+                    break
+        finally:
+            await stream.aclose()
+        return urls
+
+    # cheapest first within a page, pages in order, item 2 only once, item 3 over budget
+    assert asyncio.run(take(None)) == [_url(2), _url(1), _url(4), _url(5)]
+    # stopping early closes the result pages too (their prefetch tabs)
+    assert asyncio.run(take(2)) == [_url(2), _url(1)]
+    assert closed == [True, True]
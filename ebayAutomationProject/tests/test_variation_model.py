@@ -0,0 +1,56 @@
+from local_ebay import catalog
+from local_ebay.server import _msku_model
+from pages.page_scripts import VariationControl, VariationOption
+from utils.variation_model import VariationCombination, VariationModel, plan_selections
+
+def _variation_listing(dimensions:int):
+    for item_id in range(catalog.FIRST_ITEM_ID, catalog.FIRST_ITEM_ID + 500):
+        listing = catalog.listing_for_id(item_id)
+        if len(listing.dimensions) == dimensions:
+            return listing
+    raise AssertionError("no variation listing in the catalog")
+
+def _select(name:str, options, value:str = "") -> VariationControl:
+    return VariationControl(
+        "select", name, f"[data-snapshot-ref='{name}']", value,
+        tuple(VariationOption(option, option + (" (Out of stock)" if disabled else ""), disabled)
+              for option, disabled in options),
+    )
+
+def test_msku_model_finds_the_cheapest_in_stock_combination():
+    listing = _variation_listing(2)
+    model = VariationModel.from_msku(_msku_model(listing))
+    assert len(model) == len(listing.combinations)
+    assert list(model.menus) == list(listing.dimensions)
+
+    cheapest = model.cheapest_in_stock()
+    in_stock = [combo for combo in listing.combinations if combo["in_stock"]]
+    assert cheapest.in_stock
+    assert cheapest.price == min(combo["price"] for combo in in_stock)
+    assert listing.find_combination(cheapest.values)["in_stock"]
+
+def test_nothing_in_stock_or_within_budget():
+    model = VariationModel({"Size": ["8", "9"]}, [
+        VariationCombination({"Size": "8"}, 10.0, False),
+        VariationCombination({"Size": "9"}, 12.0, True),
+    ])
+    assert model.cheapest_in_stock().values == {"Size": "9"}
+    assert model.cheapest_in_stock(max_price=11.0) is None
+
+def test_without_a_model_the_pickers_are_the_model():
+    controls = [_select("Size", [("8", True), ("9", False), ("10", False)]), _select("Color", [("Red", False)])]
+    model = VariationModel.from_controls(controls)
+    assert len(model) == 2
+    assert model.cheapest_in_stock().values == {"Size": "9", "Color": "Red"}
+
+def test_plan_matches_pickers_by_name_and_skips_the_ones_already_set():
+    controls = [_select("Size:", [("8", True), ("9", False)]), _select("Color", [("Red", False)], value="Red")]
+    plan = plan_selections(controls, VariationCombination({"Size": "9", "Color": "Red"}, 5.0, True))
+    assert [(control.name, option.value) for control, option in plan] == [("Size:", "9")]
+
+def test_plan_falls_back_to_position_and_first_enabled_option():
+    controls = [_select("msku-sel-1", [("8", True), ("9", False)]), _select("msku-sel-2", [("Red", False)])]
+    plan = plan_selections(controls, VariationCombination({"Size": "9", "Color": "Red"}, 5.0, True))
+    assert [option.value for _, option in plan] == ["9", "Red"]
+    plan = plan_selections(controls, None)
+    assert [option.value for _, option in plan] == ["9", "Red"]
@@ -0,0 +1,60 @@
+import json
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+from core import config
+
+# cookies eBay only sets for a signed in session
+AUTH_COOKIE_NAMES = ("ds2", "shs")
+
+def has_valid_auth_cookies(state:dict, now:float | None = None) -> bool:
+
+    # cheap validity check on the saved cookies, no browser or DOM involved.
+    # a session cookie has expires == -1 and is valid until the context closes.
+    now = time.time() if now is None else now
+    for cookie in state.get("cookies", []):
+        if cookie.get("name") not in AUTH_COOKIE_NAMES:
+            continue
+        expires = cookie.get("expires", -1)
+        if expires == -1 or expires > now:
+            return True
+    return False
+
+class AuthStateCache:
+    # keeps context.storage_state() of a logged in user on disk, one json file per user key
+    # from data/users.json, so the full login sequence runs once per account and not per scenario
+
+    def __init__(self, cache_dir:str | None = None, ttl_seconds:float | None = None):
+        self.cache_dir = Path(cache_dir or config.get_auth_cache_dir())
+        self.ttl_seconds = config.get_auth_cache_ttl() if ttl_seconds is None else ttl_seconds
+
+    def _path(self, user_key:str) -> Path:
+        # one folder per site, a login to the local stand-in is no login to eBay
+        site = urlparse(config.get_base_url()).netloc.replace(":", "_")
+        return self.cache_dir / site / f"{user_key}.json"
+
+    def load(self, user_key:str) -> dict | None:
+        # return the saved state, or None if it is missing, too old or has no valid auth cookie
+        path = self._path(user_key)
+        if not path.exists():
+            return None
+        if time.time() - path.stat().st_mtime > self.ttl_seconds:
+            return None
+        try:
+            with open(path, encoding="utf-8") as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(state, dict) or not has_valid_auth_cookies(state):
+            return None
+        return state
+
+    def save(self, user_key:str, state:dict):
+        path = self._path(user_key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(state, file)
+
+    def invalidate(self, user_key:str):
+        self._path(user_key).unlink(missing_ok=True)
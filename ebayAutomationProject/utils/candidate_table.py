@@ -0,0 +1,101 @@
+from typing import Iterable, List
+
+import numpy as np
+
+# search result candidates as columns (one numpy array per field) instead of a list of
+# records, so filtering by budget and ranking by cost is a couple of array operations
+# over every card collected so far, not a python loop per card.
+
+class CandidateTable:
+
+    def __init__(self, item_ids, urls, prices, max_prices, shipping, is_auction, sponsored, pages):
+        self.item_ids = np.asarray(item_ids, dtype=object)
+        self.urls = np.asarray(urls, dtype=object)
+        self.prices = np.asarray(prices, dtype=np.float64)
+        self.max_prices = np.asarray(max_prices, dtype=np.float64)
+        # NaN where the card does not say what shipping costs
+        self.shipping = np.asarray(shipping, dtype=np.float64)
+        self.is_auction = np.asarray(is_auction, dtype=bool)
+        self.sponsored = np.asarray(sponsored, dtype=bool)
+        # results page the card came from (1 based) - ties in cost keep page order
+        self.pages = np.asarray(pages, dtype=np.int32)
+
+    @classmethod
+    def empty(cls) -> "CandidateTable":
+        return cls([], [], [], [], [], [], [], [])
+
+    @classmethod
+    def from_cards(cls, cards:Iterable, page_number:int = 1) -> "CandidateTable":
+        # cards: SearchCard records of one results page (pages/page_scripts.py)
+        cards = list(cards)
+        return cls(
+            [card.item_id for card in cards],
+            [card.url for card in cards],
+            [card.price for card in cards],
+            [card.max_price for card in cards],
+            [np.nan if card.shipping is None else card.shipping for card in cards],
+            [card.format == "auction" for card in cards],
+            [card.sponsored for card in cards],
+            [page_number] * len(cards),
+        )
+
+    @classmethod
+    def from_pages(cls, pages:dict) -> "CandidateTable":
+        # {page number: cards} -> one table in page order
+        table = cls.empty()
+        for page_number in sorted(pages):
+            table = table.extend(cls.from_cards(pages[page_number], page_number))
+        return table
+
+    def __len__(self):
+        return len(self.item_ids)
+
+    def extend(self, other:"CandidateTable") -> "CandidateTable":
+        # a new table with the rows of both
+        return CandidateTable(
+            np.concatenate([self.item_ids, other.item_ids]),
+            np.concatenate([self.urls, other.urls]),
+            np.concatenate([self.prices, other.prices]),
+            np.concatenate([self.max_prices, other.max_prices]),
+            np.concatenate([self.shipping, other.shipping]),
+            np.concatenate([self.is_auction, other.is_auction]),
+            np.concatenate([self.sponsored, other.sponsored]),
+            np.concatenate([self.pages, other.pages]),
+        )
+
+    def total_costs(self, unknown_shipping:float = 0.0) -> np.ndarray:
+        # price + shipping per row. most cards without a shipping line are free/local pickup
+        return self.prices + np.where(np.isnan(self.shipping), unknown_shipping, self.shipping)
+
+    def qualifying_mask(self, max_price:float, unknown_shipping:float = 0.0) -> np.ndarray:
+        # rows that can really be bought under max_price: Buy It Now (auctions have no Add to cart),
+        # a single price (a range means the cheap variation may not be the one we get),
+        # a readable price, and price + shipping within budget
+        return (
+            ~self.is_auction
+            & (self.max_prices <= self.prices)
+            & (self.prices > 0)
+            & (self.total_costs(unknown_shipping) <= max_price)
+            & self._first_occurrence()
+        )
+
+    def _first_occurrence(self) -> np.ndarray:
+        # an item can show up on two pages when results shift - keep its first row
+        mask = np.zeros(len(self), dtype=bool)
+        if len(self):
+            _, first_rows = np.unique(self.item_ids.astype(str), return_index=True)
+            mask[first_rows] = True
+        return mask
+
+    def count_qualifying(self, max_price:float) -> int:
+        return int(np.count_nonzero(self.qualifying_mask(max_price)))
+
+    def rank(self, max_price:float, limit:int | None = None) -> np.ndarray:
+        # row indexes of the qualifying rows, cheapest total first (stable: ties keep page order)
+        rows = np.flatnonzero(self.qualifying_mask(max_price))
+        order = np.argsort(self.total_costs()[rows], kind="stable")
+        ranked = rows[order]
+        return ranked if limit is None else ranked[:limit]
+
+    def best_urls(self, max_price:float, limit:int | None = None) -> List[str]:
+        return [str(url) for url in self.urls[self.rank(max_price, limit)]]
@@ -0,0 +1,78 @@
+from typing import NamedTuple
+
+# what we put in a cart, kept on our side as each add to cart is confirmed. the budget check
+# (cart total vs maxCartTotal) can then run before every click without opening the cart page,
+# and the cart page is read once at the end to cross-check the ledger.
+
+class LedgerEntry(NamedTuple):
+    item_id: str | None
+    price: float | None  # unit price, None when the product page did not show it
+    qty: int = 1
+
+
+class CartLedger:
+
+    # totals may differ by rounding between our prices and the cart's summary
+    TOLERANCE = 0.01
+
+    def __init__(self):
+        self.entries: list[LedgerEntry] = []
+        # prices of the adds in flight: they passed fits() and hold their share of the budget
+        # until they are recorded (add) or fail (release)
+        self.reserved: list[float] = []
+
+    def add(self, item_id:str | None, price:float | None, qty:int = 1):
+        # an unknown price is kept as unknown (not 0) until the cart page says what it is
+        self.entries.append(LedgerEntry(item_id, price, qty))
+
+    @property
+    def total(self) -> float:
+        # of the entries with a known price - see unpriced
+        return round(sum(entry.price * entry.qty for entry in self.entries if entry.price is not None), 2)
+
+    @property
+    def unpriced(self) -> int:
+        # entries whose price we do not know, the total is a lower bound while there are any
+        return sum(1 for entry in self.entries if entry.price is None)
+
+    @property
+    def item_ids(self) -> list:
+        return [entry.item_id for entry in self.entries if entry.item_id]
+
+    def fits(self, price:float | None, max_total:float | None) -> bool:
+        # would one more item at "price" keep the cart within max_total, counting the reserved adds.
+        # an unknown price, or a ledger with unknown prices in it, cannot be shown to fit - it does not
+        if max_total is None:
+            return True
+        if price is None or self.unpriced:
+            return False
+        return round(self.total + sum(self.reserved) + price, 2) <= max_total
+
+    def reserve(self, price:float):
+        # hold "price" of the budget for an add that is about to be clicked
+        self.reserved.append(price)
+
+    def release(self, price:float):
+        # the add is recorded or failed, its share of the budget is not held any more
+        if price in self.reserved:
+            self.reserved.remove(price)
+
+    def reconcile(self, contents) -> list[str]:
+        # compare with the cart page (CartContents, pages/page_scripts.py), then take the cart's word
+        # for it. returns what did not match, empty when the ledger was right
+        notes = []
+        ours, theirs = set(self.item_ids), set(contents.item_ids)
+        if ours - theirs:
+            notes.append(f"missing from the cart: {sorted(ours - theirs)}")
+        if theirs - ours:
+            notes.append(f"in the cart but not in the ledger: {sorted(theirs - ours)}")
+        if abs(self.total - contents.total) > self.TOLERANCE:
+            notes.append(f"ledger total {self.total} vs cart total {contents.total}")
+        self.entries = [LedgerEntry(line.item_id, line.unit_price, line.qty) for line in contents.lines]
+        return notes
+
+    def clear(self):
+        self.entries = []
+
+    def __len__(self):
+        return len(self.entries)
@@ -35,3 +35,23 @@ def parse_price_to_number(price_text: str):
         return float(cleaned_price)
     except ValueError:
         return 0.0
+
+# "US $12.99 to US $20.00" -> (12.99, 20.0), a single price -> (price, price)
+def parse_price_range(price_text: str):
+    if not isinstance(price_text, str):
+        return 0.0, 0.0
+    low_text, _, high_text = price_text.partition(" to ")
+    low = parse_price_to_number(low_text)
+    high = parse_price_to_number(high_text) if high_text else low
+    return low, max(low, high)
+
+# shipping line of a search card: "Free shipping" -> 0.0, "+$4.99 shipping" -> 4.99,
+# nothing or "Shipping not specified" -> None
+def parse_shipping_cost(shipping_text: str):
+    if not isinstance(shipping_text, str) or not shipping_text.strip():
+        return None
+    lowered = shipping_text.lower()
+    if "free" in lowered:
+        return 0.0
+    cost = parse_price_to_number(shipping_text.strip().lstrip("+").strip())
+    return cost if cost > 0 else None
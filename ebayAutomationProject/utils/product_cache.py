@@ -0,0 +1,118 @@
+import re
+import time
+import weakref
+from collections import OrderedDict
+from typing import NamedTuple
+
+from core import config
+
+# eBay links carry tracking params (hash, _skw, epid, itmmeta...) and sometimes a title slug,
+# so one listing shows up under many urls. the item id is the only stable key.
+_ITEM_ID_RE = re.compile(r"/itm/(?:[^/?#]+/)?(\d{8,})")
+
+def item_id_from_url(url:str) -> str | None:
+    match = _ITEM_ID_RE.search(url or "")
+    return match.group(1) if match else None
+
+def canonical_item_url(item_id:str) -> str:
+    return f"{config.get_base_url()}/itm/{item_id}"
+
+
+class ItemIndex:
+    # item id -> canonical url, plus which searches found it. shared by every scenario of the run
+
+    def __init__(self):
+        self._urls = {}
+        self._sources = {}
+
+    def add(self, url:str, source:str | None = None) -> str | None:
+        # index a product url, returns its item id (None for non product links)
+        item_id = item_id_from_url(url)
+        if item_id is None:
+            return None
+        self._urls.setdefault(item_id, canonical_item_url(item_id))
+        if source:
+            self._sources.setdefault(item_id, set()).add(source)
+        return item_id
+
+    def url_for(self, item_id:str) -> str | None:
+        return self._urls.get(item_id)
+
+    def sources(self, item_id:str) -> set:
+        return self._sources.get(item_id, set())
+
+    def __contains__(self, item_id):
+        return item_id in self._urls
+
+    def __len__(self):
+        return len(self._urls)
+
+
+class ProductFacts(NamedTuple):
+    # what a product page visit taught us about a listing
+    item_id: str
+    price: float | None = None
+    has_add_to_cart: bool | None = None  # None: not checked yet
+    needs_variation: bool | None = None
+    checked_at: float = 0.0
+
+    @property
+    def is_unbuyable(self) -> bool:
+        # no Add to cart (auction, ended, sold out) - another visit will not change that soon
+        return self.has_add_to_cart is False
+
+
+class ProductFactCache:
+    # LRU of ProductFacts per item id, entries older than ttl_seconds are ignored.
+    # also remembers which items went into which cart (a cart key is a user key, or the
+    # browser context for anonymous carts) so a later scenario does not add them twice
+
+    def __init__(self, max_items:int | None = None, ttl_seconds:float | None = None):
+        self.max_items = config.get_product_cache_size() if max_items is None else max_items
+        self.ttl_seconds = config.get_product_cache_ttl() if ttl_seconds is None else ttl_seconds
+        self._facts = OrderedDict()
+        # cart key -> item ids in that cart. user carts are kept until forget_cart (the cart reset),
+        # anonymous carts only as long as their browser context is alive
+        self._carts = {}
+        self._context_carts = weakref.WeakKeyDictionary()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, item_id:str | None, now:float | None = None) -> ProductFacts | None:
+        facts = self._facts.get(item_id)
+        now = time.time() if now is None else now
+        if facts is None or now - facts.checked_at > self.ttl_seconds:
+            self._facts.pop(item_id, None)
+            self.misses += 1
+            return None
+        self._facts.move_to_end(item_id)
+        self.hits += 1
+        return facts
+
+    def put(self, item_id:str | None, now:float | None = None, **facts) -> ProductFacts | None:
+        # merge new facts into what we already know about the item
+        if item_id is None:
+            return None
+        known = self._facts.pop(item_id, None) or ProductFacts(item_id)
+        updated = known._replace(checked_at=time.time() if now is None else now, **facts)
+        self._facts[item_id] = updated
+        while len(self._facts) > self.max_items:
+            self._facts.popitem(last=False)
+        return updated
+
+    def _carts_of(self, cart_key):
+        return self._carts if isinstance(cart_key, str) else self._context_carts
+
+    def mark_in_cart(self, item_id:str | None, cart_key):
+        if item_id is not None:
+            self._carts_of(cart_key).setdefault(cart_key, set()).add(item_id)
+
+    def is_in_cart(self, item_id:str | None, cart_key) -> bool:
+        return item_id in self._carts_of(cart_key).get(cart_key, set())
+
+    def forget_cart(self, cart_key):
+        # the cart was emptied
+        self._carts_of(cart_key).pop(cart_key, None)
+
+    def __len__(self):
+        return len(self._facts)
@@ -0,0 +1,124 @@
+import asyncio
+import json
+import re
+from typing import NamedTuple
+
+from playwright.sync_api import Error as PlaywrightError
+
+from core import config
+from utils.price_parser import parse_price_to_number
+from utils.product_cache import item_id_from_url
+
+# a product page fetched as plain http (the context's APIRequestContext - same cookies, pooled
+# connections, no rendering) tells us most of what the browser would find out the slow way:
+# auctions, ended and sold out listings, and the price. only viable items go to the browser.
+# these fetches skip context.route, so they are neither blocked nor served from / recorded into
+# a HAR - config.get_prescreen_enabled() is off while a HAR mode is.
+
+class PrescreenResult(NamedTuple):
+    url: str
+    item_id: str | None
+    viable: bool
+    price: float | None = None
+    format: str | None = None  # "auction", "buy_it_now" or None when the page did not say
+    available: bool | None = None
+    has_add_to_cart: bool | None = None
+    reason: str = ""
+
+
+_LD_JSON_RE = re.compile(r'<script[^>]+type="application/ld\+json"[^>]*>(.*?)</script>', re.S | re.I)
+_ADD_TO_CART_RE = re.compile(r'atcBtn_btn|atcRedesignId_btn|isCartBtn_btn|x-atc-action|>\s*Add to cart\s*<', re.I)
+_AUCTION_RE = re.compile(r'id="bidBtn_btn"|>\s*Place bid\s*<', re.I)
+_ENDED_RE = re.compile(r'This listing (?:has|was) ended|This item is out of stock|listing has ended or is out of stock', re.I)
+
+_UNAVAILABLE = ("OutOfStock", "SoldOut", "Discontinued")
+
+def _ld_offers(html:str):
+    # the offers of every schema.org Product embedded in the page
+    for block in _LD_JSON_RE.findall(html):
+        try:
+            data = json.loads(block)
+        except ValueError:
+            continue
+        for node in data if isinstance(data, list) else [data]:
+            if not isinstance(node, dict) or node.get("@type") != "Product":
+                continue
+            offers = node.get("offers") or []
+            yield from offers if isinstance(offers, list) else [offers]
+
+def parse_product_html(html:str) -> dict:
+    # price, format, availability and add to cart presence from the raw page. None = unknown
+    facts = {"price": None, "format": None, "available": None, "has_add_to_cart": None}
+
+    for offer in _ld_offers(html):
+        offer_type = offer.get("@type", "")
+        facts["format"] = "auction" if offer_type == "AuctionOffer" else "buy_it_now"
+        price = offer.get("price") or offer.get("lowPrice")
+        if price is not None:
+            facts["price"] = parse_price_to_number(str(price)) or None
+        availability = str(offer.get("availability", ""))
+        if availability:
+            facts["available"] = not availability.endswith(_UNAVAILABLE)
+        break
+
+    # the markup is the fallback, and the only source for the add to cart button
+    if _ADD_TO_CART_RE.search(html):
+        facts["has_add_to_cart"] = True
+    elif _AUCTION_RE.search(html) or _ENDED_RE.search(html):
+        facts["has_add_to_cart"] = False
+    if facts["format"] is None and _AUCTION_RE.search(html):
+        facts["format"] = "auction"
+    if _ENDED_RE.search(html):
+        facts["available"] = False
+    return facts
+
+def judge(url:str, html:str | None, max_price:float | None = None) -> PrescreenResult:
+    item_id = item_id_from_url(url)
+    if html is None:
+        # could not fetch - let the browser find out
+        return PrescreenResult(url, item_id, True, reason="not fetched")
+
+    facts = parse_product_html(html)
+    reason = ""
+    if facts["available"] is False:
+        reason = "ended or out of stock"
+    elif facts["has_add_to_cart"] is False:
+        reason = "auction only" if facts["format"] == "auction" else "no add to cart"
+    elif facts["format"] == "auction" and facts["has_add_to_cart"] is None:
+        reason = "auction only"
+    elif max_price is not None and facts["price"] and facts["price"] > max_price:
+        reason = f"price {facts['price']} over {max_price}"
+    return PrescreenResult(url, item_id, not reason, reason=reason, **facts)
+
+def _fetch(request, url:str, timeout_ms:float) -> str | None:
+    try:
+        response = request.get(url, timeout=timeout_ms)
+        return response.text() if response.ok else None
+    except PlaywrightError:
+        return None
+
+def prescreen(request, urls:list[str], max_price:float | None = None,
+              timeout_ms:float | None = None) -> list[PrescreenResult]:
+    # request: page.context.request. the sync api can only wait on one response at a time,
+    # so the fetches run one after another (over the context's pooled connections)
+    timeout_ms = timeout_ms or config.get_prescreen_timeout()
+    return [judge(url, _fetch(request, url, timeout_ms), max_price) for url in urls]
+
+async def _fetch_async(request, url:str, timeout_ms:float) -> str | None:
+    try:
+        response = await request.get(url, timeout=timeout_ms)
+        return await response.text() if response.ok else None
+    except PlaywrightError:
+        return None
+
+async def prescreen_async(request, urls:list[str], max_price:float | None = None,
+                          concurrency:int | None = None, timeout_ms:float | None = None) -> list[PrescreenResult]:
+    # async version, at most "concurrency" fetches in flight. results keep the order of urls
+    timeout_ms = timeout_ms or config.get_prescreen_timeout()
+    limiter = asyncio.Semaphore(max(1, concurrency or config.get_prescreen_concurrency()))
+
+    async def one(url:str) -> PrescreenResult:
+        async with limiter:
+            return judge(url, await _fetch_async(request, url, timeout_ms), max_price)
+
+    return list(await asyncio.gather(*(one(url) for url in urls)))
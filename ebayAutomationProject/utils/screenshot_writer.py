@@ -0,0 +1,182 @@
+import random
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+from playwright.sync_api import Error as PlaywrightError
+
+from core import config
+
+try:
+    from PIL import Image
+except ImportError:
+    # optional - only needed to write webp
+    Image = None
+
+# product screenshots off the flow's critical path. the page is captured on the flow thread
+# (playwright objects belong to it) and only the bytes go to a small thread pool, which encodes
+# and writes them. jpeg comes compressed from the browser already (quality setting), webp is
+# re-encoded from png by the pool with Pillow. files are named by scenario and item id, so the
+# screenshots of one run never overwrite each other and can be found again.
+
+ALWAYS = "always"
+ON_FAILURE = "on_failure"
+SAMPLED = "sampled"  # every failure, and sample_rate of the successes
+POLICIES = (ALWAYS, ON_FAILURE, SAMPLED)
+
+FORMATS = ("jpeg", "webp", "png")
+EXTENSIONS = {"jpeg": "jpg", "webp": "webp", "png": "png"}
+
+_SLUG_RE = re.compile(r"[^A-Za-z0-9]+")
+
+def slug(text:str | None) -> str:
+    # "Buy cheap shoes" -> "buy-cheap-shoes"
+    return _SLUG_RE.sub("-", text or "").strip("-").lower() or "run"
+
+def parse_clip(text:str | None) -> dict | None:
+    # "x,y,width,height" in css pixels -> playwright clip, None for "" (the whole viewport)
+    if not text:
+        return None
+    x, y, width, height = (float(part) for part in text.split(","))
+    return {"x": x, "y": y, "width": width, "height": height}
+
+
+class ScreenshotWriter:
+
+    def __init__(self, directory:str | None = None, policy:str | None = None, image_format:str | None = None,
+                 quality:int | None = None, full_page:bool | None = None, clip:dict | None = None,
+                 sample_rate:float | None = None, workers:int | None = None, seed=None):
+        self.directory = Path(directory or config.get_screenshot_dir())
+        self.policy = policy or config.get_screenshot_policy()
+        if self.policy not in POLICIES:
+            raise ValueError(f"unknown screenshot policy {self.policy!r}, expected one of {POLICIES}")
+        image_format = (image_format or config.get_screenshot_format()).lower().replace("jpg", "jpeg")
+        if image_format not in FORMATS:
+            raise ValueError(f"unknown screenshot format {image_format!r}, expected one of {FORMATS}")
+        if image_format == "webp" and Image is None:
+            print("[WARN] Pillow is not installed - writing jpeg screenshots instead of webp")
+            image_format = "jpeg"
+        self.format = image_format
+        self.quality = config.get_screenshot_quality() if quality is None else quality
+        self.full_page = config.get_screenshot_full_page() if full_page is None else full_page
+        self.clip = parse_clip(config.get_screenshot_clip()) if clip is None else clip
+        self.sample_rate = config.get_screenshot_sample_rate() if sample_rate is None else sample_rate
+        self.workers = max(1, workers or config.get_screenshot_workers())
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pending = []
+        self._names = set()
+        self.written = 0
+        self.failed = 0
+
+    def wants(self, ok:bool) -> bool:
+        # does the policy keep a screenshot of an item that went ok / failed
+        if not ok or self.policy == ALWAYS:
+            return True
+        return self.policy == SAMPLED and self._random.random() < self.sample_rate
+
+    def screenshot_options(self) -> dict:
+        # page.screenshot() arguments. jpeg is encoded by the browser, webp starts as png
+        options = {"type": "jpeg" if self.format == "jpeg" else "png", "full_page": self.full_page}
+        if self.format == "jpeg":
+            options["quality"] = self.quality
+        if self.clip:
+            options["clip"] = self.clip
+        return options
+
+    def path_for(self, scenario:str | None, item_id:str | None, ok:bool = True) -> Path:
+        # photos/product_<scenario>_<item id>[_failed].<ext>, "_2", "_3"... when the same item
+        # comes back in the same scenario
+        stem = f"product_{slug(scenario)}_{item_id or 'unknown'}{'' if ok else '_failed'}"
+        extension = EXTENSIONS[self.format]
+        with self._lock:
+            name, copy = f"{stem}.{extension}", 1
+            while name in self._names:
+                copy += 1
+                name = f"{stem}_{copy}.{extension}"
+            self._names.add(name)
+        return self.directory / name
+
+    def capture(self, page, scenario:str | None, item_id:str | None, ok:bool = True) -> Path | None:
+        # screenshot the page if the policy wants it, returns where it will be written
+        if not self.wants(ok):
+            return None
+        options = self.screenshot_options()
+        try:
+            try:
+                data = page.screenshot(**options)
+            except PlaywrightError:
+                if not options["full_page"]:
+                    raise
+                # fallback - some pages are too tall for a full page capture
+                data = page.screenshot(**dict(options, full_page=False))
+        except PlaywrightError as exc:
+            print(f"could not take screenshot for item {item_id}: {exc}")
+            return None
+        return self.submit(data, scenario, item_id, ok)
+
+    async def capture_async(self, page, scenario:str | None, item_id:str | None, ok:bool = True) -> Path | None:
+        # capture() for the async api
+        if not self.wants(ok):
+            return None
+        options = self.screenshot_options()
+        try:
+            try:
+                data = await page.screenshot(**options)
+            except PlaywrightError:
+                if not options["full_page"]:
+                    raise
+                data = await page.screenshot(**dict(options, full_page=False))
+        except PlaywrightError as exc:
+            print(f"could not take screenshot for item {item_id}: {exc}")
+            return None
+        return self.submit(data, scenario, item_id, ok)
+
+    def submit(self, data:bytes, scenario:str | None, item_id:str | None, ok:bool = True) -> Path:
+        # queue captured bytes for the pool to encode and write
+        path = self.path_for(scenario, item_id, ok)
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="screenshots")
+            self._pending.append(self._pool.submit(self._write, data, path))
+        return path
+
+    def encode(self, data:bytes) -> bytes:
+        if self.format != "webp":
+            return data
+        with Image.open(BytesIO(data)) as image:
+            out = BytesIO()
+            image.save(out, format="WEBP", quality=self.quality)
+            return out.getvalue()
+
+    def _write(self, data:bytes, path:Path) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # written under a temporary name so a reader never sees half a file
+        partial = path.with_name(path.name + ".part")
+        partial.write_bytes(self.encode(data))
+        partial.replace(path)
+        return path
+
+    def flush(self) -> list[Path]:
+        # wait for everything queued so far, returns the files written since the last flush
+        with self._lock:
+            pending, self._pending = self._pending, []
+        written = []
+        for future in pending:
+            try:
+                written.append(future.result())
+            except Exception as exc:
+                self.failed += 1
+                print(f"could not write screenshot: {exc}")
+        self.written += len(written)
+        return written
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
@@ -0,0 +1,118 @@
+import json
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from urllib.parse import urlparse
+
+from core import config
+from pages.page_scripts import SearchCard
+
+# extracted search result cards on disk (sqlite), one row per results page, keyed by
+# site + query + max price + filters + page number. the scenario sets repeat the same
+# queries run after run, and a fresh hit means the browser does not search at all.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_pages (
+    key TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    max_price REAL,
+    filters TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    cards TEXT NOT NULL,
+    is_last INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+)
+"""
+
+class SearchResultsCache:
+
+    def __init__(self, path:str | None = None, ttl_seconds:float | None = None,
+                 max_pages:int | None = None, enabled:bool | None = None):
+        self.path = Path(path or config.get_search_cache_path())
+        self.ttl_seconds = config.get_search_cache_ttl() if ttl_seconds is None else ttl_seconds
+        # size cap in results pages, least recently used go first
+        self.max_pages = config.get_search_cache_size() if max_pages is None else max_pages
+        # the bypass switch: a disabled cache never reads or writes
+        self.enabled = config.get_search_cache_enabled() if enabled is None else enabled
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path)
+        connection.execute(_SCHEMA)
+        return connection
+
+    @staticmethod
+    def _key(query:str, max_price:float | None, filters:dict, page:int) -> str:
+        # one cache per site, results of the local stand-in are not eBay results
+        site = urlparse(config.get_base_url()).netloc
+        normalized = " ".join(query.lower().split())
+        return json.dumps([site, normalized, max_price, filters, page], sort_keys=True)
+
+    def get_page(self, query:str, max_price:float | None, filters:dict, page:int, now:float | None = None):
+        # (cards, is_last) of a fresh cached page, or None
+        if not self.enabled:
+            return None
+        now = time.time() if now is None else now
+        key = self._key(query, max_price, filters, page)
+        with closing(self._connect()) as connection, connection:
+            row = connection.execute(
+                "SELECT cards, is_last, created_at FROM search_pages WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[2] > self.ttl_seconds:
+                return None
+            connection.execute("UPDATE search_pages SET last_used = ? WHERE key = ?", (now, key))
+        return [SearchCard(**card) for card in json.loads(row[0])], bool(row[1])
+
+    def get_pages(self, query:str, max_price:float | None, filters:dict, now:float | None = None):
+        # the cached pages 1..N of a search, stopping at the first missing or stale one.
+        # returns ({page number: cards}, whether the last of them is the last page of the results)
+        pages = {}
+        is_last = False
+        page = 1
+        while not is_last:
+            cached = self.get_page(query, max_price, filters, page, now)
+            if cached is None:
+                break
+            pages[page], is_last = cached
+            page += 1
+        if pages:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return pages, is_last
+
+    def put_page(self, query:str, max_price:float | None, filters:dict, page:int, cards, is_last:bool = False,
+                 now:float | None = None):
+        if not self.enabled:
+            return
+        now = time.time() if now is None else now
+        payload = json.dumps([card._asdict() for card in cards])
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO search_pages "
+                "(key, query, max_price, filters, page, cards, is_last, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self._key(query, max_price, filters, page), query, max_price,
+                 json.dumps(filters, sort_keys=True), page, payload, int(is_last), now, now),
+            )
+            self._evict(connection, now)
+
+    def _evict(self, connection, now:float):
+        connection.execute("DELETE FROM search_pages WHERE created_at < ?", (now - self.ttl_seconds,))
+        connection.execute(
+            "DELETE FROM search_pages WHERE key NOT IN "
+            "(SELECT key FROM search_pages ORDER BY last_used DESC LIMIT ?)",
+            (self.max_pages,),
+        )
+
+    def clear(self):
+        with closing(self._connect()) as connection, connection:
+            connection.execute("DELETE FROM search_pages")
+
+    def __len__(self):
+        with closing(self._connect()) as connection:
+            return connection.execute("SELECT COUNT(*) FROM search_pages").fetchone()[0]
@@ -0,0 +1,134 @@
+from itertools import product
+from typing import NamedTuple
+
+# multi variation listings (size, color...) carry their whole option matrix in the page, the
+# "MSKU" model: menus of option values, and per combination of values a price and a stock flag.
+# reading it once tells us which combination to pick before touching a single dropdown, instead
+# of selecting the first enabled option of each menu and finding out on "Please select" or
+# "out of stock" after the add to cart click.
+
+class VariationCombination(NamedTuple):
+    values: dict  # menu name -> option value
+    price: float | None  # None when the page does not say
+    in_stock: bool
+
+
+def _variation_price(variation:dict) -> float | None:
+    # eBay nests the price as binModel.price.value.value, older pages have price.value or a plain number
+    for path in (("binModel", "price", "value", "value"), ("price", "value", "value"), ("price", "value"), ("price",)):
+        node = variation
+        for key in path:
+            node = node.get(key) if isinstance(node, dict) else None
+        if isinstance(node, (int, float)) and not isinstance(node, bool):
+            return float(node)
+        if isinstance(node, str):
+            try:
+                return float(node.replace(",", ""))
+            except ValueError:
+                continue
+    return None
+
+def _variation_in_stock(variation:dict) -> bool:
+    quantity = variation.get("quantity")
+    if isinstance(quantity, dict):
+        if "outOfStock" in quantity:
+            return not quantity["outOfStock"]
+        if "quantityAvailable" in quantity:
+            return (quantity["quantityAvailable"] or 0) > 0
+    if "outOfStock" in variation:
+        return not variation["outOfStock"]
+    if "inStock" in variation:
+        return bool(variation["inStock"])
+    return (variation.get("quantityAvailable") or 1) > 0
+
+
+class VariationModel:
+
+    def __init__(self, menus:dict, combinations:list):
+        # menus: menu name -> option values in page order
+        self.menus = menus
+        self.combinations = combinations
+
+    @classmethod
+    def from_msku(cls, msku:dict) -> "VariationModel":
+        values = msku.get("menuItemMap") or {}
+        menus = {}
+        menu_of_value = {}
+        for menu in msku.get("selectMenus") or []:
+            name = menu.get("displayLabel") or str(menu.get("menuId"))
+            menus[name] = []
+            for value_id in menu.get("menuItemValueIds") or []:
+                value = values.get(str(value_id)) or {}
+                menus[name].append(value.get("valueName") or value.get("displayName") or str(value_id))
+                menu_of_value[str(value_id)] = (name, menus[name][-1])
+
+        variations = msku.get("variationsMap") or {}
+        combinations = []
+        for key, variation_id in (msku.get("variationCombinations") or {}).items():
+            chosen = dict(menu_of_value[value_id] for value_id in str(key).split("_") if value_id in menu_of_value)
+            variation = variations.get(str(variation_id))
+            if len(chosen) != len(menus) or not isinstance(variation, dict):
+                continue
+            combinations.append(VariationCombination(chosen, _variation_price(variation), _variation_in_stock(variation)))
+        return cls(menus, combinations)
+
+    @classmethod
+    def from_controls(cls, controls) -> "VariationModel":
+        # no model in the page: every combination of enabled options, price unknown.
+        # controls: VariationControl records of a ProductSnapshot
+        menus = {control.name: [option.value for option in control.enabled_options] for control in controls}
+        combinations = [
+            VariationCombination(dict(zip(menus, values)), None, True) for values in product(*menus.values())
+        ]
+        return cls(menus, combinations)
+
+    def cheapest_in_stock(self, max_price:float | None = None) -> VariationCombination | None:
+        # the cheapest combination that can be bought (unknown prices last, ties keep page order)
+        candidates = [
+            combination for combination in self.combinations
+            if combination.in_stock and (max_price is None or combination.price is None or combination.price <= max_price)
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda combination: (combination.price is None, combination.price or 0.0))
+
+    def __len__(self):
+        return len(self.combinations)
+
+
+def _normalize(text:str) -> str:
+    return " ".join((text or "").lower().replace(":", " ").split())
+
+def _option_for(control, wanted:str):
+    # the option of a picker that stands for the wanted value - by value, then by label
+    # ("8 (Out of stock)" is still option "8")
+    wanted_key = _normalize(wanted)
+    for matches in (
+        lambda option: option.value == wanted,
+        lambda option: _normalize(option.label) == wanted_key,
+        lambda option: _normalize(option.label).startswith(wanted_key + " "),
+    ):
+        for option in control.options:
+            if matches(option):
+                return option
+    return None
+
+def plan_selections(controls, combination:VariationCombination | None) -> list:
+    # (control, option) per picker to reach the combination. pickers are matched to the model's menus
+    # by name, or by position when the names differ. a picker the combination says nothing about gets
+    # its first enabled option if it is still empty. pickers already on the right option are left alone
+    values = combination.values if combination else {}
+    by_name = {_normalize(name): value for name, value in values.items()}
+    by_position = list(values.values()) if len(values) == len(controls) else []
+    plan = []
+    for position, control in enumerate(controls):
+        wanted = by_name.get(_normalize(control.name))
+        if wanted is None and by_position:
+            wanted = by_position[position]
+        option = _option_for(control, wanted) if wanted is not None else None
+        if option is None and not control.is_set:
+            option = next(iter(control.enabled_options), None)
+        if option is None or option.disabled or option.value == control.value:
+            continue
+        plan.append((control, option))
+    return plan